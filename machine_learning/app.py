@@ -1,27 +1,105 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Query
 from pydantic import BaseModel
-from fastapi.responses import FileResponse, JSONResponse
-from typing import List
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from typing import List, Optional
+from contextlib import asynccontextmanager
+import collections
+import itertools
+import logging
+import math
 import os
-import shutil
-from io import BytesIO
-import pandas as pd
+import threading
+import time
+import uuid
 
-from machine_learning.model2.main import allocate_rooms   
-from machine_learning.model3.main import get_predictions_csv_path_for, predict_score_from_json
-from pydantic import BaseModel
-import tempfile
+from machine_learning import batching, executors, formats, metrics, profiling
+from machine_learning.jobs import JobQueue
+from machine_learning.result_cache import ResultCache, cache_key, digest_bytes, digest_stream
+from machine_learning.model2.main import allocate_rooms_bytes
+from machine_learning.model3.main import iter_predict_csv, predict_table_versioned, predict_score_from_json, predict_batch_from_json, CHUNK_ROWS, MODEL_REGISTRY
+
+from machine_learning.model1.part1 import evaluate_candidate, evaluate_candidate_batch, evaluate_candidates, evaluate_candidates_csv, parse_skills
+from machine_learning.model1.part2 import form_teams_bytes, TeamFormationSession
+from machine_learning.model1.optimize import TEAM_SCORE_THRESHOLD, optimize_teams_csv
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load (and warm) model3 once per worker instead of on every request. The
+    # artifact is built ahead of time (machine_learning.model3.build); without
+    # it the worker starts anyway but /readyz stays 503. sklearn and joblib
+    # are only imported when the tree itself is needed; pandas is imported
+    # with the model modules on purpose, since every CSV endpoint needs it
+    # and a ready worker should not pay that import on its first request.
+    if MODEL_REGISTRY.available():
+        MODEL_REGISTRY.warmup()
+    else:
+        metrics.log_event("model_missing", logging.WARNING, model_path=MODEL_REGISTRY.artifact_paths()[0])
+    JOB_QUEUE.start()
+    JOB_QUEUE.cleanup_expired()
+    yield
+    JOB_QUEUE.shutdown()
+    executors.shutdown()
+
+
+# Every endpoint builds its response in memory (no shared output files), and
+# CPU-bound model work runs on the executors pool instead of the event loop.
+app = FastAPI(title="Machine Learning Models API", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+metrics.configure_logging()
+
+# Re-uploads of the same CSV with the same parameters (and model version) are
+# answered from here; responses carry X-Cache: hit|miss.
+RESULT_CACHE = ResultCache()
+
+
+async def _cached(key):
+    return await executors.run_in_thread(RESULT_CACHE.get, key)
+
+
+async def _cache_put(key, content, headers, namespace=None, version=None):
+    await executors.run_in_thread(RESULT_CACHE.put, key, content, headers, namespace, version)
+
+
+def _table_response(content, headers, cache_status, fmt="csv"):
+    return Response(content=content, media_type=formats.MEDIA_TYPES[fmt], headers={**headers, "X-Cache": cache_status})
+
+
+def _negotiate(file, accept, requested):
+    """
+    (input format, output format) for a tabular upload: the upload's content
+    type or extension, and ?format= or Accept. CSV unless asked otherwise.
+    """
+    try:
+        output_fmt = formats.output_format(accept, requested)
+        formats.ensure_available(output_fmt)
+    except (ValueError, formats.FormatUnavailable) as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    input_fmt = formats.input_format(file.content_type, file.filename)
+    try:
+        formats.ensure_available(input_fmt)
+    except formats.FormatUnavailable as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    return input_fmt, output_fmt
 
-from machine_learning.model1.part1 import evaluate_candidate
-from machine_learning.model1.part2 import form_teams_from_csv
 
+def _attachment(stem, fmt):
+    return f'attachment; filename="{formats.attachment_name(stem, fmt)}"'
 
-app = FastAPI(title="Machine Learning Models API")
 
-BASE_DIR = os.path.dirname(__file__)
-OUTPUT_DIR = os.path.join(BASE_DIR, "output")
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+def _model3_snapshot():
+    """
+    The live model3 LoadedModel (None before the artifact is built). A request
+    scores with this snapshot and caches under its version, so a hot reload
+    mid-request never files one model's output under another's version.
+    """
+    if not MODEL_REGISTRY.available():
+        return None
+    loaded = MODEL_REGISTRY.get()
+    RESULT_CACHE.track_version("model3", loaded.version)
+    return loaded
 
 
 @app.get("/")
@@ -29,21 +107,58 @@ def home():
     return {"message": "Welcome to the Machine Learning Models API"}
 
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving HTTP."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: model3 is loaded and warmed, so the first request is not cold."""
+    if not MODEL_REGISTRY.ready and MODEL_REGISTRY.available():
+        try:
+            # The artifact appeared after startup (e.g. a late build step).
+            MODEL_REGISTRY.warmup()
+        except Exception as e:
+            return JSONResponse({"status": "unready", "reason": str(e)}, status_code=503)
+    if not MODEL_REGISTRY.ready:
+        return JSONResponse(
+            {"status": "unready", "reason": f"model artifact not built at {MODEL_REGISTRY.artifact_paths()[0]}"}, status_code=503
+        )
+    return {"status": "ready", "model3": MODEL_REGISTRY.info()["version"]}
+
+
+def _model_unavailable(e):
+    return HTTPException(status_code=503, detail=str(e))
+
+
 # --- Model 1 Endpoint ---
 class CandidateInput(BaseModel):
     name: str
     tech_stack_used: str
 
 
-## --- Endpoint 1: Evaluate Candidate ---
-@app.post("/model1/evaluate")
-def evaluate_candidate_api(data: CandidateInput):
-   
+# With ML_MICROBATCH=1, concurrent single-item calls to /model1/evaluate and
+# /model3/predict are scored together in one vectorized call (see batching).
+BATCHERS = {}
+if batching.ENABLED:
+    BATCHERS["model1_evaluate"] = batching.MicroBatcher("model1_evaluate", evaluate_candidate_batch)
+    BATCHERS["model3_predict"] = batching.MicroBatcher("model3_predict", predict_batch_from_json)
+
+
+def _evaluate_one(name, tech_stack_used):
+    return evaluate_candidate(name, parse_skills(tech_stack_used))
 
-    cleaned_stack = data.tech_stack_used.replace("  ", ",").replace(" ,", ",").strip()
-    skills = [s.strip() for s in cleaned_stack.split(",") if s.strip()]
 
-    name, score, eligible_to = evaluate_candidate(data.name, skills)
+## --- Endpoint 1: Evaluate Candidate ---
+@app.post("/model1/evaluate")
+async def evaluate_candidate_api(data: CandidateInput):
+    batcher = BATCHERS.get("model1_evaluate")
+    if batcher is not None:
+        name, score, eligible_to = await batcher.submit((data.name, data.tech_stack_used))
+    else:
+        name, score, eligible_to = await executors.run_in_thread(_evaluate_one, data.name, data.tech_stack_used)
 
     return {
         "name": name,
@@ -51,79 +166,290 @@ def evaluate_candidate_api(data: CandidateInput):
         "eligible_to": eligible_to
     }
 
-## --- Endpoint 2: Form Teams ---
-@app.post("/model1/form_teams", response_class=FileResponse)
-async def form_teams(file: UploadFile = File(...)):
-    
+## --- Endpoint 1b: Evaluate many candidates at once (CSV out, ready for form_teams) ---
+def _candidate_results_response(csv_text):
+    return Response(
+        content=csv_text,
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="candidate_results.csv"'},
+    )
+
+
+@app.post("/model1/evaluate_batch")
+async def evaluate_candidates_api(candidates: List[CandidateInput]):
+    results = await executors.run_model(
+        evaluate_candidates,
+        [c.name for c in candidates],
+        [parse_skills(c.tech_stack_used) for c in candidates],
+    )
+    return _candidate_results_response(await executors.run_in_thread(results.to_csv, index=False))
+
+
+@app.post("/model1/evaluate_batch/upload")
+async def evaluate_candidates_upload(file: UploadFile = File(...)):
+    try:
+        content = await file.read()
+        key = cache_key("/model1/evaluate_batch/upload", await executors.run_in_thread(digest_bytes, content), {})
+        headers = {"Content-Disposition": 'attachment; filename="candidate_results.csv"'}
+        cached = await _cached(key)
+        if cached is not None:
+            return _table_response(cached[0], cached[1], "hit")
+        results_csv = (await executors.run_model(evaluate_candidates_csv, content.decode("utf-8"))).encode("utf-8")
+        await _cache_put(key, results_csv, headers)
+        return _table_response(results_csv, headers, "miss")
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+
 
+## --- Endpoint 2: Form Teams ---
+# Tabular uploads accept and return CSV (default), Parquet or Arrow IPC; see
+# machine_learning.formats for how the formats are negotiated.
+@app.post("/model1/form_teams")
+async def form_teams(
+    file: UploadFile = File(...),
+    score_threshold: float = Query(300),
+    chunk_size: int = Query(5, ge=1),
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    input_fmt, output_fmt = _negotiate(file, accept, response_format)
     content = await file.read()
-    csv_content = content.decode("utf-8")
+    params = {"score_threshold": score_threshold, "chunk_size": chunk_size, "input": input_fmt, "output": output_fmt}
+    key = cache_key("/model1/form_teams", await executors.run_in_thread(digest_bytes, content), params)
+    cached = await _cached(key)
+    if cached is not None:
+        return _table_response(cached[0], cached[1], "hit", output_fmt)
 
-    teams_csv = form_teams_from_csv(csv_content)
+    teams = await executors.run_model(form_teams_bytes, content, score_threshold, chunk_size, input_fmt, output_fmt)
 
-    os.makedirs("outputs", exist_ok=True)
-    file_path = "outputs/teams.csv"
-    with open(file_path, "w", encoding="utf-8", newline="") as f:
-        f.write(teams_csv)
+    headers = {"Content-Disposition": _attachment("teams", output_fmt)}
+    await _cache_put(key, teams, headers)
+    return _table_response(teams, headers, "miss", output_fmt)
 
-    return FileResponse(
-        path=file_path,
-        filename="teams.csv",
-        media_type="text/csv"
+
+## --- Endpoint 2b: Teams that maximize the model3 predicted team score ---
+# Not cached: with a time budget the search result depends on machine load.
+@app.post("/model1/form_teams/optimize")
+async def optimize_teams_api(
+    file: UploadFile = File(...),
+    team_score_threshold: float = Query(TEAM_SCORE_THRESHOLD),
+    skill_threshold: Optional[float] = Query(None),
+    chunk_size: int = Query(5, ge=1),
+    time_budget_ms: int = Query(1000, ge=0, le=30000),
+    seed: int = Query(0),
+):
+    csv_content = (await file.read()).decode("utf-8")
+    try:
+        teams_csv, stats = await executors.run_model(
+            optimize_teams_csv, csv_content, team_score_threshold, chunk_size, skill_threshold,
+            time_budget_ms / 1000, seed,
+        )
+    except FileNotFoundError as e:
+        raise _model_unavailable(e)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {
+        "Content-Disposition": 'attachment; filename="optimized_teams.csv"',
+        "X-Teams": str(stats["teams"]),
+        "X-Teams-Before": str(stats["teams_before"]),
+        "X-Model-Version": stats["model_version"],
+    }
+    return Response(content=teams_csv, media_type="text/csv", headers=headers)
+
+
+## --- Endpoint 3: Incremental team formation sessions (rolling registrations) ---
+# Sessions live in the memory of the worker that created them. With several
+# uvicorn workers, route every call of a session to that worker (sticky
+# routing on the session id, or a single worker for these endpoints); any
+# other worker answers 404. A session idle for ML_TEAM_SESSION_TTL seconds is
+# dropped and then answers 410; at most ML_TEAM_SESSION_MAX live at once per
+# worker, and creating another answers 429 until one expires or is deleted.
+TEAM_SESSION_TTL = float(os.environ.get("ML_TEAM_SESSION_TTL", "3600"))
+TEAM_SESSION_MAX = int(os.environ.get("ML_TEAM_SESSION_MAX", "256"))
+TEAM_SESSIONS = {}  # session_id -> [TeamFormationSession, last used (monotonic)]
+_EXPIRED_TEAM_SESSIONS = collections.OrderedDict()  # recently expired ids, so they get 410 rather than 404
+_TEAM_SESSIONS_LOCK = threading.Lock()
+
+
+def _expire_team_sessions(now):
+    # Caller holds _TEAM_SESSIONS_LOCK.
+    for session_id, (_, last_used) in list(TEAM_SESSIONS.items()):
+        if now - last_used > TEAM_SESSION_TTL:
+            del TEAM_SESSIONS[session_id]
+            _EXPIRED_TEAM_SESSIONS[session_id] = now
+            metrics.log_event("team_session_expired", session_id=session_id, idle_seconds=round(now - last_used, 1))
+    while len(_EXPIRED_TEAM_SESSIONS) > 4 * TEAM_SESSION_MAX:
+        _EXPIRED_TEAM_SESSIONS.popitem(last=False)
+
+
+def _get_team_session(session_id):
+    now = time.monotonic()
+    with _TEAM_SESSIONS_LOCK:
+        _expire_team_sessions(now)
+        entry = TEAM_SESSIONS.get(session_id)
+        if entry is None:
+            if session_id in _EXPIRED_TEAM_SESSIONS:
+                raise HTTPException(status_code=410, detail=f"Team formation session {session_id} expired after {TEAM_SESSION_TTL:g}s idle")
+            raise HTTPException(status_code=404, detail=f"Unknown team formation session: {session_id}")
+        entry[1] = now
+        return entry[0]
+
+
+@app.post("/model1/form_teams/sessions")
+def create_team_session(score_threshold: float = Query(300), chunk_size: int = Query(5, ge=1)):
+    session_id = uuid.uuid4().hex
+    now = time.monotonic()
+    with _TEAM_SESSIONS_LOCK:
+        _expire_team_sessions(now)
+        if len(TEAM_SESSIONS) >= TEAM_SESSION_MAX:
+            oldest = min(last_used for _, last_used in TEAM_SESSIONS.values())
+            raise HTTPException(
+                status_code=429,
+                detail=f"Too many open team formation sessions ({TEAM_SESSION_MAX}); delete one or retry later",
+                headers={"Retry-After": str(max(1, math.ceil(oldest + TEAM_SESSION_TTL - now)))},
+            )
+        TEAM_SESSIONS[session_id] = [TeamFormationSession(score_threshold, chunk_size), now]
+    return {"session_id": session_id, "score_threshold": score_threshold, "chunk_size": chunk_size}
+
+
+@app.post("/model1/form_teams/sessions/{session_id}/candidates")
+def add_team_session_candidates(session_id: str, file: UploadFile = File(...)):
+    session = _get_team_session(session_id)
+    try:
+        new_teams = session.add_candidates(file.file.read().decode("utf-8"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "new_teams": [{k: team[k] for k in ("team_id", "participant_names", "score_list")} for team in new_teams],
+        "team_count": len(session.teams),
+        "leftover_count": session.leftover_count(),
+    }
+
+
+@app.get("/model1/form_teams/sessions/{session_id}/teams")
+def get_team_session_teams(session_id: str):
+    session = _get_team_session(session_id)
+    return Response(
+        content=session.teams_csv(),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="teams.csv"'},
     )
-    
-    
+
+
+@app.get("/model1/form_teams/sessions/{session_id}/leftovers")
+def get_team_session_leftovers(session_id: str):
+    return {"leftovers": _get_team_session(session_id).leftovers()}
+
+
+@app.delete("/model1/form_teams/sessions/{session_id}")
+def delete_team_session(session_id: str):
+    _get_team_session(session_id)
+    with _TEAM_SESSIONS_LOCK:
+        TEAM_SESSIONS.pop(session_id, None)
+    return {"deleted": session_id}
+
 
 # --- Model 2 Endpoint upload 1 CSV + two integers) ---
 @app.post("/model2/upload")
-async def upload_and_run_model2(file: UploadFile = File(...), no_of_rooms_available: int = Query(...), each_room_capacity: int = Query(...)):
+async def upload_and_run_model2(
+    file: UploadFile = File(...),
+    no_of_rooms_available: int = Query(...),
+    each_room_capacity: int = Query(...),
+    seats_per_room: Optional[int] = Query(None, ge=1),
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    input_fmt, output_fmt = _negotiate(file, accept, response_format)
     try:
-        teams_df = pd.read_csv(BytesIO(await file.read()))
-
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        final_output_path = os.path.abspath(os.path.join(OUTPUT_DIR, "room_allocation.csv"))
-        allocate_rooms(teams_df, no_of_rooms_available, each_room_capacity, final_output_path)
+        content = await file.read()
+        params = {
+            "num_rooms": no_of_rooms_available, "teams_per_room": each_room_capacity, "seats_per_room": seats_per_room,
+            "input": input_fmt, "output": output_fmt,
+        }
+        key = cache_key("/model2/upload", await executors.run_in_thread(digest_bytes, content), params)
+        cached = await _cached(key)
+        if cached is not None:
+            return _table_response(cached[0], cached[1], "hit", output_fmt)
 
-        if not os.path.exists(final_output_path):
-            raise RuntimeError("Model 2 did not produce an output CSV.")
+        # In memory only: teams that do not fit come back labelled "Overflow".
+        allocation, overflow = await executors.run_model(
+            allocate_rooms_bytes, content, no_of_rooms_available, each_room_capacity, seats_per_room,
+            input_fmt, output_fmt,
+        )
 
-        return FileResponse(final_output_path, filename="room_allocation.csv", media_type="text/csv")
+        headers = {
+            "Content-Disposition": _attachment("room_allocation", output_fmt),
+            "X-Overflow-Count": str(overflow),
+        }
+        await _cache_put(key, allocation, headers)
+        return _table_response(allocation, headers, "miss", output_fmt)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# --- Model 3 Endpoint (upload CSV, save + download) ---
+# --- Model 3 Endpoint (upload CSV, download predictions) ---
+async def _stream_and_cache(chunks, key, headers, version):
+    # Keep a copy of what was streamed; cache it only if the whole body fits.
+    parts, size = [], 0
+    async for chunk in chunks:
+        yield chunk
+        if parts is not None:
+            size += len(chunk)
+            if size > RESULT_CACHE.max_entry_bytes:
+                parts = None
+            else:
+                parts.append(chunk)
+    if parts is not None:
+        await _cache_put(key, b"".join(parts), headers, "model3", version)
+
+
 @app.post("/model3/upload")
-async def upload_and_run_model3(file: UploadFile = File(...)):
+async def upload_and_run_model3(
+    file: UploadFile = File(...),
+    chunk_rows: int = Query(CHUNK_ROWS, ge=1),
+    response_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None),
+):
+    input_fmt, output_fmt = _negotiate(file, accept, response_format)
     try:
-        fd, temp_input_path = tempfile.mkstemp(suffix=".csv")
-        os.close(fd)
-        contents = await file.read()
-        with open(temp_input_path, "wb") as f:
-            f.write(contents)
-
-        source_output = os.path.abspath(get_predictions_csv_path_for(temp_input_path))
-        
-        if not os.path.exists(source_output):
-            raise RuntimeError(f"Model 3 did not produce an output CSV at: {source_output}")
-
-        final_output_path = os.path.abspath(os.path.join(OUTPUT_DIR, "predicted_scores.csv"))
-        os.makedirs(os.path.dirname(final_output_path), exist_ok=True)
-        try:
-            shutil.copyfile(source_output, final_output_path)
-            path_to_return = final_output_path
-        except Exception:
-            path_to_return = source_output
+        headers = {"Content-Disposition": _attachment("predicted_scores", output_fmt)}
+        loaded = await executors.run_in_thread(_model3_snapshot)
+        version = loaded.version if loaded is not None else None
+        key = None
+        if version is not None and RESULT_CACHE.enabled:
+            # chunk_rows only changes how the body is produced, not its bytes.
+            params = {"input": input_fmt, "output": output_fmt}
+            key = cache_key("/model3/upload", await executors.run_in_thread(digest_stream, file.file), params, version)
+            cached = await _cached(key)
+            if cached is not None:
+                return _table_response(cached[0], cached[1], "hit", output_fmt)
+
+        if input_fmt != "csv" or output_fmt != "csv":
+            # Columnar formats are read and written whole (no text parse in between).
+            # A process-pool worker scores with the model it has loaded, which
+            # may not be this snapshot; only the matching version is cached.
+            table, scored_version = await executors.run_model(predict_table_versioned, await file.read(), input_fmt, output_fmt)
+            if key is not None and scored_version == version:
+                await _cache_put(key, table, headers, "model3", version)
+            return _table_response(table, headers, "miss", output_fmt)
 
-        return FileResponse(path_to_return, filename="predicted_scores.csv", media_type="text/csv")
+        # Parsed, scored and streamed back chunk by chunk: no temp/output files,
+        # and memory is bounded by chunk_rows rather than the upload size.
+        # The generator reads the upload's spooled file, so it stays on threads.
+        chunks = iter_predict_csv(file.file, chunk_rows, loaded=loaded)
+        # Score the first chunk up front so bad input still surfaces as a 500.
+        first = await executors.run_in_thread(next, chunks)
+        body = executors.iterate_in_thread(itertools.chain([first], chunks))
+        if key is not None:
+            body = _stream_and_cache(body, key, headers, version)
+        return StreamingResponse(body, media_type="text/csv", headers={**headers, "X-Cache": "miss"})
+    except FileNotFoundError as e:
+        raise _model_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        try:
-            if 'temp_input_path' in locals() and os.path.exists(temp_input_path):
-                os.remove(temp_input_path)
-        except Exception:
-            pass
 
 
 # --- Model 3 JSON Endpoint ---
@@ -133,16 +459,199 @@ class TeamInput(BaseModel):
     tech_stack_used: str
     
 @app.post("/model3/predict")
-def predict_score(team_input: TeamInput):
+async def predict_score(team_input: TeamInput):
     try:
         json_input = {
             "team_name": team_input.team_name,
             "tech_stack_used": team_input.tech_stack_used
         }
-        predicted_score = predict_score_from_json(json_input)
+        batcher = BATCHERS.get("model3_predict")
+        if batcher is not None:
+            predicted_score, _ = await batcher.submit(json_input)
+        else:
+            predicted_score = await executors.run_in_thread(predict_score_from_json, json_input)
         return {
             "name": team_input.team_name,
             "score": predicted_score
         }
+    except FileNotFoundError as e:
+        raise _model_unavailable(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/model3/predict_batch")
+async def predict_score_batch(teams: List[TeamInput]):
+    try:
+        results = await executors.run_model(predict_batch_from_json, [team.model_dump() for team in teams])
+        return [
+            {"name": team.team_name, "score": score, "unknown_techs": unknown_techs}
+            for team, (score, unknown_techs) in zip(teams, results)
+        ]
+    except FileNotFoundError as e:
+        raise _model_unavailable(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/model3/info")
+def model3_info():
+    return MODEL_REGISTRY.info()
+
+
+# --- Metrics (Prometheus text format) ---
+def _collect_state_metrics():
+    cache = RESULT_CACHE.stats()
+    lookups = metrics.Counter("ml_cache_lookups_total", "Result cache lookups by outcome.", ("result",))
+    lookups.inc(cache["hits"], result="hit")
+    lookups.inc(cache["disk_hits"], result="disk_hit")
+    lookups.inc(cache["misses"], result="miss")
+    evictions = metrics.Counter("ml_cache_evictions_total", "Result cache entries evicted for size.")
+    evictions.inc(cache["evictions"])
+    invalidations = metrics.Counter("ml_cache_invalidations_total", "Result cache entries dropped after a model change.")
+    invalidations.inc(cache["invalidations"])
+    size = metrics.Gauge("ml_cache_bytes", "Bytes held by the result cache.", ("tier",))
+    size.set(cache["bytes"], tier="memory")
+    size.set(cache["disk_bytes"], tier="disk")
+
+    model = MODEL_REGISTRY.info()
+    reloads = metrics.Counter("ml_model_reloads_total", "Hot reloads of the model3 artifact.")
+    reloads.inc(model["reloads"])
+    loaded = metrics.Gauge("ml_model_info", "Currently served model3 artifact.", ("version", "scorer"))
+    if model["version"] is not None:
+        loaded.set(1, version=model["version"], scorer=model["scorer"])
+    batch_limits = metrics.Gauge("ml_microbatch_limit", "Micro-batching settings per batcher.", ("batcher", "setting"))
+    batch_pending = metrics.Gauge("ml_microbatch_pending", "Requests waiting for their micro-batch.", ("batcher",))
+    for name, batcher in BATCHERS.items():
+        batch_limits.set(batcher.max_size, batcher=name, setting="max_size")
+        batch_limits.set(batcher.max_wait, batcher=name, setting="max_wait_seconds")
+        batch_pending.set(batcher.info()["pending"], batcher=name)
+    return [lookups, evictions, invalidations, size, reloads, loaded, batch_limits, batch_pending]
+
+
+metrics.REGISTRY.add_collector(_collect_state_metrics)
+
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return Response(content=metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# --- Result cache ---
+@app.get("/cache/stats")
+def cache_stats():
+    return RESULT_CACHE.stats()
+
+
+@app.delete("/cache")
+def clear_cache():
+    RESULT_CACHE.clear()
+    return RESULT_CACHE.stats()
+
+
+# --- Request profiles (ML_PROFILING=1, then send X-Profile: 1) ---
+def _profiles_enabled():
+    if not profiling.ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled; set ML_PROFILING=1")
+
+
+@app.get("/admin/profiles")
+def list_profiles(limit: int = Query(50, ge=1, le=1000)):
+    _profiles_enabled()
+    return profiling.STORE.list(limit)
+
+
+@app.get("/admin/profiles/{profile_id}")
+def get_profile(profile_id: str, response_format: str = Query("json", alias="format", pattern="^(json|text|pstats)$")):
+    """The stored record (json), a pstats text report (text) or the raw .pstats file (pstats)."""
+    _profiles_enabled()
+    try:
+        if response_format == "text":
+            return Response(content=profiling.STORE.report(profile_id), media_type="text/plain; charset=utf-8")
+        if response_format == "pstats":
+            return FileResponse(
+                profiling.STORE.pstats_path(profile_id), media_type="application/octet-stream",
+                filename=f"{profile_id}.pstats",
+            )
+        return profiling.STORE.get(profile_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+
+# --- Background jobs (large uploads; poll instead of holding the connection) ---
+JOB_QUEUE = JobQueue()
+JOB_RESULT_FILENAMES = {"form_teams": "teams.csv", "model2": "room_allocation.csv", "model3": "predicted_scores.csv"}
+
+
+async def _submit_job(kind, file, params):
+    job = await executors.run_in_thread(JOB_QUEUE.submit, kind, file.file, params)
+    return JSONResponse(job, status_code=202)
+
+
+def _get_job(job_id):
+    job = JOB_QUEUE.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.post("/jobs/form_teams")
+async def submit_form_teams_job(
+    file: UploadFile = File(...),
+    score_threshold: float = Query(300),
+    chunk_size: int = Query(5, ge=1),
+):
+    return await _submit_job("form_teams", file, {"score_threshold": score_threshold, "chunk_size": chunk_size})
+
+
+@app.post("/jobs/model2")
+async def submit_model2_job(
+    file: UploadFile = File(...),
+    no_of_rooms_available: int = Query(...),
+    each_room_capacity: int = Query(...),
+    seats_per_room: Optional[int] = Query(None, ge=1),
+):
+    params = {"num_rooms": no_of_rooms_available, "teams_per_room": each_room_capacity, "seats_per_room": seats_per_room}
+    return await _submit_job("model2", file, params)
+
+
+@app.post("/jobs/model3")
+async def submit_model3_job(file: UploadFile = File(...), chunk_rows: int = Query(CHUNK_ROWS, ge=1)):
+    return await _submit_job("model3", file, {"chunk_rows": chunk_rows})
+
+
+@app.get("/jobs")
+def list_jobs(limit: int = Query(100, ge=1, le=1000)):
+    return {"jobs": JOB_QUEUE.list(limit)}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    return _get_job(job_id)
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    _get_job(job_id)
+    return JOB_QUEUE.cancel(job_id)
+
+
+@app.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    job = _get_job(job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}, no result available")
+    return FileResponse(
+        path=JOB_QUEUE.result_path(job_id),
+        filename=JOB_RESULT_FILENAMES[job["kind"]],
+        media_type="text/csv",
+    )
+
+
+@app.delete("/jobs/{job_id}")
+def delete_job(job_id: str):
+    job = _get_job(job_id)
+    if job["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}; cancel it first")
+    JOB_QUEUE.delete(job_id)
+    return {"deleted": job_id}
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+
+from machine_learning import executors
+from machine_learning.metrics import BATCH_FLUSHES, BATCH_SIZE, BATCH_WAIT_SECONDS
+
+# Opt-in server-side micro-batching for the single-item scoring endpoints:
+#   ML_MICROBATCH=1                 enable (default: off, every call is scored alone)
+#   ML_MICROBATCH_MAX_WAIT_MS=2     longest a request is held for others to join
+#   ML_MICROBATCH_MAX_SIZE=64       a batch starts as soon as this many are waiting
+#
+# Adaptive: with nothing in flight a request is scored at once (no added
+# latency when traffic is light). While a batch is running, new requests
+# queue up and go together when it finishes, when max_size is reached or
+# after max_wait, whichever comes first.
+ENABLED = os.environ.get("ML_MICROBATCH", "0").strip().lower() in ("1", "true", "yes", "on")
+MAX_WAIT_SECONDS = float(os.environ.get("ML_MICROBATCH_MAX_WAIT_MS", "2")) / 1000
+MAX_SIZE = int(os.environ.get("ML_MICROBATCH_MAX_SIZE", "64"))
+
+
+class MicroBatcher:
+    """
+    Collects concurrent submit(item) calls into batches for fn(items) ->
+    results (one per item, same order), run on the executors model pool.
+    Each caller gets its own result, or its own exception: when a batch
+    fails, its items are retried one by one so a bad input only fails its
+    own request.
+    """
+
+    def __init__(self, name, fn, max_size=MAX_SIZE, max_wait=MAX_WAIT_SECONDS):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self.name = name
+        self.fn = fn
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending = []
+        self._timer = None
+        self._in_flight = 0
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_size:
+            self._flush("size")
+        elif self._in_flight == 0:
+            self._flush("idle")
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush, "timer")
+        return await future
+
+    def _flush(self, reason):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        if not batch:
+            return
+        started = time.perf_counter()
+        BATCH_FLUSHES.inc(batcher=self.name, reason=reason)
+        BATCH_SIZE.observe(len(batch), batcher=self.name)
+        for _, _, enqueued in batch:
+            BATCH_WAIT_SECONDS.observe(started - enqueued, batcher=self.name)
+        self._in_flight += 1
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _, _ in batch]
+        try:
+            try:
+                results = await executors.run_model(self.fn, items)
+            except Exception as e:
+                if len(items) == 1:
+                    results = [e]
+                else:
+                    results = await asyncio.gather(
+                        *(self._run_one(item) for item in items), return_exceptions=True
+                    )
+            for (_, future, _), result in zip(batch, results):
+                if future.done():  # the caller went away
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            if self._pending:
+                self._flush("drain")
+
+    async def _run_one(self, item):
+        return (await executors.run_model(self.fn, [item]))[0]
+
+    def info(self):
+        return {"max_size": self.max_size, "max_wait_ms": self.max_wait * 1000, "pending": len(self._pending)}
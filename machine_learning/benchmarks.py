@@ -0,0 +1,361 @@
+"""
+Benchmark harness for every model entry point and its HTTP endpoint.
+
+    python -m machine_learning.benchmarks --sizes 1000 100000 1000000 -o bench.json
+    python -m machine_learning.benchmarks -o new.json --compare bench.json
+
+Inputs come from seeded generators, so two runs at the same sizes and seed
+time exactly the same work. Each result reports latency percentiles,
+throughput (rows or calls per second) and peak traced memory (measured in a
+separate run under tracemalloc so it does not skew the timings).
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.metrics import configure_logging
+from machine_learning.model1.part1 import SKILL_NAMES, evaluate_candidate, evaluate_candidates_csv, parse_skills
+from machine_learning.model1.part2 import form_teams_from_csv, generate_candidates_csv
+from machine_learning.model2.main import allocate_rooms
+from machine_learning.model3.main import MODEL_REGISTRY, get_predictions_csv_path_for, predict_score_from_json
+from machine_learning.model3.parallel import predict_csv_parallel, worker_pool
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+# Per-call benchmarks (one candidate / one request at a time) are capped so
+# the 1M size still finishes; their throughput is per call, not per row.
+MAX_CALLS = 10_000
+MAX_REQUESTS = 500
+REPEATS = 3
+REGRESSION_THRESHOLD = 0.15
+# Peak memory growth below this many MB is noise, whatever the percentage.
+MEMORY_NOISE_MB = 1.0
+TEAMS_PER_ROOM = 6
+EXTRA_TECHS = ["Java", "C", "C++", "Go", "Rust", "Docker", "Kubernetes", "Django", "Spring", "Svelte"]
+
+
+# --- Seeded generators ---
+def _random_stacks(rng, n_rows, vocab, max_techs=8):
+    counts = rng.integers(1, max_techs + 1, size=n_rows)
+    picks = rng.integers(0, len(vocab), size=int(counts.sum()))
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    return [[vocab[j] for j in picks[bounds[i]:bounds[i + 1]]] for i in range(n_rows)]
+
+
+def generate_registrations_csv(n_rows: int, seed: int = 0) -> str:
+    """Candidate registrations: name, tech_stack_used (comma separated)."""
+    rng = np.random.default_rng(seed)
+    stacks = _random_stacks(rng, n_rows, SKILL_NAMES + EXTRA_TECHS)
+    return pd.DataFrame({
+        "name": [f"Candidate_{i}" for i in range(n_rows)],
+        "tech_stack_used": [", ".join(s) for s in stacks],
+    }).to_csv(index=False)
+
+
+def generate_teams_csv(n_rows: int, seed: int = 0) -> str:
+    """Teams for room allocation: team, headcount."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "team": [f"Team_{i}" for i in range(n_rows)],
+        "headcount": rng.integers(1, 6, size=n_rows),
+    }).to_csv(index=False)
+
+
+def generate_tech_stack_csv(n_rows: int, feature_names, seed: int = 0) -> str:
+    """model3 prediction input: Team Name plus one 0/1 column per feature."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.integers(0, 2, size=(n_rows, len(feature_names)), dtype=np.uint8), columns=feature_names)
+    df.insert(0, "Team Name", [f"Team_{i}" for i in range(n_rows)])
+    return df.to_csv(index=False)
+
+
+def generate_tech_stacks(n_rows: int, feature_names, seed: int = 0):
+    """Free-text tech stacks for predict_score_from_json, as typed by users."""
+    rng = np.random.default_rng(seed)
+    vocab = list(feature_names) + [f.lower() for f in feature_names] + EXTRA_TECHS
+    return ["  ".join(s) for s in _random_stacks(rng, n_rows, vocab)]
+
+
+# --- Measurement ---
+def _percentile_ms(durations, q):
+    return round(float(np.percentile(durations, q)) * 1000, 3)
+
+
+def _peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    finally:
+        tracemalloc.stop()
+
+
+def _result(name, kind, rows, durations, units, peak_mb):
+    durations = np.asarray(durations, dtype=float)
+    return {
+        "name": name,
+        "kind": kind,
+        "rows": rows,
+        "runs": len(durations),
+        "mean_ms": round(float(durations.mean()) * 1000, 3),
+        "p50_ms": _percentile_ms(durations, 50),
+        "p95_ms": _percentile_ms(durations, 95),
+        "p99_ms": _percentile_ms(durations, 99),
+        "throughput_per_s": round(units / float(durations.sum()), 1),
+        "peak_mb": peak_mb,
+    }
+
+
+def time_bulk(name, kind, rows, fn, repeats=REPEATS):
+    """Time whole-input calls; latency is per run, throughput is rows per second."""
+    fn()  # warm caches, lazy imports and the model
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return _result(name, kind, rows, durations, rows * repeats, _peak_mb(fn))
+
+
+def time_calls(name, kind, rows, fn, inputs):
+    """Time one call per input; latency is per call, throughput is calls per second."""
+    fn(inputs[0])
+    durations = np.empty(len(inputs))
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        fn(item)
+        durations[i] = time.perf_counter() - start
+    return _result(name, kind, rows, durations, len(inputs), _peak_mb(lambda: [fn(item) for item in inputs]))
+
+
+def _post_ok(client, url, **kwargs):
+    response = client.post(url, **kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f"POST {url} returned {response.status_code}: {response.text[:200]}")
+    return response
+
+
+# --- Benchmarks ---
+def benchmark_model1(n_rows, seed, client=None, repeats=REPEATS, max_calls=MAX_CALLS, max_requests=MAX_REQUESTS):
+    results = []
+    registrations = generate_registrations_csv(n_rows, seed)
+    candidates = generate_candidates_csv(n_rows, seed)
+    reg_df = pd.read_csv(io.StringIO(registrations), dtype=str, keep_default_na=False)
+    pairs = list(zip(reg_df["name"], reg_df["tech_stack_used"]))
+
+    results.append(time_calls(
+        "evaluate_candidate", "function", n_rows,
+        lambda p: evaluate_candidate(p[0], parse_skills(p[1])), pairs[:max_calls],
+    ))
+    results.append(time_bulk("evaluate_candidates_csv", "function", n_rows, lambda: evaluate_candidates_csv(registrations), repeats))
+    results.append(time_bulk("form_teams_from_csv", "function", n_rows, lambda: form_teams_from_csv(candidates), repeats))
+
+    if client is not None:
+        results.append(time_calls(
+            "/model1/evaluate", "endpoint", n_rows,
+            lambda p: _post_ok(client, "/model1/evaluate", json={"name": p[0], "tech_stack_used": p[1]}),
+            pairs[:max_requests],
+        ))
+        results.append(time_bulk(
+            "/model1/evaluate_batch/upload", "endpoint", n_rows,
+            lambda: _post_ok(client, "/model1/evaluate_batch/upload", files={"file": ("candidates.csv", registrations)}),
+            repeats,
+        ))
+        results.append(time_bulk(
+            "/model1/form_teams", "endpoint", n_rows,
+            lambda: _post_ok(client, "/model1/form_teams", files={"file": ("candidate_results.csv", candidates)}),
+            repeats,
+        ))
+    return results
+
+
+def benchmark_model2(n_rows, seed, client=None, repeats=REPEATS):
+    teams = generate_teams_csv(n_rows, seed)
+    teams_df = pd.read_csv(io.StringIO(teams))
+    # ~90% of the teams fit, so the overflow path is exercised too.
+    num_rooms = max(1, int(n_rows * 0.9) // TEAMS_PER_ROOM)
+
+    results = [time_bulk("allocate_rooms", "function", n_rows, lambda: allocate_rooms(teams_df, num_rooms, TEAMS_PER_ROOM), repeats)]
+    if client is not None:
+        url = f"/model2/upload?no_of_rooms_available={num_rooms}&each_room_capacity={TEAMS_PER_ROOM}"
+        results.append(time_bulk(
+            "/model2/upload", "endpoint", n_rows,
+            lambda: _post_ok(client, url, files={"file": ("teams.csv", teams)}),
+            repeats,
+        ))
+    return results
+
+
+def benchmark_model3(n_rows, seed, client=None, repeats=REPEATS, max_calls=MAX_CALLS, max_requests=MAX_REQUESTS):
+    feature_names = MODEL_REGISTRY.get().feature_names
+    stacks = generate_tech_stacks(min(n_rows, max_calls), feature_names, seed)
+    tech_csv = generate_tech_stack_csv(n_rows, feature_names, seed)
+
+    results = [time_calls(
+        "predict_score_from_json", "function", n_rows,
+        lambda s: predict_score_from_json({"team_name": "bench", "tech_stack_used": s}), stacks,
+    )]
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "tech_stacks.csv")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write(tech_csv)
+        results.append(time_bulk(
+            "get_predictions_csv_path_for", "function", n_rows,
+            lambda: get_predictions_csv_path_for(input_path, os.path.join(tmp, "predicted_scores.csv")),
+            repeats,
+        ))
+        # One warm pool for every repeat, so process start-up is not what gets timed.
+        workers = os.cpu_count() or 1
+        with worker_pool(workers) as pool:
+            results.append(time_bulk(
+                f"predict_csv_parallel[{workers}]", "function", n_rows,
+                lambda: predict_csv_parallel(
+                    input_path, os.path.join(tmp, "predicted_scores.csv"), workers=workers, executor=pool,
+                ),
+                repeats,
+            ))
+
+    if client is not None:
+        results.append(time_calls(
+            "/model3/predict", "endpoint", n_rows,
+            lambda s: _post_ok(client, "/model3/predict", json={"team_name": "bench", "tech_stack_used": s}),
+            stacks[:max_requests],
+        ))
+        results.append(time_bulk(
+            "/model3/upload", "endpoint", n_rows,
+            lambda: _post_ok(client, "/model3/upload", files={"file": ("tech_stacks.csv", tech_csv)}),
+            repeats,
+        ))
+    return results
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(sizes=DEFAULT_SIZES, seed=0, endpoints=True, repeats=REPEATS, only=None):
+    """Run every benchmark at every size. Returns the JSON-serializable report."""
+    client = None
+    if endpoints:
+        from fastapi.testclient import TestClient
+
+        from machine_learning.app import RESULT_CACHE, app
+
+        # Re-uploads are identical across repeats; measure the work, not the cache.
+        RESULT_CACHE.max_bytes = 0
+        client = TestClient(app)
+        client.__enter__()
+
+    suites = [("model1", benchmark_model1), ("model2", benchmark_model2), ("model3", benchmark_model3)]
+    results = []
+    try:
+        for n_rows in sizes:
+            for suite, fn in suites:
+                if only and suite not in only:
+                    continue
+                if suite == "model3" and not MODEL_REGISTRY.available():
+                    print(f"Skipping model3 benchmarks: no model artifact at {MODEL_REGISTRY.artifact_paths()[0]}", file=sys.stderr)
+                    continue
+                for result in fn(n_rows, seed, client=client, repeats=repeats):
+                    print(
+                        f"{result['kind']:8} {result['name']:32} rows={result['rows']:>9}  "
+                        f"p50={result['p50_ms']:>10.3f}ms  p95={result['p95_ms']:>10.3f}ms  "
+                        f"{result['throughput_per_s']:>12.1f}/s  peak={result['peak_mb']:>8.2f}MB",
+                        file=sys.stderr,
+                    )
+                    results.append(result)
+    finally:
+        if client is not None:
+            client.__exit__(None, None, None)
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "sizes": list(sizes),
+            "seed": seed,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Match results by (name, kind, rows) and flag any whose p50 latency or
+    peak memory grew by more than `threshold` (a fraction) over the baseline.
+    Memory growth under MEMORY_NOISE_MB is never flagged.
+    """
+    base = {(r["name"], r["kind"], r["rows"]): r for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base.get((r["name"], r["kind"], r["rows"]))
+        if b is None:
+            continue
+        p50_change = r["p50_ms"] / b["p50_ms"] - 1 if b["p50_ms"] else 0.0
+        mem_change = r["peak_mb"] / b["peak_mb"] - 1 if b["peak_mb"] else 0.0
+        rows.append({
+            "name": r["name"],
+            "kind": r["kind"],
+            "rows": r["rows"],
+            "p50_ms": (b["p50_ms"], r["p50_ms"]),
+            "p50_change": round(p50_change, 3),
+            "peak_mb": (b["peak_mb"], r["peak_mb"]),
+            "peak_change": round(mem_change, 3),
+            "regression": p50_change > threshold
+            or (mem_change > threshold and r["peak_mb"] - b["peak_mb"] > MEMORY_NOISE_MB),
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the model entry points and HTTP endpoints")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Input rows per benchmark (default: 1k 100k 1M)")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help=f"Timed runs per bulk benchmark (default: {REPEATS})")
+    parser.add_argument("--only", nargs="+", choices=["model1", "model2", "model3"], help="Run only these suites")
+    parser.add_argument("--no-endpoints", action="store_true", help="Skip the FastAPI test client benchmarks")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Regression threshold as a fraction (default: 0.15)")
+    args = parser.parse_args()
+
+    # Per-stage logs (and the deliberate room overflow) would drown the results table.
+    configure_logging("ERROR")
+    report = run(args.sizes, args.seed, endpoints=not args.no_endpoints, repeats=args.repeats, only=args.only)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Benchmark report saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = 0
+        for row in compare(baseline, report, args.threshold):
+            flag = "REGRESSION" if row["regression"] else "ok"
+            regressions += row["regression"]
+            print(
+                f"{flag:10} {row['kind']:8} {row['name']:32} rows={row['rows']:>9}  "
+                f"p50 {row['p50_ms'][0]:.3f} -> {row['p50_ms'][1]:.3f}ms ({row['p50_change']:+.1%})  "
+                f"peak {row['peak_mb'][0]:.2f} -> {row['peak_mb'][1]:.2f}MB ({row['peak_change']:+.1%})"
+            )
+        sys.exit(1 if regressions else 0)
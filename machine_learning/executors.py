@@ -0,0 +1,98 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from machine_learning import metrics, profiling
+
+# Where CPU-bound model work runs, so it never blocks the event loop:
+#   ML_EXECUTOR=thread (default) or process, ML_WORKERS=<n> (default: CPU count).
+# A process pool sidesteps the GIL for pandas-heavy work at the cost of
+# pickling arguments and results; work that needs this process's state
+# (sessions, open upload streams) always uses the thread pool.
+EXECUTOR_KIND = os.environ.get("ML_EXECUTOR", "thread").strip().lower()
+WORKERS = int(os.environ.get("ML_WORKERS", "0")) or (os.cpu_count() or 1)
+
+if EXECUTOR_KIND not in ("thread", "process"):
+    raise ValueError(f"ML_EXECUTOR must be 'thread' or 'process', got {EXECUTOR_KIND!r}")
+
+_lock = threading.Lock()
+_thread_executor = None
+_process_executor = None
+
+
+def _warm_worker(log_level):
+    from machine_learning.model3.main import MODEL_REGISTRY
+
+    metrics.configure_logging(log_level)
+
+    if MODEL_REGISTRY.available():
+        MODEL_REGISTRY.warmup()
+
+
+def thread_executor():
+    global _thread_executor
+    with _lock:
+        if _thread_executor is None:
+            _thread_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="ml-model")
+        return _thread_executor
+
+
+def model_executor():
+    global _process_executor
+    if EXECUTOR_KIND == "thread":
+        return thread_executor()
+    with _lock:
+        if _process_executor is None:
+            _process_executor = ProcessPoolExecutor(
+                max_workers=WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+                initargs=(metrics.log_level(),),
+            )
+        return _process_executor
+
+
+async def run_model(fn, *args, **kwargs):
+    """Run a picklable model function on the configured thread/process pool."""
+    call = partial(fn, *args, **kwargs)
+    profile = profiling.current()
+    if profile is not None:
+        if EXECUTOR_KIND == "process":
+            result, stats = await asyncio.get_running_loop().run_in_executor(
+                model_executor(), partial(profiling.profile_in_process, call)
+            )
+            profile.add(stats)
+            return result
+        call = partial(profile.call, call)
+    return await asyncio.get_running_loop().run_in_executor(model_executor(), call)
+
+
+async def run_in_thread(fn, *args, **kwargs):
+    """Run fn on the model thread pool (for work tied to this process's state)."""
+    call = partial(fn, *args, **kwargs)
+    profile = profiling.current()
+    if profile is not None:
+        call = partial(profile.call, call)
+    return await asyncio.get_running_loop().run_in_executor(thread_executor(), call)
+
+
+async def iterate_in_thread(iterator):
+    """Drive a blocking iterator from the model thread pool, yielding its items."""
+    done = object()
+    while True:
+        item = await run_in_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def shutdown():
+    global _thread_executor, _process_executor
+    with _lock:
+        for executor in (_thread_executor, _process_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        _thread_executor = _process_executor = None
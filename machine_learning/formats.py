@@ -0,0 +1,141 @@
+import io
+import os
+
+import pandas as pd
+
+# Tabular wire formats for the upload endpoints. CSV is the default and needs
+# nothing extra; Parquet and Arrow IPC (stream or file) need pyarrow, which is
+# optional: without it those formats are rejected with a clear error.
+#
+# Input format comes from the upload's content type or file extension, output
+# format from an explicit ?format= or the Accept header. Arrow/Parquet input
+# is handed to pandas without a text parse; numeric columns without nulls are
+# converted zero-copy (split_blocks avoids consolidating them into one block).
+
+FORMATS = ("csv", "parquet", "arrow")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+_MEDIA_ALIASES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/parquet": "parquet",
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.arrow.file": "arrow",
+    "application/x-arrow": "arrow",
+}
+_EXTENSION_ALIASES = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".arrows": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+_ARROW_FILE_MAGIC = b"ARROW1"
+
+
+class FormatUnavailable(RuntimeError):
+    """The requested format needs pyarrow, which is not installed."""
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise FormatUnavailable("Parquet and Arrow I/O need pyarrow (pip install pyarrow); use CSV instead") from e
+    return pa
+
+
+def ensure_available(fmt):
+    """Raise FormatUnavailable when fmt cannot be read or written in this environment."""
+    if fmt != "csv":
+        _pyarrow()
+
+
+def _media_type(value):
+    return (value or "").split(";")[0].strip().lower()
+
+
+def input_format(content_type=None, filename=None):
+    """Format of an upload: its content type if it names one, else its extension, else CSV."""
+    fmt = _MEDIA_ALIASES.get(_media_type(content_type))
+    if fmt is None and filename:
+        fmt = _EXTENSION_ALIASES.get(os.path.splitext(filename)[1].lower())
+    return fmt or "csv"
+
+
+def output_format(accept=None, requested=None):
+    """
+    Response format: an explicit `requested` name wins, then the first
+    supported media type in Accept (by q-value, then order). Falls back to
+    CSV; raises ValueError for an unknown explicit name.
+    """
+    if requested:
+        requested = requested.strip().lower()
+        if requested not in FORMATS:
+            raise ValueError(f"Unknown format {requested!r}; expected one of {', '.join(FORMATS)}")
+        return requested
+    ranked = []
+    for i, part in enumerate((accept or "").split(",")):
+        media, *options = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for option in options:
+            if option.startswith("q="):
+                try:
+                    q = float(option[2:])
+                except ValueError:
+                    q = 0.0
+        fmt = _MEDIA_ALIASES.get(media.lower())
+        if fmt is not None and q > 0:
+            ranked.append((-q, i, fmt))
+    return min(ranked)[2] if ranked else "csv"
+
+
+def read_frame(data, fmt):
+    """DataFrame from uploaded bytes in the given format."""
+    if fmt == "csv":
+        return pd.read_csv(io.BytesIO(data))
+    pa = _pyarrow()
+    buffer = pa.py_buffer(data)
+    if fmt == "parquet":
+        table = pa.parquet.read_table(pa.BufferReader(buffer))
+    elif fmt == "arrow":
+        # IPC file format starts with its magic; anything else is the stream format.
+        if bytes(data[:6]) == _ARROW_FILE_MAGIC:
+            table = pa.ipc.open_file(buffer).read_all()
+        else:
+            table = pa.ipc.open_stream(buffer).read_all()
+    else:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def write_frame(df, fmt):
+    """Serialize df (without its index) to bytes in the given format."""
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if fmt == "parquet":
+        pa.parquet.write_table(table, sink)
+    elif fmt == "arrow":
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return sink.getvalue().to_pybytes()
+
+
+def attachment_name(stem, fmt):
+    return stem + EXTENSIONS[fmt]
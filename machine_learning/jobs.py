@@ -0,0 +1,382 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+# Background jobs for uploads too large to compute inside one HTTP request.
+# Job state lives in SQLite (shared by the API process and the worker
+# processes); each job's input and result files live in JOBS_DIR/<job_id>/.
+#
+# Several API workers can share one JOBS_DIR (uvicorn --workers N): each job
+# records the API process that owns its pool, and only jobs whose owner is
+# gone are failed as interrupted. Cancels are seen by the job itself through
+# its progress reports, so they work whichever worker receives them.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JOBS_DIR = os.environ.get("ML_JOBS_DIR", os.path.join(BASE_DIR, "jobs"))
+JOB_WORKERS = int(os.environ.get("ML_JOB_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 2)
+JOB_TTL_SECONDS = float(os.environ.get("ML_JOB_TTL_SECONDS", str(24 * 3600)))
+
+JOB_KINDS = ("form_teams", "model2", "model3")
+ACTIVE_STATES = ("queued", "running")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result_meta TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT
+)
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _process_token(pid):
+    """
+    "<pid>:<start time>" for a live process, None when it is gone. The start
+    time tells a restarted server apart from an old one that had the same pid.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii") as f:
+            # Field 22 (starttime) follows the parenthesized command name.
+            return f"{pid}:{f.read().rsplit(')', 1)[1].split()[19]}"
+    except FileNotFoundError:
+        return None
+    except OSError:  # no /proc: fall back to a liveness check on the pid alone
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return None
+        except PermissionError:
+            pass
+        return str(pid)
+
+
+def _owner_alive(owner):
+    if not owner:
+        return False
+    return _process_token(int(owner.split(":")[0])) == owner
+
+
+def _job_dir(jobs_dir, job_id):
+    return os.path.join(jobs_dir, job_id)
+
+
+def _set_progress(conn, job_id, progress):
+    """Record progress and report whether a cancel was requested meanwhile."""
+    conn.execute("UPDATE jobs SET progress = ? WHERE job_id = ?", (progress, job_id))
+    row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if row is None or row["cancel_requested"]:
+        raise JobCancelled()
+
+
+def _run_form_teams(input_path, output_path, params, report):
+    from machine_learning.model1.part2 import form_teams_from_csv
+
+    with open(input_path, encoding="utf-8") as f:
+        teams_csv = form_teams_from_csv(f.read(), params["score_threshold"], params["chunk_size"])
+    report(0.9)
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        f.write(teams_csv)
+    return {}
+
+
+def _run_model2(input_path, output_path, params, report):
+    from machine_learning.model2.main import allocate_rooms_bytes
+
+    with open(input_path, "rb") as f:
+        allocation_csv, overflow = allocate_rooms_bytes(
+            f.read(), params["num_rooms"], params["teams_per_room"], params.get("seats_per_room")
+        )
+    report(0.9)
+    with open(output_path, "wb") as f:
+        f.write(allocation_csv)
+    return {"overflow": overflow}
+
+
+def _run_model3(input_path, output_path, params, report):
+    from machine_learning.model3.main import iter_predict_csv
+
+    size = max(os.path.getsize(input_path), 1)
+    with open(input_path, "rb") as src, open(output_path, "wb") as out:
+        for chunk in iter_predict_csv(src, params["chunk_rows"]):
+            out.write(chunk)
+            # The parser reads ahead, so the file position is a close upper bound.
+            report(min(src.tell() / size, 0.99))
+    return {}
+
+
+_RUNNERS = {"form_teams": _run_form_teams, "model2": _run_model2, "model3": _run_model3}
+
+
+def _finish(conn, job_id, status, error=None, result_meta=None):
+    """Move a running job to a terminal status. Returns False when it was no longer running."""
+    cur = conn.execute(
+        "UPDATE jobs SET status = ?, error = ?, result_meta = ?, finished_at = ? "
+        "WHERE job_id = ? AND status = 'running'",
+        (status, error, result_meta, time.time(), job_id),
+    )
+    if cur.rowcount == 0:
+        from machine_learning.metrics import log_event
+
+        log_event("job_outcome_discarded", job_id=job_id, status=status)
+        return False
+    return True
+
+
+def run_job(db_path, jobs_dir, job_id, log_level=None):
+    """
+    Worker-process entry point: run one job and record its outcome in SQLite.
+    log_level is the submitting process's (see metrics.log_level).
+    """
+    from machine_learning.metrics import configure_logging
+
+    configure_logging(log_level)
+    conn = _connect(db_path)
+    try:
+        cur = conn.execute(
+            "UPDATE jobs SET status = 'running', started_at = ? "
+            "WHERE job_id = ? AND status = 'queued' AND cancel_requested = 0",
+            (time.time(), job_id),
+        )
+        if cur.rowcount == 0:
+            # Cancelled while queued, possibly through another API worker.
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE job_id = ? AND status = 'queued' AND cancel_requested = 1",
+                (time.time(), job_id),
+            )
+            return
+        row = conn.execute("SELECT kind, params FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        job_dir = _job_dir(jobs_dir, job_id)
+        output_path = os.path.join(job_dir, "result.csv")
+        tmp_path = output_path + ".tmp"
+        try:
+            meta = _RUNNERS[row["kind"]](
+                os.path.join(job_dir, "input.csv"),
+                tmp_path,
+                json.loads(row["params"]),
+                lambda progress: _set_progress(conn, job_id, progress),
+            )
+            _set_progress(conn, job_id, 1.0)
+            os.replace(tmp_path, output_path)
+            # Only a job still running may finish: one already failed as
+            # interrupted or cancelled keeps that outcome.
+            if not _finish(conn, job_id, "done", result_meta=json.dumps(meta)):
+                os.remove(output_path)
+        except JobCancelled:
+            _finish(conn, job_id, "cancelled")
+        except Exception as e:
+            _finish(conn, job_id, "failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    """
+    Submit/status/cancel/result bookkeeping for background jobs. Jobs run on
+    a dedicated process pool, separate from the executors pool that serves
+    interactive requests, so a large batch never starves them. Finished jobs
+    are removed JOB_TTL_SECONDS after they finish.
+    """
+
+    def __init__(self, jobs_dir=JOBS_DIR, workers=JOB_WORKERS, ttl_seconds=JOB_TTL_SECONDS):
+        self.jobs_dir = jobs_dir
+        self.db_path = os.path.join(jobs_dir, "jobs.sqlite3")
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._owner = None
+
+    def _conn(self):
+        if not self._started:
+            self.start()
+        return _connect(self.db_path)
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            conn = _connect(self.db_path)
+            try:
+                conn.execute(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+                if "owner" not in columns:  # databases created before jobs had owners
+                    conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            finally:
+                conn.close()
+            self._owner = _process_token(os.getpid())
+            self._started = True
+        self.recover_orphans()
+
+    def recover_orphans(self):
+        """
+        Fail the queued/running jobs whose owning API process is gone (their
+        pool went with it). Jobs of live sibling workers are left alone.
+        Returns how many were failed.
+        """
+        conn = self._conn()
+        try:
+            rows = conn.execute(
+                "SELECT job_id, owner FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            orphans = [row["job_id"] for row in rows if not _owner_alive(row["owner"])]
+            for job_id in orphans:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Interrupted by server restart', finished_at = ? "
+                    "WHERE job_id = ? AND status IN ('queued', 'running')",
+                    (time.time(), job_id),
+                )
+        finally:
+            conn.close()
+        return len(orphans)
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, kind, input_stream, params):
+        """Copy input_stream into the job directory and queue it. Returns the job's status dict."""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind {kind!r}; expected one of {', '.join(JOB_KINDS)}")
+        self.cleanup_expired()
+
+        job_id = uuid.uuid4().hex
+        job_dir = _job_dir(self.jobs_dir, job_id)
+        os.makedirs(job_dir)
+        with open(os.path.join(job_dir, "input.csv"), "wb") as f:
+            shutil.copyfileobj(input_stream, f, 1 << 20)
+
+        conn = self._conn()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, params, status, created_at, owner) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params), time.time(), self._owner),
+            )
+        finally:
+            conn.close()
+
+        from machine_learning.metrics import log_level
+
+        future = self._pool().submit(run_job, self.db_path, self.jobs_dir, job_id, log_level())
+        self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._futures.pop(job_id, None))
+        return self.get(job_id)
+
+    def get(self, job_id):
+        conn = self._conn()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result_meta"] = json.loads(job["result_meta"]) if job["result_meta"] else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        if job["finished_at"] is not None:
+            job["expires_at"] = job["finished_at"] + self.ttl_seconds
+        return job
+
+    def list(self, limit=100):
+        conn = self._conn()
+        try:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [job for job in (self.get(row["job_id"]) for row in rows) if job is not None]
+
+    def cancel(self, job_id):
+        """
+        Request cancellation. Queued jobs never start; running model3 jobs stop
+        at the next chunk, other running jobs are discarded when their step ends.
+        The job notices the request itself, so this works for jobs owned by
+        another API worker too; until it does, the returned status is still
+        queued/running with cancel_requested set.
+        """
+        conn = self._conn()
+        try:
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN ('queued', 'running')",
+                (job_id,),
+            )
+            future = self._futures.get(job_id)
+            if future is not None and future.cancel():
+                conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'queued'",
+                    (time.time(), job_id),
+                )
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def result_path(self, job_id):
+        return os.path.join(_job_dir(self.jobs_dir, job_id), "result.csv")
+
+    def delete(self, job_id):
+        conn = self._conn()
+        try:
+            conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        finally:
+            conn.close()
+        shutil.rmtree(_job_dir(self.jobs_dir, job_id), ignore_errors=True)
+
+    def cleanup_expired(self, now=None):
+        """
+        Delete finished jobs (and their files) older than the TTL, and fail
+        jobs orphaned by a dead worker. Returns how many were removed.
+        """
+        self.recover_orphans()
+        cutoff = (now or time.time()) - self.ttl_seconds
+        conn = self._conn()
+        try:
+            rows = conn.execute(
+                "SELECT job_id FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,)
+            ).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self.delete(row["job_id"])
+        return len(rows)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
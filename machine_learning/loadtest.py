@@ -0,0 +1,424 @@
+"""
+Load-testing harness: replays hackathon-like mixed traffic against the API.
+
+    python -m machine_learning.loadtest --mix registration --profile ramp --rate 100 --duration 30
+    python -m machine_learning.loadtest --spawn --workers 4 --mix mixed -o load.json
+    python -m machine_learning.loadtest --url http://127.0.0.1:8000 --pid 1234 --mix submission
+
+Traffic is open-loop: arrivals follow a seeded Poisson process whose rate is
+--rate scaled by the ramp profile, and each arrival picks a route from the
+traffic mix. Latency is measured from the scheduled arrival, so time spent
+queued behind --max-in-flight counts (no coordinated omission). Payloads
+come from the benchmarks generators and are built before the clock starts.
+
+Targets: in-process (default; the app and the generator share one event
+loop, good for quick checks), a uvicorn started with --spawn (what to use
+for sizing workers), or any --url. Worker RSS is sampled from /proc for the
+in-process run, the spawned server and its workers, or --pid.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from machine_learning.benchmarks import (
+    generate_registrations_csv,
+    generate_teams_csv,
+    generate_tech_stack_csv,
+    generate_tech_stacks,
+)
+from machine_learning.model1.part1 import SKILL_NAMES
+from machine_learning.model1.part2 import generate_candidates_csv
+
+ROUTES = {
+    "model1_evaluate": ("POST", "/model1/evaluate"),
+    "model3_predict": ("POST", "/model3/predict"),
+    "model1_form_teams": ("POST", "/model1/form_teams"),
+    "model2_upload": ("POST", "/model2/upload"),
+    "model3_upload": ("POST", "/model3/upload"),
+    "model1_evaluate_batch": ("POST", "/model1/evaluate_batch/upload"),
+}
+
+# Route weights; they do not need to sum to 1.
+MIXES = {
+    # Registration window: a flood of single evaluations, the odd team formation run.
+    "registration": {"model1_evaluate": 85, "model3_predict": 8, "model1_evaluate_batch": 2, "model1_form_teams": 5},
+    # Submission window: teams checking their score, organizers scoring and seating.
+    "submission": {"model3_predict": 80, "model1_evaluate": 5, "model3_upload": 10, "model2_upload": 5},
+    "mixed": {
+        "model1_evaluate": 45, "model3_predict": 45,
+        "model1_form_teams": 4, "model2_upload": 3, "model3_upload": 3,
+    },
+    "small": {"model1_evaluate": 50, "model3_predict": 50},
+    "uploads": {"model1_form_teams": 1, "model2_upload": 1, "model3_upload": 1, "model1_evaluate_batch": 1},
+}
+
+
+# Rate multiplier (0..1) at fraction x of the run.
+def _constant(x):
+    return 1.0
+
+
+def _ramp(x):
+    return max(x, 0.02)
+
+
+def _step(x):
+    return min(int(x * 4) + 1, 4) / 4
+
+
+def _spike(x):
+    return 1.0 if 0.4 <= x < 0.6 else 0.3
+
+
+PROFILES = {"constant": _constant, "ramp": _ramp, "step": _step, "spike": _spike}
+
+DEFAULT_RATE = 50.0
+DEFAULT_DURATION = 20.0
+MAX_IN_FLIGHT = 256
+PAYLOAD_POOL = 256
+UPLOAD_POOL = 4
+UPLOAD_ROWS = 10_000
+RSS_INTERVAL = 0.25
+REQUEST_TIMEOUT = 60.0
+
+
+def parse_mix(spec):
+    """A MIXES name or "route=weight,route=weight"."""
+    if spec in MIXES:
+        return dict(MIXES[spec])
+    mix = {}
+    for part in spec.split(","):
+        route, _, weight = part.partition("=")
+        route = route.strip()
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route {route!r}; expected one of {', '.join(ROUTES)} or a mix: {', '.join(MIXES)}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def build_schedule(mix, rate, duration, profile="constant", seed=0):
+    """[(seconds from start, route)] for a thinned Poisson process peaking at `rate` requests/s."""
+    rng = np.random.default_rng(seed)
+    shape = PROFILES[profile]
+    routes = list(mix)
+    weights = np.array([mix[r] for r in routes], dtype=float)
+    weights /= weights.sum()
+    schedule = []
+    t = 0.0
+    while True:
+        t += rng.exponential(1.0 / rate)
+        if t >= duration:
+            break
+        if rng.random() < shape(t / duration):
+            schedule.append((t, routes[rng.choice(len(routes), p=weights)]))
+    return schedule
+
+
+def build_payloads(mix, feature_names, seed=0, pool=PAYLOAD_POOL, uploads=UPLOAD_POOL, upload_rows=UPLOAD_ROWS):
+    """Request kwargs per route: `pool` small JSON bodies or `uploads` distinct uploads each."""
+    payloads = {}
+    for i, route in enumerate(mix):
+        s = seed * 1000 + i
+        if route == "model1_evaluate":
+            stacks = generate_tech_stacks(pool, SKILL_NAMES, s)
+            payloads[route] = [{"json": {"name": f"Candidate_{j}", "tech_stack_used": st}} for j, st in enumerate(stacks)]
+        elif route == "model3_predict":
+            stacks = generate_tech_stacks(pool, feature_names, s)
+            payloads[route] = [{"json": {"team_name": f"Team_{j}", "tech_stack_used": st}} for j, st in enumerate(stacks)]
+        elif route == "model1_form_teams":
+            payloads[route] = [
+                {"files": {"file": ("candidate_results.csv", generate_candidates_csv(upload_rows, s + j))}}
+                for j in range(uploads)
+            ]
+        elif route == "model2_upload":
+            params = {"no_of_rooms_available": max(upload_rows // 6, 1), "each_room_capacity": 6}
+            payloads[route] = [
+                {"files": {"file": ("teams.csv", generate_teams_csv(upload_rows, s + j))}, "params": params}
+                for j in range(uploads)
+            ]
+        elif route == "model3_upload":
+            payloads[route] = [
+                {"files": {"file": ("tech_stacks.csv", generate_tech_stack_csv(upload_rows, feature_names, s + j))}}
+                for j in range(uploads)
+            ]
+        elif route == "model1_evaluate_batch":
+            payloads[route] = [
+                {"files": {"file": ("registrations.csv", generate_registrations_csv(upload_rows, s + j))}}
+                for j in range(uploads)
+            ]
+    return payloads
+
+
+# --- RSS sampling (Linux /proc) ---
+def _rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _process_tree(pid):
+    pids, todo = [], [pid]
+    while todo:
+        current = todo.pop()
+        pids.append(current)
+        try:
+            with open(f"/proc/{current}/task/{current}/children", encoding="ascii") as f:
+                todo.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+async def _sample_rss(root_pids, peaks, last, stop):
+    while True:
+        for root in root_pids:
+            for pid in _process_tree(root):
+                rss = _rss_mb(pid)
+                if rss is not None:
+                    peaks[pid] = max(peaks.get(pid, 0.0), rss)
+                    last[pid] = rss
+        if stop.is_set():
+            return
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop.wait(), RSS_INTERVAL)
+
+
+# --- Running ---
+async def _drive(client, schedule, payloads, max_in_flight):
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max_in_flight)
+    records = []
+    counters = {route: 0 for route in payloads}
+
+    async def fire(scheduled_at, route, kwargs):
+        method, path = ROUTES[route]
+        async with semaphore:
+            sent_at = loop.time()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = str(response.status_code)
+                await response.aclose()
+            except Exception as e:
+                status = f"error:{type(e).__name__}"
+        done_at = loop.time()
+        records.append((route, status, done_at - scheduled_at, done_at - sent_at))
+
+    start = loop.time()
+    tasks = []
+    for offset, route in schedule:
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pool = payloads[route]
+        kwargs = pool[counters[route] % len(pool)]
+        counters[route] += 1
+        tasks.append(asyncio.create_task(fire(start + offset, route, kwargs)))
+    await asyncio.gather(*tasks)
+    return records, loop.time() - start
+
+
+def _percentiles(values):
+    values = np.asarray(values, dtype=float) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p90_ms": round(float(np.percentile(values, 90)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def summarize(records, elapsed):
+    routes = {}
+    for route in sorted({r[0] for r in records}):
+        rows = [r for r in records if r[0] == route]
+        statuses = {}
+        for _, status, _, _ in rows:
+            statuses[status] = statuses.get(status, 0) + 1
+        errors = sum(n for status, n in statuses.items() if not status.startswith(("2", "3")))
+        routes[route] = {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            **_percentiles([r[2] for r in rows]),
+            "service_p50_ms": _percentiles([r[3] for r in rows])["p50_ms"],
+            "statuses": statuses,
+        }
+    total_errors = sum(r["errors"] for r in routes.values())
+    return {
+        "requests": len(records),
+        "errors": total_errors,
+        "error_rate": round(total_errors / len(records), 4) if records else 0.0,
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed else 0.0,
+        "elapsed_s": round(elapsed, 3),
+        **(_percentiles([r[2] for r in records]) if records else {}),
+        "routes": routes,
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def spawn_server(workers=1, port=None, env=None, ready_timeout=120.0):
+    """
+    Start `uvicorn machine_learning.app:app` with `workers` workers and the
+    result cache off (every request does its work), wait for /readyz, yield
+    (base_url, pid), then stop it.
+    """
+    import httpx
+
+    port = port or _free_port()
+    server_env = {"ML_CACHE_MAX_BYTES": "0", "ML_LOG_LEVEL": "WARNING", **os.environ, **(env or {})}
+    cmd = [
+        sys.executable, "-m", "uvicorn", "machine_learning.app:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ]
+    process = subprocess.Popen(cmd, env=server_env)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode} before becoming ready")
+            try:
+                if httpx.get(base_url + "/readyz", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"uvicorn was not ready after {ready_timeout:.0f}s (is the model3 artifact built?)")
+            time.sleep(0.25)
+        yield base_url, process.pid
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run(mix="mixed", rate=DEFAULT_RATE, duration=DEFAULT_DURATION, profile="constant", seed=0,
+              url=None, pids=None, max_in_flight=MAX_IN_FLIGHT, upload_rows=UPLOAD_ROWS, timeout=REQUEST_TIMEOUT):
+    """
+    Replay one traffic mix. With no url the app runs in this process (its
+    lifespan included, result cache off). Returns the JSON-serializable report.
+    """
+    import httpx
+
+    mix = parse_mix(mix) if isinstance(mix, str) else dict(mix)
+    schedule = build_schedule(mix, rate, duration, profile, seed)
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+
+    async with contextlib.AsyncExitStack() as stack:
+        if url is None:
+            from machine_learning.app import RESULT_CACHE, app
+
+            RESULT_CACHE.max_bytes = 0
+            await stack.enter_async_context(app.router.lifespan_context(app))
+            transport = httpx.ASGITransport(app=app)
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout)
+            )
+            pids = [os.getpid()]
+        else:
+            client = await stack.enter_async_context(httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits))
+
+        info = await client.get("/model3/info")
+        feature_names = info.json().get("feature_names") if info.status_code == 200 else None
+        if feature_names is None and {"model3_predict", "model3_upload"} & set(mix):
+            raise RuntimeError("model3 is not loaded on the target; build it first (python -m machine_learning.model3.build)")
+        payloads = build_payloads(mix, feature_names, seed, upload_rows=upload_rows)
+
+        peaks, last, stop = {}, {}, asyncio.Event()
+        sampler = asyncio.create_task(_sample_rss(pids or [], peaks, last, stop))
+        try:
+            records, elapsed = await _drive(client, schedule, payloads, max_in_flight)
+        finally:
+            stop.set()
+            await sampler
+
+    report = summarize(records, elapsed)
+    report["config"] = {
+        "mix": mix, "rate": rate, "duration": duration, "profile": profile, "seed": seed,
+        "target": url or "in-process", "max_in_flight": max_in_flight, "upload_rows": upload_rows,
+        "scheduled": len(schedule),
+    }
+    report["rss_mb"] = {
+        str(pid): {"peak": round(peaks[pid], 1), "last": round(last[pid], 1)} for pid in sorted(peaks)
+    }
+    report["rss_peak_total_mb"] = round(sum(peaks.values()), 1)
+    report["machine"] = {"python": platform.python_version(), "cpus": os.cpu_count()}
+    return report
+
+
+def print_report(report):
+    cfg = report["config"]
+    print(f"{cfg['target']}  mix={','.join(cfg['mix'])}  profile={cfg['profile']}  rate={cfg['rate']}/s  "
+          f"duration={cfg['duration']}s")
+    print(f"{'route':<24}{'reqs':>7}{'rps':>9}{'err%':>7}{'p50ms':>10}{'p90ms':>10}{'p99ms':>10}{'maxms':>10}")
+    for route, r in report["routes"].items():
+        print(f"{route:<24}{r['requests']:>7}{r['throughput_rps']:>9.1f}{r['error_rate'] * 100:>7.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}")
+    print(f"{'total':<24}{report['requests']:>7}{report['throughput_rps']:>9.1f}{report['error_rate'] * 100:>7.1f}"
+          f"{report.get('p50_ms', 0):>10.1f}{report.get('p90_ms', 0):>10.1f}{report.get('p99_ms', 0):>10.1f}"
+          f"{report.get('max_ms', 0):>10.1f}")
+    for pid, rss in report["rss_mb"].items():
+        print(f"rss pid {pid}: peak {rss['peak']} MB, last {rss['last']} MB")
+
+
+if __name__ == "__main__":
+    from machine_learning.metrics import configure_logging
+
+    parser = argparse.ArgumentParser(description="Replay mixed hackathon traffic against the API")
+    parser.add_argument("--mix", default="mixed", help=f"One of {', '.join(MIXES)} or route=weight,... ({', '.join(ROUTES)})")
+    parser.add_argument("--profile", choices=PROFILES, default="constant", help="Ramp profile applied to --rate")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="Peak arrival rate (requests/s)")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Seconds of traffic")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT, help="Concurrent requests cap")
+    parser.add_argument("--upload-rows", type=int, default=UPLOAD_ROWS, help="Rows per generated upload")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-request timeout (s)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", help="Target a running server instead of the in-process app")
+    target.add_argument("--spawn", action="store_true", help="Start a local uvicorn for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    parser.add_argument("--pid", type=int, action="append", help="Server pid to sample RSS from with --url (repeatable)")
+    parser.add_argument("-o", "--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    configure_logging("ERROR")
+    options = dict(
+        mix=args.mix, rate=args.rate, duration=args.duration, profile=args.profile, seed=args.seed,
+        max_in_flight=args.max_in_flight, upload_rows=args.upload_rows, timeout=args.timeout,
+    )
+    if args.spawn:
+        with spawn_server(args.workers) as (base_url, pid):
+            result = asyncio.run(run(url=base_url, pids=[pid], **options))
+        result["config"]["workers"] = args.workers
+    else:
+        result = asyncio.run(run(url=args.url, pids=args.pid, **options))
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Load test report saved to {args.output}")
+    sys.exit(1 if result["requests"] == 0 else 0)
@@ -0,0 +1,254 @@
+"""
+In-process metrics (Prometheus text format) and structured timing logs.
+
+Counters and histograms live in REGISTRY and are rendered by GET /metrics.
+stage() times one step of a model pipeline (parse, model_load, featurize,
+predict, serialize, ...), records it in ml_stage_duration_seconds and logs
+it as one JSON line on the "machine_learning" logger. Work that runs in
+process-pool workers (ML_EXECUTOR=process, background jobs) logs its stages
+but is not aggregated into this process's /metrics.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger("machine_learning")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BYTES_BUCKETS = tuple(float(1 << p) for p in (10, 14, 17, 20, 23, 26, 29, 32))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((k, labels[k]) for k in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    out.append((self.name + "_bucket", key + (("le", _format_value(bound)),), cumulative))
+                out.append((self.name + "_sum", key, total))
+                out.append((self.name + "_count", key, count))
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, fn):
+        """fn() returns fresh metrics (e.g. Gauges filled from another component's stats) at render time."""
+        self._collectors.append(fn)
+
+    def render(self):
+        metrics = list(self._metrics)
+        for collect in self._collectors:
+            metrics.extend(collect())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "ml_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "ml_http_request_duration_seconds", "Time from request start to the last response byte.", ("method", "route")
+)
+HTTP_REQUEST_BYTES = REGISTRY.histogram(
+    "ml_http_request_size_bytes", "Request body (upload) size.", ("method", "route"), BYTES_BUCKETS
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "ml_stage_duration_seconds", "Time spent per model pipeline stage.", ("model", "stage")
+)
+MODEL_LOADS = REGISTRY.counter("ml_model_loads_total", "Model artifact loads by result.", ("model", "result"))
+BATCH_SIZE = REGISTRY.histogram(
+    "ml_microbatch_size", "Requests scored together per micro-batch.", ("batcher",),
+    (1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0, 256.0),
+)
+BATCH_WAIT_SECONDS = REGISTRY.histogram(
+    "ml_microbatch_wait_seconds", "Time a request was held before its micro-batch started.", ("batcher",),
+    (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+BATCH_FLUSHES = REGISTRY.counter(
+    "ml_microbatch_flushes_total", "Micro-batches started, by what triggered them.", ("batcher", "reason")
+)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Emit one structured (JSON) log line."""
+    if log.isEnabledFor(level):
+        log.log(level, json.dumps({"event": event, **fields}, default=str))
+
+
+@contextmanager
+def stage(model, name, **fields):
+    """
+    Time a pipeline stage. Yields a dict; keys added to it (row counts, ...)
+    are included in the log line.
+    """
+    info = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, model=model, stage=name)
+        log_event("stage", model=model, stage=name, seconds=round(seconds, 6), **info)
+
+
+def configure_logging(level=None):
+    """
+    Send the structured logs to stderr (one JSON object per line) unless the
+    host application already configured the "machine_learning" logger.
+    Level: argument, else ML_LOG_LEVEL, else INFO.
+    """
+    if log.handlers:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(level or os.environ.get("ML_LOG_LEVEL", "INFO").upper())
+    log.propagate = False
+
+
+def log_level():
+    """
+    Effective level of the structured logs, to pass to configure_logging in
+    spawned worker processes, which start unconfigured and would otherwise
+    log at ML_LOG_LEVEL / INFO whatever the parent chose.
+    """
+    return logging.getLevelName(log.getEffectiveLevel())
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count, latency (until the last body
+    byte, so streamed responses are timed in full) and upload size per route
+    template (e.g. /jobs/{job_id}), not per concrete URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        received = 0
+        status = [500]
+
+        async def counting_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, recording_send)
+        finally:
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status[0]))
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=route)
+            HTTP_REQUEST_BYTES.observe(received, method=method, route=route)
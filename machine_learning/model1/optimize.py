@@ -0,0 +1,275 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.metrics import configure_logging, stage
+from machine_learning.model1.part1 import evaluate_candidates, parse_skills
+from machine_learning.model1.part2 import TEAM_FIELDS, _format_score, _map_unique, load_candidates, teams_to_csv
+from machine_learning.model3.main import MODEL_REGISTRY
+
+# Team formation that maximizes model3's predicted team score instead of
+# chunking by individual Skill_Score. Each candidate's tech stack becomes a
+# model3 feature bitmask and a team's features are the OR of its members'
+# masks, so a whole population of candidate teams is scored with one
+# score-table gather.
+#
+# The search starts from form_teams' score-sorted chunks (per group code) and
+# runs rounds of swap moves: a batch of random member swaps within a group
+# code (team <-> team, or team <-> unplaced candidate) is scored at once, and
+# the best non-conflicting improving swaps are applied. A swap improves when
+# more teams reach the threshold, or when failing teams get closer to it.
+# Rounds stop at the time budget or after PATIENCE rounds without a gain.
+
+TEAM_SCORE_THRESHOLD = 100
+TIME_BUDGET = 1.0
+MOVES_PER_ROUND = 4096
+PATIENCE = 25
+OPT_TEAM_FIELDS = TEAM_FIELDS + ["predicted_score"]
+
+# Reaching the threshold outweighs any change in the distance-to-threshold terms.
+PASS_WEIGHT = 10.0
+
+
+def candidate_keys(stacks, matcher):
+    """model3 feature bitmask (uint32) per tech stack string."""
+    return _map_unique(np.asarray(stacks, dtype=object), lambda stack: matcher.match(stack)[0], dtype=np.uint32)
+
+
+def load_team_candidates(csv_content: str) -> pd.DataFrame:
+    """
+    load_candidates() for a CSV that carries a tech stack column. A plain
+    registrations CSV (name + tech_stack_used, no Skill_Score) is scored like
+    /model1/evaluate_batch first.
+    """
+    candidates = load_candidates(csv_content)
+    if len(candidates) and not (candidates["stack"] != "").any():
+        raise KeyError("Optimizing teams needs a tech stack column (tech_stack_used / tech_stack / skills)")
+    if len(candidates) and not candidates["has_score"].any():
+        evaluated = evaluate_candidates(candidates["name"], candidates["stack"].map(parse_skills))
+        candidates = candidates.assign(
+            score=evaluated["Skill_Score"].to_numpy(dtype=float),
+            has_score=True,
+            code=evaluated["Eligible_To"].str[:1].str.lower().to_numpy(),
+        )
+    return candidates
+
+
+def _others_or(masks):
+    """others[t, i] = OR of team t's masks except slot i (prefix/suffix ORs)."""
+    prefix = np.bitwise_or.accumulate(masks, axis=1)
+    suffix = np.bitwise_or.accumulate(masks[:, ::-1], axis=1)[:, ::-1]
+    others = np.zeros_like(masks)
+    others[:, 1:] |= prefix[:, :-1]
+    others[:, :-1] |= suffix[:, 1:]
+    return others
+
+
+def optimize_teams_frame(candidates, keys, predict_keys, team_score_threshold=TEAM_SCORE_THRESHOLD,
+                         chunk_size=5, skill_threshold=None, time_budget=TIME_BUDGET, seed=0,
+                         moves_per_round=MOVES_PER_ROUND, max_rounds=None):
+    """
+    Form teams of exactly chunk_size members per group code that maximize the
+    number of teams whose predicted score (predict_keys over the OR of member
+    keys) reaches team_score_threshold and, when skill_threshold is given,
+    whose summed Skill_Score reaches it too.
+
+    Returns (teams, allocated, stats): teams has OPT_TEAM_FIELDS for the teams
+    that pass, allocated marks their members, and stats reports teams_before
+    (passing teams of the score-sorted start), teams, rounds and swaps.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    rng = np.random.default_rng(seed)
+    k = chunk_size
+    allocated = np.zeros(len(candidates), dtype=bool)
+    stats = {"teams_before": 0, "teams": 0, "rounds": 0, "swaps": 0}
+
+    all_keys = np.asarray(keys, dtype=np.uint32)
+    all_skill = np.nan_to_num(candidates["score"].to_numpy(dtype=float))
+    members = np.flatnonzero(candidates["code"].to_numpy() != "")
+    codes = candidates["code"].to_numpy()[members]
+    code_names = sorted(set(codes))
+
+    # Positions: grouped by code, highest Skill_Score first, like form_teams. The
+    # first chunk_size * (n // chunk_size) positions of a group are team slots.
+    code_rank = pd.Series(range(len(code_names)), index=code_names)[codes].to_numpy() if len(codes) else codes
+    order = np.lexsort((members, -all_skill[members], code_rank))
+    pos_member = members[order]
+    pos_group = np.asarray(code_rank)[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(pos_group)) + 1] if len(pos_group) else np.empty(0, dtype=np.int64)
+    group_size = np.diff(np.r_[group_start, len(pos_member)])
+    group_teams = group_size // k if k >= 1 else np.zeros_like(group_size)
+    n_teams = int(group_teams.sum())
+    if n_teams == 0:
+        return pd.DataFrame(columns=OPT_TEAM_FIELDS), allocated, stats
+
+    team_group = np.repeat(np.arange(len(group_start)), group_teams)
+    team_rank = np.arange(n_teams) - np.repeat(np.cumsum(group_teams) - group_teams, group_teams)
+    team_pos = (np.repeat(group_start, group_teams) + team_rank * k)[:, None] + np.arange(k)
+    slot_positions = team_pos.ravel()
+    pos_team = np.full(len(pos_member), -1, dtype=np.int64)
+    pos_team[slot_positions] = np.repeat(np.arange(n_teams), k)
+    pos_slot = np.full(len(pos_member), -1, dtype=np.int64)
+    pos_slot[slot_positions] = np.tile(np.arange(k), n_teams)
+
+    threshold_scale = max(abs(float(team_score_threshold)), 1.0)
+    skill_scale = max(abs(float(skill_threshold)), 1.0) if skill_threshold is not None else 1.0
+
+    def value(predicted, skill_sum):
+        passed = predicted >= team_score_threshold
+        closeness = np.minimum(predicted, team_score_threshold) / threshold_scale
+        if skill_threshold is not None:
+            passed &= skill_sum >= skill_threshold
+            closeness = closeness + np.minimum(skill_sum, skill_threshold) / skill_scale
+        return passed * PASS_WEIGHT + closeness, passed
+
+    def evaluate():
+        team_members = pos_member[team_pos]
+        masks = all_keys[team_members]
+        team_key = np.bitwise_or.reduce(masks, axis=1)
+        team_skill = all_skill[team_members].sum(axis=1)
+        predicted = predict_keys(team_key)
+        return _others_or(masks), team_skill, predicted, *value(predicted, team_skill)
+
+    others, team_skill, predicted, team_value, passed = evaluate()
+    stats["teams_before"] = int(passed.sum())
+
+    stale = 0
+    while time.perf_counter() < deadline and stale < PATIENCE and (max_rounds is None or stats["rounds"] < max_rounds):
+        stats["rounds"] += 1
+        p = slot_positions[rng.integers(len(slot_positions), size=moves_per_round)]
+        g = pos_group[p]
+        q = group_start[g] + rng.integers(0, group_size[g])
+        ta, tb = pos_team[p], pos_team[q]
+        keep = ta != tb
+        p, q, ta, tb = p[keep], q[keep], ta[keep], tb[keep]
+        if not len(p):
+            stale += 1
+            continue
+        sa, sb = pos_slot[p], pos_slot[q]
+        cp, cq = pos_member[p], pos_member[q]
+        has_b = tb >= 0
+        tb_safe, sb_safe = np.where(has_b, tb, 0), np.where(has_b, sb, 0)
+
+        # Both sides of every swap in one vectorized predict.
+        new_a_key = others[ta, sa] | all_keys[cq]
+        new_b_key = others[tb_safe, sb_safe] | all_keys[cp]
+        new_predicted = predict_keys(np.concatenate([new_a_key, new_b_key]))
+        value_a, _ = value(new_predicted[:len(p)], team_skill[ta] - all_skill[cp] + all_skill[cq])
+        value_b, _ = value(new_predicted[len(p):], team_skill[tb_safe] - all_skill[cq] + all_skill[cp])
+        gain = value_a - team_value[ta] + np.where(has_b, value_b - team_value[tb_safe], 0.0)
+
+        improving = np.flatnonzero(gain > 1e-9)
+        if not len(improving):
+            stale += 1
+            continue
+        stale = 0
+        used_teams, used_bench = set(), set()
+        best_first = improving[np.argsort(-gain[improving], kind="stable")]
+        for i, a, b, pos_a, pos_b in zip(
+            best_first.tolist(), ta[best_first].tolist(), tb[best_first].tolist(),
+            p[best_first].tolist(), q[best_first].tolist(),
+        ):
+            if a in used_teams or b in used_teams or pos_b in used_bench:
+                continue
+            used_teams.add(a)
+            if b >= 0:
+                used_teams.add(b)
+            else:
+                used_bench.add(pos_b)
+            pos_member[pos_a], pos_member[pos_b] = pos_member[pos_b], pos_member[pos_a]
+            stats["swaps"] += 1
+        others, team_skill, predicted, team_value, passed = evaluate()
+
+    # Passing teams per code, best predicted score first; members by Skill_Score.
+    selected = np.flatnonzero(passed)
+    selected = selected[np.lexsort((selected, -predicted[selected], team_group[selected]))]
+    team_members = pos_member[team_pos[selected]]
+    inner = np.lexsort((team_members, -all_skill[team_members]))
+    team_members = np.take_along_axis(team_members, inner, axis=1)
+    allocated[team_members.ravel()] = True
+
+    team_code = team_group[selected]
+    team_num = pd.Series(np.ones(len(team_code), dtype=np.int64)).groupby(team_code).cumsum().to_numpy()
+    upper_codes = np.array([c.upper() for c in code_names], dtype=object)
+    names = candidates["name"].to_numpy()[team_members]
+    raw_scores = candidates["score"].to_numpy(dtype=float)[team_members]
+    score_text = _map_unique(raw_scores.ravel(), _format_score).reshape(-1, k)
+
+    teams = pd.DataFrame({
+        "team_id": [f"Team_{c}{n}" for c, n in zip(upper_codes[team_code], team_num)],
+        "participant_names": ["  ".join(row) for row in names.tolist()],
+        "score_list": ["  ".join(row) for row in score_text.tolist()],
+        "predicted_score": predicted[selected].astype(int),
+    })
+    stats["teams"] = len(teams)
+    stats["seconds"] = round(time.perf_counter() - started, 4)
+    return teams, allocated, stats
+
+
+def optimize_teams(csv_content: str, team_score_threshold=TEAM_SCORE_THRESHOLD, chunk_size=5,
+                   skill_threshold=None, time_budget=TIME_BUDGET, seed=0, max_rounds=None):
+    """
+    Optimizing counterpart of form_teams: returns (teams_csv, leftovers,
+    stats), with a predicted_score column on every team. The time budget
+    covers the search only; parsing and serialization come on top.
+    """
+    with stage("model1", "parse") as info:
+        candidates = load_team_candidates(csv_content)
+        info["rows"] = len(candidates)
+    loaded = MODEL_REGISTRY.get()
+    if loaded.matcher is None:
+        raise ValueError("The model3 artifact does not record its feature names; rebuild it")
+    with stage("model1", "featurize", rows=len(candidates)):
+        keys = candidate_keys(candidates["stack"], loaded.matcher)
+    with stage("model1", "optimize_teams", rows=len(candidates), version=loaded.version) as info:
+        teams, allocated, stats = optimize_teams_frame(
+            candidates, keys, loaded.predict_keys, team_score_threshold, chunk_size, skill_threshold,
+            time_budget, seed, max_rounds=max_rounds,
+        )
+        info.update(teams=stats["teams"], teams_before=stats["teams_before"], rounds=stats["rounds"])
+    stats["model_version"] = loaded.version
+    leftovers = candidates["name"][candidates["has_score"].to_numpy() & ~allocated].tolist()
+    with stage("model1", "serialize", rows=len(teams)):
+        return teams_to_csv(teams, OPT_TEAM_FIELDS), leftovers, stats
+
+
+def optimize_teams_csv(csv_content: str, team_score_threshold=TEAM_SCORE_THRESHOLD, chunk_size=5,
+                       skill_threshold=None, time_budget=TIME_BUDGET, seed=0):
+    """(teams CSV text, stats) without the leftovers; picklable for worker pools."""
+    teams_csv, _, stats = optimize_teams(
+        csv_content, team_score_threshold, chunk_size, skill_threshold, time_budget, seed
+    )
+    return teams_csv, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Form teams that maximize the model3 predicted team score")
+    parser.add_argument("-i", "--input-file", required=True, help="Candidates CSV with a tech stack column")
+    parser.add_argument("-t", "--threshold", type=float, default=TEAM_SCORE_THRESHOLD, help="Predicted team score a team must reach")
+    parser.add_argument("--skill-threshold", type=float, help="Also require the summed Skill_Score to reach this")
+    parser.add_argument("-c", "--chunk-size", type=int, default=5, help="Exact team size (default: 5)")
+    parser.add_argument("--time-budget", type=float, default=TIME_BUDGET, help="Search time budget in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output-file", default="optimized_teams.csv", help="Output CSV path")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input_file):
+        print(f"Input file not found: {args.input_file}", file=sys.stderr)
+        sys.exit(1)
+    configure_logging("WARNING")
+    with open(args.input_file, "r", encoding="utf-8") as f:
+        csv_input = f.read()
+
+    csv_output, leftovers, stats = optimize_teams(
+        csv_input, args.threshold, args.chunk_size, args.skill_threshold, args.time_budget, args.seed
+    )
+    with open(args.output_file, "w", encoding="utf-8", newline="") as f:
+        f.write(csv_output)
+    print(f"✅ {stats['teams']} teams reach {args.threshold:g} (score-sorted start: {stats['teams_before']}) "
+          f"after {stats['rounds']} rounds / {stats['swaps']} swaps in {stats['seconds']}s -> {args.output_file}")
+    print(f"{len(leftovers)} candidates left over")
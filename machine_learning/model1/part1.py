@@ -1,54 +1,140 @@
 import csv
 import io
 
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from machine_learning.metrics import stage
+
+# 1️⃣ Updated skill scores according to new library
+SKILL_SCORES = {
+    "React": 5.5,
+    "Next.js": 6.5,
+    "Javascript/Typescript": 7.0,
+    "Express.js": 4.5,
+    "Python": 6.5,
+    "Flask/FastAPI": 5.0,
+    "PostgreSQL/MongoDB": 5.0,
+    "AWS": 6.5,
+    "GCP": 5.0,
+    "Azure": 4.5,
+    "Tensorflow/Pytorch": 6.5,
+    "OpenCV": 4.0,
+    "Prisma": 3.5,
+    "TailwindCss": 3.5,
+    "Recoil": 3.0,
+    "Redux": 4.5,
+    "TanStack Query": 3.5,
+    "Zustand": 3.0,
+    "Socket.io": 4.5,
+    "Hono.js": 3.0
+}
+
+# 2️⃣ Primary language dictionary remains the same
+PRIMARY_LANGUAGES = {
+    "java": "a",
+    "c": "b",
+    "python": "c",
+    "Javascript/Typescript": "d"
+}
+
+# Column order of the candidate x skill matrix used by evaluate_candidates
+SKILL_NAMES = list(SKILL_SCORES)
+SKILL_INDEX = {skill: i for i, skill in enumerate(SKILL_NAMES)}
+SKILL_WEIGHTS = np.array([SKILL_SCORES[s] for s in SKILL_NAMES])
+
+
+def parse_skills(tech_stack_used):
+    """Split a free-text tech stack ("A, B" or "A  B") into a list of skills."""
+    cleaned_stack = tech_stack_used.replace("  ", ",").replace(" ,", ",").strip()
+    return [s.strip() for s in cleaned_stack.split(",") if s.strip()]
+
+
 def evaluate_candidate(name, skills):
-    # 1️⃣ Updated skill scores according to new library
-    skill_scores = {
-        "React": 5.5,
-        "Next.js": 6.5,
-        "Javascript/Typescript": 7.0,
-        "Express.js": 4.5,
-        "Python": 6.5,
-        "Flask/FastAPI": 5.0,
-        "PostgreSQL/MongoDB": 5.0,
-        "AWS": 6.5,
-        "GCP": 5.0,
-        "Azure": 4.5,
-        "Tensorflow/Pytorch": 6.5,
-        "OpenCV": 4.0,
-        "Prisma": 3.5,
-        "TailwindCss": 3.5,
-        "Recoil": 3.0,
-        "Redux": 4.5,
-        "TanStack Query": 3.5,
-        "Zustand": 3.0,
-        "Socket.io": 4.5,
-        "Hono.js": 3.0
-    }
-
-    # ...existing code...
-    # 2️⃣ Primary language dictionary remains the same
-    primary_languages = {
-        "java": "a",
-        "c": "b",
-        "python": "c",
-        "Javascript/Typescript": "d"
-    }
-
-    # Rest of the code remains the same
     total_score = 0
     eligible_to = ""
 
     for skill in skills:
-        if skill in skill_scores:
-            total_score += skill_scores[skill]
+        if skill in SKILL_SCORES:
+            total_score += SKILL_SCORES[skill]
 
-    for lang, code in primary_languages.items():
+    for lang, code in PRIMARY_LANGUAGES.items():
         if any(lang.lower() in s.lower() for s in skills):
             eligible_to += code
 
     return name, total_score, eligible_to
 
+
+def evaluate_candidates(names, skill_lists):
+    """
+    Vectorized evaluate_candidate for many candidates at once. Builds a sparse
+    candidate x skill count matrix, scores it with one matrix-vector product
+    and derives eligibility codes with vectorized substring matching.
+    Returns a DataFrame with Name, Skill_Score and Eligible_To columns.
+    """
+    skills = pd.Series(list(skill_lists), dtype=object)
+    n = len(skills)
+
+    exploded = skills.explode()
+    cols = exploded.map(SKILL_INDEX)
+    known = cols.notna().to_numpy()
+    rows = exploded.index.to_numpy()[known]
+    cols = cols.to_numpy()[known].astype(np.int64)
+    # Duplicate (row, col) pairs are summed, matching the per-skill loop above.
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, len(SKILL_NAMES)))
+    scores = matrix @ SKILL_WEIGHTS
+
+    # "any skill contains lang" == "the skills joined by a separator contain lang"
+    joined = skills.map(lambda s: "\n".join(s).lower())
+    eligible = pd.Series([""] * n, dtype=object)
+    for lang, code in PRIMARY_LANGUAGES.items():
+        eligible = eligible.where(~joined.str.contains(lang.lower(), regex=False), eligible + code)
+
+    return pd.DataFrame({"Name": list(names), "Skill_Score": scores, "Eligible_To": eligible})
+
+
+def evaluate_candidate_batch(items):
+    """
+    evaluate_candidate for many (name, tech_stack_used) pairs with one
+    vectorized evaluate_candidates call. Returns (name, score, eligible_to)
+    per pair, with the same values (and an int 0 for no known skills).
+    """
+    if not items:
+        return []
+    names = [name for name, _ in items]
+    results = evaluate_candidates(names, [parse_skills(stack) for _, stack in items])
+    return [
+        (name, float(score) if score else 0, eligible_to)
+        for name, score, eligible_to in zip(names, results["Skill_Score"].tolist(), results["Eligible_To"].tolist())
+    ]
+
+
+def evaluate_candidates_csv(csv_content):
+    """
+    Score a candidates CSV with a name column and a tech stack column
+    (tech_stack_used / skills) and return the Name,Skill_Score,Eligible_To CSV
+    that form_teams_from_csv consumes.
+    """
+    with stage("model1", "parse") as info:
+        df = pd.read_csv(io.StringIO(csv_content), dtype=str, keep_default_na=False)
+        info["rows"] = len(df)
+    lower_map = {c.strip().lower(): c for c in df.columns}
+    name_col = lower_map.get("name")
+    stack_col = lower_map.get("tech_stack_used") or lower_map.get("tech_stack") or lower_map.get("skills")
+    if name_col is None or stack_col is None:
+        raise KeyError(
+            "Expected 'name' and 'tech_stack_used' columns. Available columns: "
+            + ", ".join(df.columns)
+        )
+
+    with stage("model1", "featurize", rows=len(df)):
+        skill_lists = df[stack_col].map(parse_skills)
+    with stage("model1", "predict", rows=len(df)):
+        results = evaluate_candidates(df[name_col], skill_lists)
+    with stage("model1", "serialize", rows=len(results)):
+        return results.to_csv(index=False)
+
 # ...existing code...
 
 # ⚙️ Example use case
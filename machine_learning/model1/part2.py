@@ -1,13 +1,26 @@
 # ...existing code...
 import csv
+import heapq
 import io
 import argparse
 import os
 import sys
+import threading
+import time
+import warnings
 from collections import defaultdict
 
-def form_teams_from_csv(csv_content: str, score_threshold: int = 300, chunk_size: int = 5) -> str:
+import numpy as np
+import pandas as pd
+
+from machine_learning import formats
+from machine_learning.metrics import stage
+
+def legacy_form_teams_from_csv(csv_content: str, score_threshold: int = 300, chunk_size: int = 5) -> str:
     """
+    Original row-by-row implementation of form_teams_from_csv, kept as the
+    parity and benchmark baseline for the columnar engine.
+
     Forms teams of exactly `chunk_size` members (default 5) per group code.
 
     Rules:
@@ -106,28 +119,394 @@ def form_teams_from_csv(csv_content: str, score_threshold: int = 300, chunk_size
     writer = csv.DictWriter(out, fieldnames=["team_id", "participant_names", "score_list"])
     writer.writeheader()
     writer.writerows(team_rows)
-    csv_result = out.getvalue()
+    return out.getvalue()
 
-    # Compute leftovers: any candidate with a numeric score who was not allocated
-    leftovers = [e["name"] for e in entries.values() if isinstance(e.get("score"), (int, float)) and not e.get("allocated")]
-    if leftovers:
-        print("\nLeftover candidates (not assigned to any emitted team):")
-        for n in leftovers:
-            print(f"- {n}")
+
+NAME_COLUMNS = ("Name", "name")
+SCORE_COLUMNS = ("Skill_Score", "skill_score", "score")
+ELIGIBLE_COLUMNS = ("Eligible_To", "eligible_to", "Eligible")
+STACK_COLUMNS = ("tech_stack_used", "Tech_Stack_Used", "tech_stack", "skills", "Skills")
+TEAM_FIELDS = ["team_id", "participant_names", "score_list"]
+
+
+def _first_nonempty(df, columns):
+    """Column-wise equivalent of `row.get(a) or row.get(b) or ""`, resolved once per file."""
+    result = np.full(len(df), "", dtype=object)
+    for col in reversed([c for c in columns if c in df.columns]):
+        values = df[col].to_numpy(dtype=object)
+        result = np.where(values != "", values, result)
+    return result
+
+
+def _parse_score(raw):
+    try:
+        return float(raw)
+    except (ValueError, TypeError):
+        return None
+
+
+def _assigned_code(eligible_raw):
+    """First group code of an Eligible_To value, lower-cased ("" if none)."""
+    if not eligible_raw:
+        return ""
+    # split eligible codes: allow comma/semicolon/pipe/space, otherwise treat as sequence of letters
+    if any(sep in eligible_raw for sep in (",", ";", "|", " ")):
+        parts = [p.strip() for p in csv.reader([eligible_raw]).__next__() if p.strip()]
+        codes = []
+        for p in parts:
+            if len(p) > 1 and all(ch.isalpha() for ch in p):
+                codes.extend(list(p))
+            else:
+                codes.append(p)
     else:
-        print("\nAll candidates with valid scores were assigned to teams (if possible).")
+        codes = list(eligible_raw)
+    if not codes:
+        return ""
+    return codes[0].strip().lower()
+
+
+def _map_unique(values, fn, dtype=object):
+    """Apply fn once per distinct value; scores and codes repeat heavily."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([fn(u) for u in uniques], dtype=dtype)[codes]
+
+
+def _format_score(score):
+    return str(int(score)) if float(score).is_integer() else f"{score:.2f}"
+
+
+def _read_rows(csv_content):
+    """Read every cell as a string, with csv.DictReader semantics for ragged rows."""
+    try:
+        with warnings.catch_warnings():
+            # index_col=False drops one trailing extra field per row, as DictReader does
+            warnings.simplefilter("ignore", pd.errors.ParserWarning)
+            return pd.read_csv(io.StringIO(csv_content), dtype=object, na_filter=False, index_col=False)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+    except pd.errors.ParserError:
+        # Rows with extra fields: like DictReader, drop the extras and pad short rows.
+        rows = [r for r in csv.reader(io.StringIO(csv_content)) if r]
+        header = rows[0]
+        width = len(header)
+        return pd.DataFrame([(r + [""] * width)[:width] for r in rows[1:]], columns=header, dtype=object)
+
 
-    return csv_result
+def _text_rows(frame):
+    """Arrow/Parquet frame as _read_rows would give it: nulls as "", non-score columns as text."""
+    rows = frame.astype(object).where(frame.notna(), "")
+    for col in rows.columns:
+        if col not in SCORE_COLUMNS:
+            rows[col] = rows[col].map(str)
+    return rows
+
+
+def load_candidates(csv_content: str) -> pd.DataFrame:
+    """
+    Parse a candidate_results CSV into one row per distinct candidate (first
+    occurrence wins, names compared case-insensitively) with columns:
+    name, score (NaN if invalid), has_score, code ("" if no usable group) and
+    stack (the raw tech stack text, "" when the CSV has none).
+    """
+    return load_candidates_frame(_read_rows(csv_content))
+
+
+def load_candidates_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """load_candidates() for rows already read into a DataFrame (see _text_rows)."""
+    names = np.array([n.strip() for n in _first_nonempty(df, NAME_COLUMNS)], dtype=object)
+    keep = names != ""
+    first = ~pd.Series([n.lower() for n in names[keep]], dtype=object).duplicated().to_numpy()
+    rows = np.flatnonzero(keep)[first]
+    df, names = df.iloc[rows], names[rows]
+
+    score_raw = _first_nonempty(df, SCORE_COLUMNS)
+    parsed = _map_unique(score_raw, lambda raw: _parse_score(raw.strip() if isinstance(raw, str) else raw))
+    # float() accepts "nan", so validity is tracked separately from the value
+    has_score = np.array([p is not None for p in parsed], dtype=bool)
+    scores = np.where(has_score, parsed, np.nan).astype(float)
+    codes = _map_unique(_first_nonempty(df, ELIGIBLE_COLUMNS), lambda raw: _assigned_code(raw.strip()))
+
+    return pd.DataFrame({
+        "name": names,
+        "score": scores,
+        "has_score": has_score,
+        "code": np.where(has_score, codes, ""),
+        "stack": _first_nonempty(df, STACK_COLUMNS),
+    })
+
+
+def form_teams_frame(candidates: pd.DataFrame, score_threshold: float = 300, chunk_size: int = 5):
+    """
+    Columnar team formation over load_candidates() output.
+
+    Returns (teams, allocated): teams is a DataFrame with team_id,
+    participant_names and score_list; allocated is a boolean array aligned
+    with `candidates` marking who landed in an emitted team.
+    """
+    allocated = np.zeros(len(candidates), dtype=bool)
+    members = np.flatnonzero(candidates["code"].to_numpy() != "")
+    if len(members) == 0 or chunk_size < 1:
+        return pd.DataFrame(columns=TEAM_FIELDS), allocated
+
+    all_scores = candidates["score"].to_numpy()
+    codes = candidates["code"].to_numpy()[members]
+    scores = all_scores[members]
+    code_names = sorted(set(codes))
+    code_rank = pd.Series(range(len(code_names)), index=code_names)[codes].to_numpy()
+
+    # Group by code (in sorted code order), highest score first, ties in input order.
+    order = np.lexsort((members, -scores, code_rank))
+    members, code_rank, scores = members[order], code_rank[order], scores[order]
+
+    group_start = np.r_[0, np.flatnonzero(np.diff(code_rank)) + 1]
+    group_size = np.diff(np.r_[group_start, len(members)])
+
+    # float("nan") is a valid score, and list.sort() order with NaN keys depends
+    # on the input, so replay the original sort for any group that contains one.
+    for g in np.unique(code_rank[np.isnan(scores)]):
+        seg = slice(group_start[g], group_start[g] + group_size[g])
+        members[seg] = sorted(np.sort(members[seg]), key=lambda m: all_scores[m], reverse=True)
+        scores[seg] = all_scores[members[seg]]
+    pos = np.arange(len(members)) - np.repeat(group_start, group_size)
+    in_full_chunk = pos < np.repeat(group_size // chunk_size * chunk_size, group_size)
+
+    chunk_members = members[in_full_chunk].reshape(-1, chunk_size)
+    chunk_scores = scores[in_full_chunk].reshape(-1, chunk_size)
+    chunk_code = code_rank[in_full_chunk][::chunk_size]
+
+    # Summed left to right, exactly like sum() over the chunk.
+    totals = chunk_scores[:, 0].copy()
+    for j in range(1, chunk_size):
+        totals += chunk_scores[:, j]
+    passed = totals >= score_threshold
+
+    team_members = chunk_members[passed]
+    team_code = chunk_code[passed]
+    team_num = pd.Series(np.ones(len(team_code), dtype=np.int64)).groupby(team_code).cumsum().to_numpy()
+    allocated[team_members.ravel()] = True
+
+    names = candidates["name"].to_numpy()[team_members]
+    score_text = _map_unique(chunk_scores[passed].ravel(), _format_score).reshape(-1, chunk_size)
+    upper_codes = np.array([c.upper() for c in code_names], dtype=object)
+
+    teams = pd.DataFrame({
+        "team_id": [f"Team_{c}{n}" for c, n in zip(upper_codes[team_code], team_num)],
+        "participant_names": ["  ".join(row) for row in names.tolist()],
+        "score_list": ["  ".join(row) for row in score_text.tolist()],
+    })
+    return teams, allocated
+
+
+def teams_to_csv(teams: pd.DataFrame, fields=TEAM_FIELDS) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(fields)
+    writer.writerows(zip(*(teams[f].tolist() for f in fields)))
+    return out.getvalue()
+
+
+def form_teams(csv_content: str, score_threshold: int = 300, chunk_size: int = 5):
+    """
+    Same rules as form_teams_from_csv, but returns (teams_csv, leftovers)
+    where leftovers lists every candidate with a valid score who was not
+    placed in an emitted team, in input order.
+    """
+    with stage("model1", "parse") as info:
+        candidates = load_candidates(csv_content)
+        info["rows"] = len(candidates)
+    with stage("model1", "form_teams", rows=len(candidates)) as info:
+        teams, allocated = form_teams_frame(candidates, score_threshold, chunk_size)
+        leftovers = candidates["name"][candidates["has_score"].to_numpy() & ~allocated].tolist()
+        info["teams"] = len(teams)
+    with stage("model1", "serialize", rows=len(teams)):
+        return teams_to_csv(teams), leftovers
+
+
+def form_teams_from_csv(csv_content: str, score_threshold: int = 300, chunk_size: int = 5) -> str:
+    """
+    Forms teams of exactly `chunk_size` members (default 5) per group code.
+
+    Rules:
+    - Candidates are NOT filtered by any per-candidate threshold.
+    - Candidates are grouped by the first code in their Eligible_To.
+    - Teams are emitted only for full groups of `chunk_size` members whose
+      summed skill score is >= score_threshold (default 300).
+    - Partial groups (fewer than chunk_size members) are ignored (leftovers).
+
+    Use form_teams() to also get the leftover candidates.
+    """
+    return form_teams(csv_content, score_threshold, chunk_size)[0]
+
+
+def form_teams_bytes(data: bytes, score_threshold: float = 300, chunk_size: int = 5,
+                     input_format: str = "csv", output_format: str = "csv") -> bytes:
+    """
+    form_teams_from_csv for any machine_learning.formats wire format in and
+    out (CSV, Parquet, Arrow IPC); picklable for worker pools.
+    """
+    with stage("model1", "parse", format=input_format) as info:
+        if input_format == "csv":
+            candidates = load_candidates(data.decode("utf-8"))
+        else:
+            candidates = load_candidates_frame(_text_rows(formats.read_frame(data, input_format)))
+        info["rows"] = len(candidates)
+    with stage("model1", "form_teams", rows=len(candidates)) as info:
+        teams, _ = form_teams_frame(candidates, score_threshold, chunk_size)
+        info["teams"] = len(teams)
+    with stage("model1", "serialize", rows=len(teams), format=output_format):
+        if output_format == "csv":
+            return teams_to_csv(teams).encode("utf-8")
+        return formats.write_frame(teams, output_format)
+
+
+class TeamFormationSession:
+    """
+    Incremental form_teams for rolling registrations.
+
+    Each group code keeps a max-heap of unassigned candidates (score desc,
+    then arrival order) and a running team counter. New candidates are pushed
+    into their pool and full chunks are popped off the top while they still
+    reach the threshold; since chunk sums only decrease down a sorted pool,
+    the first failing chunk ends the work. Emitted teams are locked, so their
+    Team_<CODE><n> ids never change, and an update costs
+    O((delta + new teams) * log pool) rather than a full recompute.
+
+    A fresh session fed one CSV produces exactly form_teams_from_csv's teams.
+    Re-uploading candidates already seen (case-insensitive name) is a no-op.
+    Uploads with a NaN or infinite score are rejected whole (ValueError):
+    form_teams orders NaN scores by where they sit in the input, which a heap
+    cannot reproduce.
+    """
+
+    def __init__(self, score_threshold: float = 300, chunk_size: int = 5):
+        self.score_threshold = score_threshold
+        self.chunk_size = chunk_size
+        self.pools = defaultdict(list)
+        self.team_counts = defaultdict(int)
+        self.teams = []
+        self.ungrouped = []
+        self.seen = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def _drain(self, code):
+        pool = self.pools[code]
+        new_teams = []
+        while len(pool) >= self.chunk_size:
+            chunk = [heapq.heappop(pool) for _ in range(self.chunk_size)]
+            scores = [-neg_score for neg_score, _, _ in chunk]
+            if sum(scores) < self.score_threshold:
+                for item in chunk:
+                    heapq.heappush(pool, item)
+                break
+            self.team_counts[code] += 1
+            new_teams.append({
+                "team_id": f"Team_{code.upper()}{self.team_counts[code]}",
+                "participant_names": "  ".join(name for _, _, name in chunk),
+                "score_list": "  ".join(_format_score(score) for score in scores),
+                "code": code,
+                "team_num": self.team_counts[code],
+            })
+        return new_teams
+
+    def add_candidates(self, csv_content: str):
+        """Add a (delta) candidate_results CSV and return the teams it completed."""
+        candidates = load_candidates(csv_content)
+        invalid = candidates["has_score"].to_numpy() & ~np.isfinite(candidates["score"].to_numpy())
+        if invalid.any():
+            names = candidates["name"][invalid].tolist()
+            raise ValueError(
+                f"{len(names)} candidate(s) have a non-finite skill score, e.g. {names[0]!r}; "
+                "scores must be finite numbers"
+            )
+        with self._lock:
+            touched = set()
+            for name, score, has_score, code in zip(
+                candidates["name"], candidates["score"], candidates["has_score"], candidates["code"]
+            ):
+                key = name.lower()
+                if key in self.seen:
+                    continue
+                self.seen.add(key)
+                if not has_score:
+                    continue
+                if code:
+                    heapq.heappush(self.pools[code], (-score, self._seq, name))
+                    touched.add(code)
+                else:
+                    self.ungrouped.append(name)
+                self._seq += 1
+
+            new_teams = []
+            for code in sorted(touched):
+                new_teams.extend(self._drain(code))
+            self.teams.extend(new_teams)
+            return new_teams
+
+    def leftovers(self):
+        """Candidates with a valid score not (yet) placed in a team."""
+        with self._lock:
+            pooled = [name for code in sorted(self.pools) for _, _, name in sorted(self.pools[code])]
+            return pooled + list(self.ungrouped)
+
+    def leftover_count(self) -> int:
+        with self._lock:
+            return sum(len(pool) for pool in self.pools.values()) + len(self.ungrouped)
+
+    def teams_csv(self) -> str:
+        """Every locked team, ordered by code then team number like form_teams_from_csv."""
+        with self._lock:
+            teams = sorted(self.teams, key=lambda t: (t["code"], t["team_num"]))
+        return teams_to_csv(pd.DataFrame(teams, columns=TEAM_FIELDS))
+
+
+def generate_candidates_csv(n_rows: int, seed: int = 0) -> str:
+    """Seeded synthetic candidate_results CSV (with some duplicates and blanks) for benchmarks."""
+    rng = np.random.default_rng(seed)
+    names = np.char.add("Candidate_", rng.integers(0, int(n_rows * 1.05) + 1, size=n_rows).astype(str))
+    scores = rng.integers(0, 193, size=n_rows) / 2
+    eligible = rng.choice(["a", "b", "c", "d", "bc", "cd", "abd", "", "b, c"], size=n_rows)
+    return pd.DataFrame({"Name": names, "Skill_Score": scores, "Eligible_To": eligible}).to_csv(index=False)
+
+
+def benchmark(sizes=(10_000, 100_000, 1_000_000), score_threshold=300, chunk_size=5):
+    """Time legacy vs columnar team formation and check they produce identical CSV."""
+    results = []
+    for n_rows in sizes:
+        csv_content = generate_candidates_csv(n_rows)
+        start = time.perf_counter()
+        expected = legacy_form_teams_from_csv(csv_content, score_threshold, chunk_size)
+        legacy_s = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = form_teams_from_csv(csv_content, score_threshold, chunk_size)
+        columnar_s = time.perf_counter() - start
+        results.append({
+            "rows": n_rows,
+            "legacy_s": round(legacy_s, 3),
+            "columnar_s": round(columnar_s, 3),
+            "speedup": round(legacy_s / columnar_s, 1),
+            "identical": actual == expected,
+        })
+    return results
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Create final teams CSV from candidate_results CSV")
-    parser.add_argument("-i", "--input-file", required=True, help="Path to candidate_results CSV")
+    parser.add_argument("-i", "--input-file", help="Path to candidate_results CSV")
     parser.add_argument("-t", "--threshold", type=int, default=300, help="Team score threshold (default: 300)")
     parser.add_argument("-c", "--chunk-size", type=int, default=5, help="Exact team size when forming teams (default: 5)")
     parser.add_argument("-o", "--output-file", default="final_teams.csv", help="Output CSV path (default: final_teams.csv)")
+    parser.add_argument("--benchmark", action="store_true", help="Benchmark legacy vs columnar team formation at 10k/100k/1M rows")
     args = parser.parse_args()
 
+    if args.benchmark:
+        for row in benchmark(score_threshold=args.threshold, chunk_size=args.chunk_size):
+            print(row)
+        sys.exit(0)
+
+    if not args.input_file:
+        parser.error("-i/--input-file is required")
+
     if not os.path.exists(args.input_file):
         print(f"Input file not found: {args.input_file}", file=sys.stderr)
         sys.exit(1)
@@ -135,7 +514,14 @@ if __name__ == "__main__":
     with open(args.input_file, "r", encoding="utf-8") as f:
         csv_input = f.read()
 
-    csv_output = form_teams_from_csv(csv_input, score_threshold=args.threshold, chunk_size=args.chunk_size)
+    csv_output, leftovers = form_teams(csv_input, score_threshold=args.threshold, chunk_size=args.chunk_size)
+
+    if leftovers:
+        print("\nLeftover candidates (not assigned to any emitted team):")
+        for n in leftovers:
+            print(f"- {n}")
+    else:
+        print("\nAll candidates with valid scores were assigned to teams (if possible).")
 
     try:
         with open(args.output_file, "w", encoding="utf-8", newline="") as f:
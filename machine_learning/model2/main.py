@@ -1,41 +1,116 @@
 import pandas as pd
+import numpy as np
+import logging
 import os
- 
- 
-def allocate_rooms(teams_df, num_rooms, teams_per_room, output_file="room_allocation.csv"):
+from bisect import bisect_left, insort
+
+from machine_learning import formats
+from machine_learning.metrics import configure_logging, log_event, stage
+
+OVERFLOW_LABEL = "Overflow"
+HEADCOUNT_COLUMNS = ("headcount", "team_size", "members")
+
+
+def _headcounts(teams_df):
+    lower_map = {c.lower(): c for c in teams_df.columns}
+    for name in HEADCOUNT_COLUMNS:
+        if name in lower_map:
+            return teams_df[lower_map[name]].to_numpy(dtype=np.int64)
+    raise KeyError(
+        "Bin-packing needs a headcount column (" + ", ".join(HEADCOUNT_COLUMNS) + "). "
+        "Available columns: " + ", ".join(map(str, teams_df.columns))
+    )
+
+
+def _pack_by_headcount(headcount, num_rooms, teams_per_room, seats_per_room):
+    """
+    Best-fit decreasing: largest teams first, each into the room whose free
+    seats fit it most tightly. Returns a room index per team (-1 = overflow).
+    """
+    room_of = np.full(len(headcount), -1, dtype=np.int64)
+    teams_in_room = np.zeros(num_rooms, dtype=np.int64)
+    free = [(seats_per_room, r) for r in range(num_rooms)]  # sorted by (free seats, room)
+
+    for i in np.argsort(-headcount, kind="stable"):
+        pos = bisect_left(free, (headcount[i], -1))
+        if pos == len(free):
+            continue
+        seats, room = free.pop(pos)
+        room_of[i] = room
+        teams_in_room[room] += 1
+        if teams_in_room[room] < teams_per_room:
+            insort(free, (seats - headcount[i], room))
+    return room_of
+
+
+def _room_indices(teams_df, num_rooms, teams_per_room, seats_per_room=None):
+    """Room index (0-based) per team, -1 for teams that do not fit."""
+    if num_rooms < 0 or teams_per_room < 1:
+        raise ValueError("num_rooms must be >= 0 and teams_per_room must be >= 1")
+
+    if seats_per_room is None:
+        room_of = np.arange(len(teams_df)) // teams_per_room
+        room_of[room_of >= num_rooms] = -1
+        return room_of
+    return _pack_by_headcount(_headcounts(teams_df), num_rooms, teams_per_room, seats_per_room)
+
+
+def _room_labels(room_of):
+    # One label per room, gathered by index; -1 picks the trailing overflow label.
+    used = int(room_of.max()) + 1 if len(room_of) else 0
+    labels = np.array([f"Room_{r}" for r in range(1, used + 1)] + [OVERFLOW_LABEL], dtype=object)
+    return labels[room_of]
+
+
+def allocate_rooms(teams_df, num_rooms, teams_per_room, output_file=None, seats_per_room=None):
+    """
+    One row per team, in input order, with its room_number. Teams beyond the
+    available rooms are labelled OVERFLOW_LABEL instead of being given a room
+    that does not exist. The CSV is only written when output_file is given.
+    """
     if isinstance(teams_df, str):
         teams_df = pd.read_csv(teams_df)
-    
-    assignments = []
-    room_number = 1
-    teams_in_current_room = 0
-    
-    for _, row in teams_df.iterrows():
-        team_id = row["team"]
-        
-        if teams_in_current_room >= teams_per_room:
-            room_number += 1
-            teams_in_current_room = 0
-        
-        assignments.append({"team": team_id, "room_number": f"Room_{room_number}"})
-        teams_in_current_room += 1
-    
-    allocation_df = pd.DataFrame(assignments)
-    allocation_df.to_csv(output_file, index=False)
-    print(f"✅ Allocation saved to {output_file}")
-    
+
+    with stage("model2", "allocate", rows=len(teams_df), rooms=num_rooms) as info:
+        room_of = _room_indices(teams_df, num_rooms, teams_per_room, seats_per_room)
+        allocation_df = pd.DataFrame({"team": teams_df["team"].to_numpy(), "room_number": _room_labels(room_of)})
+        overflow = info["overflow"] = int((room_of < 0).sum())
+
+    if overflow:
+        log_event("rooms_overflow", logging.WARNING, overflow=overflow, rooms=num_rooms)
+
+    if output_file:
+        with stage("model2", "serialize", rows=len(allocation_df), path=output_file):
+            allocation_df.to_csv(output_file, index=False)
+
     return allocation_df
 
 
-if __name__ == "__main__":  
+def allocate_rooms_bytes(data, num_rooms, teams_per_room, seats_per_room=None,
+                         input_format="csv", output_format="csv"):
+    """
+    Uploaded table in, (allocation table, overflow count) out, as bytes in any
+    machine_learning.formats wire format (CSV by default); picklable for
+    worker pools.
+    """
+    with stage("model2", "parse", format=input_format) as info:
+        teams_df = formats.read_frame(data, input_format)
+        info["rows"] = len(teams_df)
+    allocation_df = allocate_rooms(teams_df, num_rooms, teams_per_room, seats_per_room=seats_per_room)
+    overflow = int((allocation_df["room_number"] == OVERFLOW_LABEL).sum())
+    with stage("model2", "serialize", rows=len(allocation_df), format=output_format):
+        return formats.write_frame(allocation_df, output_format), overflow
+
+
+if __name__ == "__main__":
+    configure_logging()
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     input_file = os.path.join(BASE_DIR, "team2 (2).csv")
-    
+
     num_rooms = 10
     teams_per_room = 6
     output_file = "room_allocation.csv"
-    
+
     result = allocate_rooms(input_file, num_rooms, teams_per_room, output_file)
     print("\nAllocation Result:")
     print(result)
-
@@ -1,27 +1,128 @@
-import itertools
-import pandas as pd
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-num_columns = 20
+import numpy as np
 
-combinations = itertools.product([0, 1], repeat=num_columns)
+# Every 0/1 combination of num_columns features, in itertools.product order:
+# row k is the binary expansion of k with the first column as the most
+# significant bit. Rows are derived from arange(2**n) with bit operations, so
+# nothing is materialized as Python tuples.
+#
+#   python generate_csv.py                          # binary_combinations.csv (as before)
+#   python generate_csv.py --format npy             # packed uint32 keys, 4 MB for 2^20 rows
+#   python generate_csv.py --format csv --shards 8  # 8 row-range CSVs written in parallel
+#
+# A .npy output holds one uint32 key per row; its .json sidecar records the
+# column names. unpack() turns keys back into the 0/1 matrix.
 
-chunk_size = 100000 
-data_chunks = []
+NUM_COLUMNS = 20
+FORMATS = ("csv", "npy", "parquet")
+EXTENSIONS = {"csv": ".csv", "npy": ".npy", "parquet": ".parquet"}
 
-# Create column names
-column_names = [f'Column_{i+1}' for i in range(num_columns)]
 
-for i, combination in enumerate(combinations):
-    data_chunks.append(combination)
-    if (i + 1) % chunk_size == 0:
-        print(f"Processed {i + 1} combinations...")
+def default_column_names(num_columns):
+    return [f"Column_{i + 1}" for i in range(num_columns)]
 
-print("Creating DataFrame...")
-df = pd.DataFrame(data_chunks, columns=column_names)
 
-output_file = 'binary_combinations.csv'
+def combination_keys(num_columns=NUM_COLUMNS, start=0, stop=None):
+    """Packed keys for rows [start, stop) of the full combination table."""
+    stop = 1 << num_columns if stop is None else stop
+    return np.arange(start, stop, dtype=np.uint32)
 
-print(f"Saving to {output_file}...")
-df.to_csv(output_file, index=False)
 
-print(f"Successfully generated all {len(df)} combinations in '{output_file}'!")
\ No newline at end of file
+def unpack(keys, num_columns=NUM_COLUMNS):
+    """(n_rows, num_columns) uint8 0/1 matrix for packed keys."""
+    shifts = np.arange(num_columns - 1, -1, -1, dtype=np.uint32)
+    return ((np.asarray(keys, dtype=np.uint32)[:, None] >> shifts) & 1).astype(np.uint8)
+
+
+def _csv_lines(keys, num_columns):
+    # Each row is the text of its high half followed by its low half, so only
+    # 2 * 2^(n/2) distinct strings are ever formatted.
+    low_bits = num_columns // 2
+    high_bits = num_columns - low_bits
+
+    def halves(bits, suffix):
+        return [",".join(row) + suffix for row in unpack(np.arange(1 << bits), bits).astype(str)]
+
+    high = halves(high_bits, "," if low_bits else "\n")
+    low = halves(low_bits, "\n") if low_bits else [""]
+    mask = (1 << low_bits) - 1
+    return "".join([high[k >> low_bits] + low[k & mask] for k in keys.tolist()])
+
+
+def write_keys(keys, path, fmt, num_columns, column_names):
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(",".join(column_names) + "\n")
+            f.write(_csv_lines(keys, num_columns))
+    elif fmt == "npy":
+        np.save(path, keys)
+        with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"column_names": column_names, "rows": int(len(keys)), "first_key": int(keys[0]) if len(keys) else 0}, f)
+    elif fmt == "parquet":
+        import pandas as pd
+
+        try:
+            pd.DataFrame({"key": keys}).to_parquet(path, index=False)
+        except ImportError as e:
+            raise ImportError("Parquet output needs pyarrow (pip install pyarrow); use --format npy instead") from e
+        with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump({"column_names": column_names, "rows": int(len(keys))}, f)
+    else:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return path
+
+
+def _write_shard(args):
+    start, stop, path, fmt, num_columns, column_names = args
+    return write_keys(combination_keys(num_columns, start, stop), path, fmt, num_columns, column_names)
+
+
+def generate(output_path, fmt="csv", num_columns=NUM_COLUMNS, column_names=None, shards=1, workers=None):
+    """
+    Write all 2^num_columns combinations to output_path, or to `shards`
+    contiguous row ranges (output_001.ext, ...) generated in parallel.
+    Returns the written paths in row order.
+    """
+    column_names = column_names or default_column_names(num_columns)
+    if len(column_names) != num_columns:
+        raise ValueError(f"Expected {num_columns} column names, got {len(column_names)}")
+
+    total = 1 << num_columns
+    if shards <= 1:
+        return [write_keys(combination_keys(num_columns), output_path, fmt, num_columns, column_names)]
+
+    stem, ext = os.path.splitext(output_path)
+    bounds = np.linspace(0, total, shards + 1).astype(np.int64)
+    tasks = [
+        (int(bounds[i]), int(bounds[i + 1]), f"{stem}_{i + 1:03d}{ext or EXTENSIONS[fmt]}", fmt, num_columns, column_names)
+        for i in range(shards)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_write_shard, tasks))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate every 0/1 combination of N feature columns")
+    parser.add_argument("-n", "--num-columns", type=int, default=NUM_COLUMNS, help="Number of 0/1 columns (default: 20)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv", help="csv (text), npy (packed uint32 keys) or parquet")
+    parser.add_argument("-o", "--output", help="Output path (default: binary_combinations.<ext>)")
+    parser.add_argument("--names", help="Comma-separated column names (default: Column_1..Column_N)")
+    parser.add_argument("--shards", type=int, default=1, help="Split rows into this many files, written in parallel")
+    parser.add_argument("--workers", type=int, help="Processes for --shards (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.num_columns > 32:
+        parser.error("at most 32 columns fit in a uint32 key")
+    output = args.output or "binary_combinations" + EXTENSIONS[args.format]
+    names = args.names.split(",") if args.names else None
+
+    start = time.perf_counter()
+    paths = generate(output, args.format, args.num_columns, names, args.shards, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Successfully generated all {1 << args.num_columns} combinations in {len(paths)} file(s) "
+          f"({', '.join(paths[:3])}{', ...' if len(paths) > 3 else ''}) in {elapsed:.2f}s")
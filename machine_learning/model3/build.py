@@ -0,0 +1,109 @@
+"""
+Build and verify the model3 serving artifacts ahead of time, so that no
+request ever trains (run it in the image build or a deploy step):
+
+    python -m machine_learning.model3.build           # train if missing, compile + verify
+    python -m machine_learning.model3.build --force   # retrain from the training CSV
+    python -m machine_learning.model3.build --check   # verify only, exit 1 if not servable
+
+Once a version has been published with machine_learning.model3.retrain, the
+served artifacts are the ones Models/CURRENT points at: --check verifies
+those and --force retrains through that pipeline.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.metrics import configure_logging, log_event, stage
+from machine_learning.model3 import score_table
+from machine_learning.model3.main import (
+    MODEL_PATH,
+    NEW_DATA_PATH,
+    POINTER_PATH,
+    TABLE_PATH,
+    compile_score_table,
+    train_model,
+)
+from machine_learning.model3.registry import ModelRegistry, load_bundle
+
+VERIFY_SAMPLE = 65536
+
+
+def check(sample_size=VERIFY_SAMPLE, sample_csv=NEW_DATA_PATH):
+    """
+    Return a list of problems that would stop a fresh worker from serving
+    model3 straight from the artifacts on disk (empty means servable).
+    """
+    # A fresh registry loads exactly what a new worker would.
+    registry = ModelRegistry(MODEL_PATH, TABLE_PATH, POINTER_PATH)
+    model_path, table_path = registry.artifact_paths()
+    if not os.path.exists(model_path):
+        return [f"missing model artifact {model_path}"]
+
+    problems = []
+    model, feature_names = load_bundle(model_path)
+    if feature_names is None:
+        return [f"{model_path} does not record its feature names"]
+
+    try:
+        loaded = registry.warmup()
+    except ValueError as e:  # checksum mismatch in a published version
+        return [str(e)]
+    if loaded.scorer != "table":
+        problems.append(f"score table {table_path} is missing or was compiled from a different model.pkl")
+    else:
+        with stage("model3", "verify_table", sample=sample_size):
+            mismatches = score_table.verify_score_table(loaded.table, model, feature_names, sample_size=sample_size)
+        if mismatches:
+            problems.append(f"score table disagrees with the tree on {mismatches} sampled keys")
+
+    if sample_csv and os.path.exists(sample_csv):
+        # End to end on real input: the serving path must match the tree exactly.
+        sample = pd.read_csv(sample_csv)
+        served = loaded.predict(sample)
+        expected = np.rint(model.predict(sample.reindex(columns=feature_names, fill_value=0))).astype(int)
+        mismatches = int((np.asarray(served) != expected).sum())
+        if mismatches:
+            problems.append(f"{mismatches} of {len(sample)} rows of {sample_csv} score differently than the tree")
+    return problems
+
+
+def build(force=False, data_path=None, sample_size=VERIFY_SAMPLE):
+    """Train (when missing or forced), compile the score table when stale, then check. Returns problems."""
+    if os.path.exists(POINTER_PATH):
+        # Versions are published by retrain; the fixed model.pkl is no longer served.
+        if force:
+            from machine_learning.model3.retrain import retrain
+
+            result = retrain([data_path] if data_path else None)
+            if not result["promoted"]:
+                return result["parity"]["problems"]
+    elif force or not os.path.exists(MODEL_PATH):
+        train_model(data_path)  # also compiles the table
+    elif ModelRegistry(MODEL_PATH, TABLE_PATH).get().scorer != "table":
+        compile_score_table()
+
+    problems = check(sample_size)
+    log_event("model_build", model_path=ModelRegistry(MODEL_PATH, TABLE_PATH, POINTER_PATH).artifact_paths()[0],
+              ok=not problems, problems=problems)
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and verify the model3 serving artifacts")
+    parser.add_argument("--force", action="store_true", help="Retrain even if model.pkl exists")
+    parser.add_argument("--data", help="Training CSV or compact .train.json manifest (default: combined_data.csv)")
+    parser.add_argument("--check", action="store_true", help="Only verify the existing artifacts")
+    parser.add_argument("--sample", type=int, default=VERIFY_SAMPLE, help="Score-table keys to verify against the tree")
+    args = parser.parse_args()
+
+    configure_logging()
+    problems = check(args.sample) if args.check else build(args.force, args.data, args.sample)
+    for problem in problems:
+        print(f"❌ {problem}", file=sys.stderr)
+    if problems:
+        sys.exit(1)
+    print(f"✅ model3 artifacts are ready to serve ({ModelRegistry(MODEL_PATH, TABLE_PATH, POINTER_PATH).artifact_paths()[0]})")
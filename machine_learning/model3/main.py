@@ -1,20 +1,47 @@
 import pandas as pd
 import numpy as np
-from sklearn.tree import DecisionTreeRegressor
-import joblib
+import collections
 import os
 
+from machine_learning import formats
+from machine_learning.metrics import configure_logging, log_event, stage
+from machine_learning.model3 import score_table, training_data
+from machine_learning.model3.registry import ModelRegistry, load_bundle
+
 # --- Paths (anchored to this module directory) ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, "Datasets", "Final_data", "combined_data.csv")
 NEW_DATA_PATH = os.path.join(BASE_DIR, "Datasets", "Final_data", "test_data.csv")
 MODEL_PATH = os.path.join(BASE_DIR, "Models", "model.pkl")
 OUTPUT_PATH = os.path.join(BASE_DIR, "Predictions", "predicted_scores.csv")
+TABLE_PATH = os.path.join(BASE_DIR, "Models", "score_table.npy")
+# Published versions (machine_learning.model3.retrain) and the pointer naming
+# the one to serve; without a pointer the fixed paths above are served.
+VERSIONS_DIR = os.path.join(BASE_DIR, "Models", "versions")
+POINTER_PATH = os.path.join(BASE_DIR, "Models", "CURRENT")
+
+# Rows parsed and scored per step when streaming large prediction CSVs.
+CHUNK_ROWS = 50000
+
+# Loaded once per process and hot-swapped when model.pkl or the pointer changes on disk.
+MODEL_REGISTRY = ModelRegistry(MODEL_PATH, TABLE_PATH, POINTER_PATH)
+
 
+def _load_training_set(data_path):
+    """
+    (X, y) from a compact training manifest (.json), or from a CSV. A CSV
+    whose compact conversion is up to date is memory-mapped instead of parsed.
+    """
+    compact = data_path if data_path.endswith(".json") else training_data.default_compact_path(data_path)
+    if compact == data_path or training_data.is_fresh(compact, data_path):
+        with stage("model3", "train_load", path=compact) as info:
+            X, y = training_data.load_training_frame(compact)
+            info["rows"] = len(X)
+        return X, y
 
-def train_model():
-    print(" Loading dataset...")
-    df = pd.read_csv(DATA_PATH)
+    with stage("model3", "train_parse", path=data_path) as info:
+        df = pd.read_csv(data_path)
+        info["rows"] = len(df)
 
     lower_map = {c.lower(): c for c in df.columns}
     if "score" not in lower_map:
@@ -23,149 +50,240 @@ def train_model():
             + ", ".join(df.columns)
         )
     target_col = lower_map["score"]
+    return df.drop(columns=[target_col]), df[target_col]
+
+
+def train_model(data_path=None):
+    """
+    Fit the tree on the training data (CSV or compact manifest, see
+    training_data) and compile its score table. Slow and memory hungry: run it
+    ahead of time via machine_learning.model3.build, never from a request
+    handler.
+    """
+    # Training-only imports: serving processes never pay for sklearn/joblib.
+    import joblib
+    from sklearn.tree import DecisionTreeRegressor
 
-    X = df.drop(columns=[target_col])
-    y = df[target_col]
+    X, y = _load_training_set(data_path or DATA_PATH)
 
-    print(" Training Decision Tree model (memorization mode)...")
-    model = DecisionTreeRegressor(random_state=42, max_depth=None)
-    model.fit(X, y)
+    # Decision tree in memorization mode (unbounded depth)
+    with stage("model3", "train_fit", rows=len(X)):
+        model = DecisionTreeRegressor(random_state=42, max_depth=None)
+        model.fit(X, y)
 
     os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
     bundle = {"model": model, "feature_names": list(X.columns)}
-    joblib.dump(bundle, MODEL_PATH)
-    print(f"✅ Model saved at {MODEL_PATH}")
+    # Written aside and renamed so serving workers never load a half-written file.
+    joblib.dump(bundle, MODEL_PATH + ".tmp")
+    os.replace(MODEL_PATH + ".tmp", MODEL_PATH)
+    log_event("model_saved", path=MODEL_PATH)
 
+    compile_score_table(bundle)
 
-def _prepare_and_predict(X_pred):
-    print(" Loading model...")
-    loaded = joblib.load(MODEL_PATH)
 
-    if isinstance(loaded, dict) and "model" in loaded:
-        model = loaded["model"]
-        feature_names = loaded.get("feature_names")
-    else:
-        model = loaded
-        feature_names = None
-
-    if feature_names is not None:
-        for col in feature_names:
-            if col not in X_pred.columns:
-                X_pred[col] = 0
-        X_pred = X_pred[feature_names]
+def _model_stamp():
+    st = os.stat(MODEL_PATH)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def compile_score_table(bundle=None):
+    """
+    Compile the trained tree into a dense score table indexed by the packed
+    feature bitmask, verify it against the tree and save it next to the model.
+    """
+    if bundle is None:
+        model, feature_names = load_bundle(MODEL_PATH)
     else:
-        model_feats = getattr(model, "feature_names_in_", None)
-        if model_feats is not None:
-            model_feats = list(map(str, model_feats))
-            for col in model_feats:
-                if col not in X_pred.columns:
-                    X_pred[col] = 0
-            X_pred = X_pred[model_feats]
-
-    print(" Predicting scores...")
-    predictions = model.predict(X_pred)
-    try:
-        predictions = np.rint(predictions).astype(int)
-    except Exception:
-        predictions = pd.Series(predictions).round(0).astype(int).values
-
-    return model, predictions
-
-
-def predict_scores():
-    print(" Loading model and new data...")
-    new_data_original = pd.read_csv(NEW_DATA_PATH)
-
-    lower_map_new = {c.lower(): c for c in new_data_original.columns}
-
-    team_name_key = (
-        lower_map_new.get("team name")
-        or lower_map_new.get("team_name")
-        or lower_map_new.get("team")
-    )
-    team_series = new_data_original[team_name_key].copy() if team_name_key else None
+        model, feature_names = bundle["model"], bundle["feature_names"]
 
-    X_pred = new_data_original.copy()
+    with stage("model3", "compile_table", keys=1 << len(feature_names)):
+        table = score_table.compile_from_model(model, feature_names)
 
-    model, predictions = _prepare_and_predict(X_pred)
+    with stage("model3", "verify_table"):
+        mismatches = score_table.verify_score_table(table, model, feature_names)
+    if mismatches:
+        raise RuntimeError(f"Score table disagrees with the model on {mismatches} sampled keys.")
 
-    if team_series is not None:
-        team_name = team_series.astype(str)
+    score_table.save_score_table(table, feature_names, TABLE_PATH, source_stamp=_model_stamp())
+    log_event("score_table_saved", path=TABLE_PATH)
+
+
+def _prepare_and_predict(X_pred, loaded=None):
+    """
+    Score X_pred with `loaded` (default: the registry's current model).
+    Returns the LoadedModel snapshot that produced the predictions alongside
+    them.
+    """
+    loaded = loaded or MODEL_REGISTRY.get()
+
+    with stage("model3", "featurize", rows=len(X_pred)):
+        X_pred = loaded.align(X_pred)
+    with stage("model3", "predict", rows=len(X_pred), scorer=loaded.scorer, version=loaded.version):
+        predictions = loaded.predict_aligned(X_pred)
+
+    return loaded, predictions
+
+
+def team_column(columns):
+    """The input column holding team names, or None when rows are numbered instead."""
+    lower_map = {str(c).lower(): c for c in columns}
+    return lower_map.get("team name") or lower_map.get("team_name") or lower_map.get("team")
+
+
+def predict_dataframe(new_data: pd.DataFrame, start: int = 1, loaded=None) -> pd.DataFrame:
+    """
+    Score every row of new_data and return a `team_name,score` frame in input
+    order. Holds no global state and touches no files, so it is safe to call
+    from many threads or workers at once. Rows without a team column are
+    named "Team <n>" counting from `start`. Pass a LoadedModel to score
+    several frames with the same snapshot.
+    """
+    team_name_key = team_column(new_data.columns)
+
+    _, predictions = _prepare_and_predict(new_data, loaded)
+
+    if team_name_key:
+        team_name = new_data[team_name_key].astype(str)
     else:
         team_name = pd.Series(
-            [f"Team {i}" for i in range(1, len(new_data_original) + 1)],
-            index=new_data_original.index,
+            [f"Team {i}" for i in range(start, start + len(new_data))],
+            index=new_data.index,
         )
 
-    output_df = pd.DataFrame(
+    return pd.DataFrame(
         {
             "team_name": team_name,
-            "score": pd.Series(predictions, index=new_data_original.index).astype(int),
+            "score": pd.Series(predictions, index=new_data.index).astype(int),
         }
     )
 
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    output_df.to_csv(OUTPUT_PATH, index=False)
-    print(f"✅ Predictions saved to {OUTPUT_PATH}")
 
+def iter_predict_csv(stream, chunk_rows: int = CHUNK_ROWS, start: int = 1, header: bool = True, loaded=None):
+    """
+    Parse an input CSV (path or file-like object) in chunks of `chunk_rows`
+    rows and yield the `team_name,score` output as UTF-8 bytes, one chunk at a
+    time. Peak memory is bounded by the chunk size, not the file size.
+    Unnamed rows are numbered from `start`; header=False leaves out the output
+    header (for shards of a larger output, see model3.parallel).
+
+    Every chunk is scored with one LoadedModel, `loaded` or the registry's
+    current model when the stream starts, so a hot reload never mixes two
+    models in one output.
+    """
+    loaded = loaded or MODEL_REGISTRY.get()
+    write_header = header
+    # Everything but the feature columns is read as text: types are inferred
+    # per chunk, so a team column like "007" would otherwise come back as 7 in
+    # some chunks (and shards) and as "007" in others.
+    dtype = None if loaded.feature_names is None else collections.defaultdict(
+        lambda: str, {c: np.float64 for c in loaded.feature_names}
+    )
+    reader = pd.read_csv(stream, chunksize=chunk_rows, dtype=dtype)
+    while True:
+        with stage("model3", "parse") as info:
+            chunk = next(reader, None)
+            info["rows"] = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        output_df = predict_dataframe(chunk, start=start, loaded=loaded)
+        with stage("model3", "serialize", rows=len(output_df)):
+            data = output_df.to_csv(index=False, header=write_header).encode("utf-8")
+        yield data
+        write_header = False
+        start += len(chunk)
+    if write_header:
+        yield b"team_name,score\n"
+
+
+def predict_table(data: bytes, input_format: str = "csv", output_format: str = "csv", loaded=None) -> bytes:
+    """
+    Score a whole upload in any machine_learning.formats wire format (CSV,
+    Parquet, Arrow IPC) and serialize the team_name,score output the same way.
+    Use iter_predict_csv to stream large CSVs instead.
+    """
+    with stage("model3", "parse", format=input_format) as info:
+        new_data = formats.read_frame(data, input_format)
+        info["rows"] = len(new_data)
+    output_df = predict_dataframe(new_data, loaded=loaded)
+    with stage("model3", "serialize", rows=len(output_df), format=output_format):
+        return formats.write_frame(output_df, output_format)
+
+
+def predict_table_versioned(data: bytes, input_format: str = "csv", output_format: str = "csv"):
+    """predict_table() plus the version of the model that scored it, for callers that cache by version."""
+    loaded = MODEL_REGISTRY.get()
+    return predict_table(data, input_format, output_format, loaded), loaded.version
 
 
-def get_predictions_csv_path_for(input_csv_path: str):
+def predict_scores(input_path=None, output_path=None, workers=None):
     """
-    Run predictions for a specific input CSV path without overwriting the
-    default NEW_DATA_PATH on disk. Temporarily sets NEW_DATA_PATH in-memory,
-    executes predictions, then restores the original path. Returns the
-    model's OUTPUT_PATH where predictions were written.
+    Score input_path into output_path. With workers > 1 the file is split into
+    shards scored on that many processes (see model3.parallel).
     """
-    global NEW_DATA_PATH
-    original_input = NEW_DATA_PATH
-    try:
-        NEW_DATA_PATH = input_csv_path
-        if not os.path.exists(MODEL_PATH):
-            train_model()
-        predict_scores()
-        return OUTPUT_PATH
-    finally:
-        NEW_DATA_PATH = original_input
+    input_path = input_path or NEW_DATA_PATH
+    output_path = output_path or OUTPUT_PATH
+    if workers and workers > 1:
+        from machine_learning.model3.parallel import predict_csv_parallel
+
+        predict_csv_parallel(input_path, output_path, workers=workers)
+        return
+
+    with stage("model3", "parse", path=input_path) as info:
+        new_data = pd.read_csv(input_path)
+        info["rows"] = len(new_data)
+    output_df = predict_dataframe(new_data)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with stage("model3", "serialize", rows=len(output_df), path=output_path):
+        output_df.to_csv(output_path, index=False)
+
+
+def get_predictions_csv_path_for(input_csv_path: str, output_path=None, workers=None):
+    """
+    Run predictions for a specific input CSV path and return the path the
+    predictions were written to (OUTPUT_PATH unless output_path is given).
+    Prefer predict_dataframe / iter_predict_csv when no file is needed.
+    """
+    output_path = output_path or OUTPUT_PATH
+    predict_scores(input_csv_path, output_path, workers=workers)
+    return output_path
 
 
 def predict_score_from_json(json_input: dict) -> int:
-    if not os.path.exists(MODEL_PATH):
-        train_model()
-   
     tech_stack = json_input.get("tech_stack_used", "")
-    
-    loaded = joblib.load(MODEL_PATH)
-    if isinstance(loaded, dict) and "model" in loaded:
-        feature_names = loaded.get("feature_names")
-    else:
-        feature_names = getattr(loaded, "feature_names_in_", None)
-        if feature_names is not None:
-            feature_names = list(map(str, feature_names))
-    
-    if feature_names and "Score" in feature_names:
-        feature_names = [f for f in feature_names if f != "Score"]
-    
-    tech_input = {tech: 0 for tech in feature_names}
-    
-    techs = tech_stack.split()
-    for tech in techs:
-        for feature in feature_names:
-            if tech.lower() in feature.lower() or feature.lower() in tech.lower():
-                tech_input[feature] = 1
-                break
-    
-    X_pred = pd.DataFrame([tech_input])[feature_names]
-   
-    model, predictions = _prepare_and_predict(X_pred)
-    
-    return int(predictions[0])
+
+    loaded = MODEL_REGISTRY.get()
+    key, _ = loaded.matcher.match(tech_stack)
+
+    return int(loaded.predict_keys([key])[0])
+
+
+def predict_batch_from_json(json_inputs: list) -> list:
+    """
+    Score many {"team_name", "tech_stack_used"} inputs with a single
+    vectorized predict call. Returns (score, unknown_techs) per input, in
+    input order.
+    """
+    if not json_inputs:
+        return []
+
+    loaded = MODEL_REGISTRY.get()
+    keys = np.empty(len(json_inputs), dtype=np.uint32)
+    unknown = []
+    for i, json_input in enumerate(json_inputs):
+        keys[i], unknown_techs = loaded.matcher.match(json_input.get("tech_stack_used", ""))
+        unknown.append(unknown_techs)
+
+    scores = loaded.predict_keys(keys)
+    return [(int(score), unknown_techs) for score, unknown_techs in zip(scores, unknown)]
 
 
 
 if __name__ == "__main__":
-    if not os.path.exists(MODEL_PATH):
-        train_model()
+    configure_logging()
+    from machine_learning.model3.build import build
+
+    build()
     predict_scores()
     
     json_input1 = {
@@ -0,0 +1,175 @@
+import re
+
+# Canonical spellings for the model3 feature columns, on top of the aliases
+# derived automatically from each feature name (see _derived_aliases).
+TECH_ALIASES = {
+    "React": ["reactjs", "react.js"],
+    "Next.js": ["next"],
+    "Javascript/Typescript": ["js", "ts"],
+    "Express.js": ["express"],
+    "PostgreSQL/MongoDB": ["postgres", "mongo"],
+    "AWS": ["amazon web services"],
+    "GCP": ["google cloud", "google cloud platform"],
+    "Azure": ["microsoft azure"],
+    "Tensorflow/Pytorch": ["tf", "torch"],
+    "OpenCV": ["open cv", "cv2"],
+    "TailwindCss": ["tailwind", "tailwind css"],
+    "TanStack Query": ["tanstack", "react query"],
+    "Socket.io": ["socket io"],
+}
+
+# Technologies whose names contain a feature's name but are something else.
+# They are recognized (so no looser rule can claim them) and reported as
+# unknown without setting any feature bit.
+NOT_FEATURES = ["java", "c", "c++", "c#", "objective c", "react native", "preact", "next auth", "nextauth"]
+_NOT_A_FEATURE = object()
+
+_TOKEN_SPLIT = re.compile(r"[\s,;|/]+")
+_SEPARATORS = str.maketrans({"_": " ", "-": " "})
+_TOKEN_STRIP = ".()[]{}'\"`"
+_PIECE_SPLIT = re.compile(r"[^a-z0-9.#]+")
+_VERSION_SUFFIX = re.compile(r"v?\d[\d.]*$")
+_FALLBACK_CACHE_SIZE = 10000
+
+
+def normalize(text: str) -> str:
+    """Case-fold and treat `_` / `-` as spaces, so TanStack_Query == tanstack query."""
+    return " ".join(text.lower().translate(_SEPARATORS).split())
+
+
+def tokenize(text: str):
+    tokens = [t.strip(_TOKEN_STRIP) for t in _TOKEN_SPLIT.split(text.lower().translate(_SEPARATORS))]
+    return [t for t in tokens if t]
+
+
+def _derived_aliases(feature: str):
+    aliases = set()
+    for name in [feature] + feature.split("/"):
+        name = normalize(name)
+        if not name:
+            continue
+        aliases.add(name)
+        aliases.add(name.replace(".", ""))
+        aliases.add(name.replace(" ", ""))
+        if name.endswith(".js"):
+            aliases.add(name[:-3])
+    return aliases
+
+
+def legacy_match(tech_stack: str, feature_names):
+    """The original predict_score_from_json loop, kept as the reference the matcher tests compare against."""
+    tech_input = {tech: 0 for tech in feature_names}
+    for tech in tech_stack.split():
+        for feature in feature_names:
+            if tech.lower() in feature.lower() or feature.lower() in tech.lower():
+                tech_input[feature] = 1
+                break
+    return tech_input
+
+
+class TechStackMatcher:
+    """
+    Maps a free-text tech stack to the model3 feature bitmask in one pass.
+
+    Aliases are compiled once into a hash index keyed by normalized phrases;
+    each position in the token stream tries the longest phrase first, so
+    multi-word names ("react query") win over their prefixes ("react").
+    Tokens with no exact alias fall back to their word-boundary pieces
+    ("python3", "reactjs+redux"), each of which must itself be an exact
+    alias; a name inside a longer word never matches ("java" is not
+    "javascript", "reactnative" is not "react").
+    """
+
+    def __init__(self, feature_names, aliases=None):
+        self.feature_names = list(feature_names)
+        n = len(self.feature_names)
+        self.bits = {f: 1 << (n - 1 - i) for i, f in enumerate(self.feature_names)}
+
+        index = {}
+        ambiguous = set()
+        for feature in self.feature_names:
+            for alias in _derived_aliases(feature):
+                if index.setdefault(alias, feature) != feature:
+                    ambiguous.add(alias)
+        for alias in ambiguous:
+            del index[alias]
+        for alias in NOT_FEATURES:
+            index.setdefault(normalize(alias), _NOT_A_FEATURE)
+        # The explicit table always wins over derived aliases.
+        for feature, extra in (TECH_ALIASES if aliases is None else aliases).items():
+            if feature in self.bits:
+                for alias in extra:
+                    index[normalize(alias)] = feature
+
+        self.index = index
+        # Multi-word aliases are keyed by their first word, longest first, so
+        # the common single-word case costs one dict lookup per token.
+        self.phrases = {}
+        for alias, feature in index.items():
+            words = alias.split(" ")
+            if len(words) > 1:
+                self.phrases.setdefault(words[0], []).append((words, feature))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda c: (-len(c[0]), c[0]))
+        self._fallback_cache = {}
+
+    def _lookup(self, word):
+        # Exact alias, else the alias with a version number dropped ("python3", "tensorflow2.0").
+        feature = self.index.get(word)
+        if feature is None:
+            bare = _VERSION_SUFFIX.sub("", word)
+            if bare and bare != word:
+                feature = self.index.get(bare)
+        return feature
+
+    def _fallback(self, token):
+        """Bitmask for a token without an exact alias (0 when nothing matches)."""
+        if token in self._fallback_cache:
+            return self._fallback_cache[token]
+        feature = self._lookup(token)
+        if feature is not None:
+            pieces = [feature]
+        else:
+            pieces = [self._lookup(piece) for piece in _PIECE_SPLIT.split(token) if piece]
+        mask = 0
+        for feature in pieces:
+            if feature is not None and feature is not _NOT_A_FEATURE:
+                mask |= self.bits[feature]
+        if len(self._fallback_cache) < _FALLBACK_CACHE_SIZE:
+            self._fallback_cache[token] = mask
+        return mask
+
+    def match(self, tech_stack: str):
+        """Return (bitmask, unknown_tokens) for a tech stack string."""
+        tokens = tokenize(tech_stack)
+        index, phrases, bits = self.index, self.phrases, self.bits
+        mask = 0
+        unknown = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            token = tokens[i]
+            width = 1
+            feature = None
+            for words, candidate in phrases.get(token, ()):
+                if tokens[i:i + len(words)] == words:
+                    feature, width = candidate, len(words)
+                    break
+            if feature is None:
+                feature = index.get(token)
+            if feature is None:
+                matched = self._fallback(token)
+                if matched:
+                    mask |= matched
+                else:
+                    unknown.append(token)
+            elif feature is _NOT_A_FEATURE:
+                unknown.append(" ".join(tokens[i:i + width]))
+            else:
+                mask |= bits[feature]
+            i += width
+        return mask, unknown
+
+    def features(self, mask):
+        return [f for f in self.feature_names if mask & self.bits[f]]
+
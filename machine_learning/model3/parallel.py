@@ -0,0 +1,210 @@
+import argparse
+import io
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from machine_learning.metrics import configure_logging, log_event, log_level, stage
+
+# Multi-core scoring of one large prediction CSV: the file is cut at line
+# boundaries into byte-range shards, each shard is parsed and scored by a
+# worker process straight from the input file, and the per-shard outputs are
+# concatenated in input order.
+#
+#   python -m machine_learning.model3.parallel big.csv -o scores.csv --workers 8
+#
+# Workers load the model through their own ModelRegistry, which memory-maps
+# score_table.npy (the tree is never unpickled while the table is fresh), so
+# every process shares the same page-cache copy of the model.
+#
+# Shards assume one record per line, which holds for model3 inputs (0/1
+# feature columns and a team name); quoted fields with embedded newlines are
+# not supported here, use predict_scores / iter_predict_csv for those.
+
+SHARDS_PER_WORKER = 4
+MIN_SHARD_BYTES = 1 << 20
+
+
+class _RangeReader(io.RawIOBase):
+    """Read-only view of bytes [start, stop) of a file, optionally preceded by a prefix."""
+
+    def __init__(self, path, start, stop, prefix=b""):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = stop - start
+        self._prefix = prefix
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        if self._remaining <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def open_range(path, start, stop, prefix=b""):
+    """Buffered binary stream over bytes [start, stop) of path, preceded by prefix (e.g. the CSV header)."""
+    return io.BufferedReader(_RangeReader(path, start, stop, prefix), 1 << 20)
+
+
+def shard_bounds(path, shards):
+    """
+    (header line, [offsets]) where shard i covers bytes offsets[i]:offsets[i+1]
+    of path. Every offset is the start of a line, so no row is split.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        data_start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        offsets = [data_start]
+        for i in range(1, shards):
+            pos = data_start + (size - data_start) * i // shards
+            if pos <= offsets[-1]:
+                continue
+            # Seeking one byte back keeps a split that already falls on a line start.
+            f.seek(pos - 1)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > offsets[-1]:
+                offsets.append(pos)
+        offsets.append(size)
+    return header, offsets
+
+
+def _count_rows(path, start, stop):
+    # Blank lines are skipped by the CSV parser, so they do not get a number.
+    with open_range(path, start, stop) as f:
+        return sum(1 for line in f if line.strip())
+
+
+def _init_worker(level):
+    from machine_learning.model3.main import MODEL_REGISTRY
+
+    configure_logging(level)
+    MODEL_REGISTRY.warmup()
+
+
+def _score_shard(input_path, header, start, stop, first_row, output_path, chunk_rows):
+    """Worker entry point: score one byte range into output_path. Returns (rows, model version)."""
+    from machine_learning.model3.main import MODEL_REGISTRY, iter_predict_csv
+
+    loaded = MODEL_REGISTRY.get()
+    rows = 0
+    with open_range(input_path, start, stop, prefix=header) as src, open(output_path, "wb") as out:
+        for data in iter_predict_csv(src, chunk_rows, start=first_row, header=False, loaded=loaded):
+            out.write(data)
+            rows += data.count(b"\n")
+    return rows, loaded.version
+
+
+def worker_pool(workers):
+    """A spawn process pool whose workers come up with the model already mapped and warm."""
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(log_level(),),
+    )
+
+
+def predict_csv_parallel(input_path, output_path, workers=None, shards=None, chunk_rows=None, executor=None,
+                         progress=None):
+    """
+    Score input_path into output_path with the same output as predict_scores,
+    using `workers` processes (default: CPU count) over `shards` byte ranges
+    (default: SHARDS_PER_WORKER per worker, none smaller than MIN_SHARD_BYTES).
+    Pass an executor to reuse a warm pool across calls; progress(fraction) is
+    called as shards finish. Returns the number of rows scored.
+    """
+    from machine_learning.model3.main import CHUNK_ROWS, team_column
+
+    workers = workers or os.cpu_count() or 1
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    if shards is None:
+        size = os.path.getsize(input_path)
+        shards = max(1, min(workers * SHARDS_PER_WORKER, size // MIN_SHARD_BYTES))
+
+    header, offsets = shard_bounds(input_path, shards)
+    ranges = list(zip(offsets[:-1], offsets[1:]))
+    total_bytes = max(offsets[-1] - offsets[0], 1)
+    columns = header.decode("utf-8-sig").strip().split(",")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    part_paths = [f"{output_path}.part{i:04d}" for i in range(len(ranges))]
+    pool = executor or worker_pool(workers)
+    try:
+        with stage("model3", "parallel_score", shards=len(ranges), workers=workers, path=input_path) as info:
+            # "Team <n>" names depend on how many rows precede each shard.
+            first_rows = [1] * len(ranges)
+            if team_column(columns) is None and len(ranges) > 1:
+                counts = pool.map(_count_rows, [input_path] * len(ranges), offsets[:-1], offsets[1:])
+                for i, count in enumerate(counts):
+                    if i + 1 < len(ranges):
+                        first_rows[i + 1] = first_rows[i] + count
+
+            futures = {
+                pool.submit(_score_shard, input_path, header, start, stop, first_rows[i], part_paths[i], chunk_rows): i
+                for i, (start, stop) in enumerate(ranges)
+            }
+            rows, versions, done_bytes = 0, set(), 0
+            for future in as_completed(futures):
+                shard_rows, version = future.result()
+                rows += shard_rows
+                versions.add(version)
+                start, stop = ranges[futures[future]]
+                done_bytes += stop - start
+                if progress is not None:
+                    progress(done_bytes / total_bytes)
+            if len(versions) > 1:
+                raise RuntimeError("model.pkl changed while scoring; the shards used different models, rerun")
+            info["rows"] = rows
+
+        with stage("model3", "merge", shards=len(ranges), path=output_path):
+            tmp_path = output_path + ".tmp"
+            with open(tmp_path, "wb") as out:
+                out.write(b"team_name,score\n")
+                for part_path in part_paths:
+                    with open(part_path, "rb") as part:
+                        shutil.copyfileobj(part, out, 1 << 20)
+            os.replace(tmp_path, output_path)
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures=True)
+        for path in part_paths + [output_path + ".tmp"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    log_event("parallel_scored", rows=rows, shards=len(ranges), workers=workers, version=versions.pop() if versions else None)
+    return rows
+
+
+if __name__ == "__main__":
+    from machine_learning.model3.main import OUTPUT_PATH
+
+    parser = argparse.ArgumentParser(description="Score a large model3 CSV on several processes")
+    parser.add_argument("input", help="Prediction CSV (feature columns, optional team name column)")
+    parser.add_argument("-o", "--output", default=OUTPUT_PATH, help="Output CSV (default: Predictions/predicted_scores.csv)")
+    parser.add_argument("-w", "--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--shards", type=int, help=f"Byte-range shards (default: {SHARDS_PER_WORKER} per worker)")
+    parser.add_argument("--chunk-rows", type=int, help="Rows parsed per step inside a shard")
+    args = parser.parse_args()
+
+    configure_logging()
+    started = time.perf_counter()
+    n = predict_csv_parallel(args.input, args.output, args.workers, args.shards, args.chunk_rows)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {n} rows in {elapsed:.2f}s ({n / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}")
@@ -0,0 +1,268 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.metrics import MODEL_LOADS, STAGE_SECONDS, log_event
+from machine_learning.model3 import score_table
+from machine_learning.model3.matcher import TechStackMatcher
+
+
+def _stat_stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def file_digest(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_bundle(model_path):
+    """Unpickle model.pkl and resolve its feature names. Returns (model, feature_names)."""
+    import joblib  # pulls in sklearn via the pickle; only needed when the tree itself is used
+
+    loaded = joblib.load(model_path)
+    if isinstance(loaded, dict) and "model" in loaded:
+        model = loaded["model"]
+        feature_names = loaded.get("feature_names")
+    else:
+        model = loaded
+        feature_names = None
+    if feature_names is None:
+        model_feats = getattr(model, "feature_names_in_", None)
+        if model_feats is not None:
+            feature_names = list(map(str, model_feats))
+    if feature_names is not None:
+        feature_names = [f for f in feature_names if f != "Score"]
+    return model, feature_names
+
+
+class LoadedModel:
+    """
+    One immutable snapshot of model.pkl (plus its score table when the table
+    was compiled from this exact file). Requests hold on to the snapshot they
+    started with, so a reload never changes the model under an in-flight call.
+    """
+
+    def __init__(self, model_path, model, feature_names, table, version, stamp, load_seconds):
+        self.model_path = model_path
+        self.feature_names = feature_names
+        self.table = table
+        self.version = version
+        self.stamp = stamp
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._model = model
+        self._model_lock = threading.Lock()
+        self.matcher = TechStackMatcher(feature_names) if feature_names is not None else None
+
+    @property
+    def scorer(self):
+        return "table" if self.table is not None else "tree"
+
+    @property
+    def model(self):
+        # With a fresh score table the tree is only needed for non 0/1 inputs,
+        # so it is unpickled on first use instead of at load time.
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model, _ = load_bundle(self.model_path)
+        return self._model
+
+    def align(self, X_pred):
+        if self.feature_names is None:
+            return X_pred
+        return X_pred.reindex(columns=self.feature_names, fill_value=0)
+
+    def predict_matrix(self, values):
+        """Predict rounded integer scores for a matrix already in feature_names column order."""
+        values = np.asarray(values)
+        if self.table is not None and score_table.is_binary(values):
+            return score_table.lookup(self.table, values)
+        predictions = self.model.predict(pd.DataFrame(values, columns=self.feature_names))
+        return np.rint(predictions).astype(int)
+
+    def predict_keys(self, keys):
+        """Predict rounded integer scores for packed feature bitmasks."""
+        keys = np.asarray(keys, dtype=np.uint32)
+        if self.table is not None:
+            return np.asarray(self.table[keys], dtype=int)
+        return self.predict_matrix(score_table.unpack_keys(keys, len(self.feature_names)))
+
+    def predict(self, X_pred):
+        return self.predict_aligned(self.align(X_pred))
+
+    def predict_aligned(self, X_pred):
+        """predict() for a frame that already went through align()."""
+        if self.feature_names is None:
+            return np.rint(self.model.predict(X_pred)).astype(int)
+        return self.predict_matrix(X_pred.to_numpy())
+
+    def info(self):
+        return {
+            "version": self.version,
+            "scorer": self.scorer,
+            "feature_names": self.feature_names,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 4),
+        }
+
+
+VERSION_MANIFEST = "manifest.json"
+
+
+def _verify_checksums(version_dir, model_digest, table_path):
+    """Check a published version against the sha256 sums in its manifest.json (see retrain)."""
+    with open(os.path.join(version_dir, VERSION_MANIFEST), encoding="utf-8") as f:
+        expected = json.load(f)["files"]
+    if expected["model.pkl"]["sha256"] != model_digest:
+        raise ValueError(f"model.pkl in {version_dir} does not match its manifest checksum")
+    if table_path is not None:
+        for path in (table_path, os.path.splitext(table_path)[0] + ".json"):
+            name = os.path.basename(path)
+            if name in expected and expected[name]["sha256"] != file_digest(path):
+                raise ValueError(f"{name} in {version_dir} does not match its manifest checksum")
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the current LoadedModel. get() is a stat() call on
+    the fast path; when model.pkl or the score table changes on disk the new
+    artifact is loaded and swapped in with a single reference assignment.
+
+    With a pointer_path, the artifacts are those of the published version the
+    pointer file names (a directory relative to it holding model.pkl and
+    score_table.npy, see retrain); model_path / table_path are only used
+    until a first version is published. Versions are immutable, so repointing
+    is the only change a worker ever sees, and it is a single rename.
+    """
+
+    def __init__(self, model_path, table_path, pointer_path=None):
+        self.model_path = model_path
+        self.table_path = table_path
+        self.pointer_path = pointer_path
+        self.reloads = 0
+        self.last_error = None
+        self._current = None
+        self._warmed = False
+        self._failed_stamp = None
+        self._pointer = (None, None)
+        self._lock = threading.Lock()
+
+    def artifact_paths(self):
+        """(model path, table path) being served: the pointed-to version's, else the fixed ones."""
+        if self.pointer_path is None:
+            return self.model_path, self.table_path
+        try:
+            st = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return self.model_path, self.table_path
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._pointer[0] != stamp:
+            with open(self.pointer_path, encoding="utf-8") as f:
+                version_dir = os.path.join(os.path.dirname(self.pointer_path), f.read().strip())
+            self._pointer = (stamp, (os.path.join(version_dir, "model.pkl"), os.path.join(version_dir, "score_table.npy")))
+        return self._pointer[1]
+
+    def available(self):
+        """True when there is a model artifact to serve."""
+        return os.path.exists(self.artifact_paths()[0])
+
+    def _disk_stamp(self):
+        model_path, table_path = self.artifact_paths()
+        return (_stat_stamp(model_path), _stat_stamp(os.path.splitext(table_path)[0] + ".json"), model_path, table_path)
+
+    def _load(self, stamp):
+        start = time.perf_counter()
+        model_path, table_path = stamp[2:]
+        digest = file_digest(model_path)
+
+        model, feature_names, table = None, None, None
+        compiled = score_table.load_score_table(table_path)
+        if compiled is not None and compiled[1].get("source_stamp") == list(stamp[0]):
+            table, feature_names = compiled[0], compiled[1]["feature_names"]
+        else:
+            model, feature_names = load_bundle(model_path)
+
+        version_dir = os.path.dirname(model_path)
+        if os.path.exists(os.path.join(version_dir, VERSION_MANIFEST)):
+            _verify_checksums(version_dir, digest, table_path if table is not None else None)
+
+        return LoadedModel(model_path, model, feature_names, table, digest[:12], stamp, time.perf_counter() - start)
+
+    def get(self) -> LoadedModel:
+        current = self._current
+        stamp = self._disk_stamp()
+        if current is not None and (current.stamp == stamp or stamp == self._failed_stamp):
+            return current
+        if stamp[0] is None:
+            if current is not None:
+                return current
+            raise FileNotFoundError(
+                f"Model artifact not found at {stamp[2]}; "
+                "build it ahead of time with `python -m machine_learning.model3.build`"
+            )
+
+        # Only one thread reloads; everyone else keeps serving the current snapshot.
+        if not self._lock.acquire(blocking=current is None):
+            return current
+        try:
+            current = self._current
+            if current is not None and current.stamp == stamp:
+                return current
+            try:
+                loaded = self._load(stamp)
+            except Exception as e:
+                if current is None:
+                    raise
+                # e.g. model.pkl caught mid-write: keep the old model until the file changes again
+                self._failed_stamp = stamp
+                self.last_error = str(e)
+                MODEL_LOADS.inc(model="model3", result="failed")
+                log_event("model_reload_failed", logging.WARNING, version=current.version, error=str(e))
+                return current
+            if current is not None:
+                self.reloads += 1
+            self._current = loaded
+            self._failed_stamp = None
+            self.last_error = None
+            MODEL_LOADS.inc(model="model3", result="ok")
+            STAGE_SECONDS.observe(loaded.load_seconds, model="model3", stage="model_load")
+            log_event(
+                "model_loaded", version=loaded.version, scorer=loaded.scorer, seconds=round(loaded.load_seconds, 6)
+            )
+            return loaded
+        finally:
+            self._lock.release()
+
+    def warmup(self) -> LoadedModel:
+        """Load the artifact and run one prediction so the first request is not cold."""
+        loaded = self.get()
+        if loaded.feature_names is not None:
+            loaded.predict_matrix(np.zeros((1, len(loaded.feature_names)), dtype=np.uint8))
+        self._warmed = True
+        return loaded
+
+    @property
+    def ready(self):
+        """True once a snapshot is loaded and warmed; hot reloads swap in without going unready."""
+        return self._warmed and self._current is not None
+
+    def info(self):
+        current = self._current
+        info = current.info() if current is not None else {"version": None}
+        info.update({"ready": self.ready, "reloads": self.reloads, "last_error": self.last_error})
+        return info
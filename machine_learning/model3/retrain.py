@@ -0,0 +1,585 @@
+"""
+Retrain model3 out of core and publish it as a new immutable version, safely
+next to a running server:
+
+    python -m machine_learning.model3.retrain                          # combined_data.csv -> check -> promote
+    python -m machine_learning.model3.retrain --data new_scores.csv --data Final_data/combined_data.train.json
+    python -m machine_learning.model3.retrain --no-promote             # publish and check only
+    python -m machine_learning.model3.retrain --list
+    python -m machine_learning.model3.retrain --promote <version>
+    python -m machine_learning.model3.retrain --rollback
+
+Pipeline:
+  1. ingest   Training CSVs are cut into line-aligned byte ranges (as in
+              parallel) and compact manifests (training_data) into row
+              ranges. Worker processes stream their range in chunks and
+              reduce it to per-key score sums and counts, so memory depends
+              on the number of features, never on the number of rows.
+  2. holdout  A seeded fraction of the keys (--holdout, all rows of each)
+              is set aside and a tree fit on the rest. Its MAE on the
+              held-out keys must not exceed the previous version's on the
+              same split (within --max-mae-increase), or, with no comparable
+              previous version, the MAE of predicting the training mean.
+  3. fit      The published tree is then fit on every key, weighted by how
+              often it occurs, with each key's mean score as the target,
+              which is what the unbounded tree predicts for a key in the raw
+              rows. sklearn fits a single tree on one core.
+  4. compile  The score table is compiled on a thread pool (tree prediction
+              releases the GIL).
+  5. stage    model.pkl, score_table.npy/.json and manifest.json (sha256 of
+              every file, data sources) go to a staging directory.
+  6. check    The staged version is loaded the way a worker loads it,
+              checksums included. It must serve exactly what its tree
+              predicts (table sample and test_data.csv).
+  7. publish  The files are fsynced and the directory is renamed to
+              versions/<version>. When both checks passed, the CURRENT
+              pointer is replaced atomically and workers switch on their
+              next request (ModelRegistry). A failed version stays on disk
+              for inspection and is never served unless forced.
+
+Worker processes run at lower priority (ML_RETRAIN_NICE) and default to one
+less than the CPU count, so serving keeps a core to itself.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.metrics import configure_logging, log_event, log_level, stage
+from machine_learning.model3 import score_table, training_data
+from machine_learning.model3.main import (
+    DATA_PATH,
+    MODEL_REGISTRY,
+    NEW_DATA_PATH,
+    POINTER_PATH,
+    VERSIONS_DIR,
+)
+from machine_learning.model3.parallel import MIN_SHARD_BYTES, SHARDS_PER_WORKER, open_range, shard_bounds
+from machine_learning.model3.registry import VERSION_MANIFEST, ModelRegistry, file_digest
+
+RETRAIN_WORKERS = int(os.environ.get("ML_RETRAIN_WORKERS", "0")) or max((os.cpu_count() or 1) - 1, 1)
+RETRAIN_NICE = int(os.environ.get("ML_RETRAIN_NICE", "10"))
+CHUNK_ROWS = training_data.CHUNK_ROWS
+PARITY_SAMPLE = 65536
+HOLDOUT_FRACTION = 0.05
+MAX_MAE_INCREASE = 0.0
+KEEP_VERSIONS = 5
+VERSION_FILES = ("model.pkl", "score_table.npy", "score_table.json")
+
+
+# --- Ingest (worker processes) ---
+def _init_worker(nice, level):
+    configure_logging(level)
+    if nice and hasattr(os, "nice"):
+        os.nice(nice)
+
+
+def _save_partial(out_prefix, sums, counts):
+    np.save(out_prefix + ".sums.npy", sums)
+    np.save(out_prefix + ".counts.npy", counts)
+
+
+def _ingest_csv_shard(path, header, start, stop, feature_names, target, out_prefix, chunk_rows):
+    """Reduce bytes [start, stop) of a training CSV to per-key sums/counts files. Returns the row count."""
+    size = 1 << len(feature_names)
+    sums = np.zeros(size, dtype=np.float64)
+    counts = np.zeros(size, dtype=np.int64)
+    rows = 0
+    with open_range(path, start, stop, prefix=header) as src:
+        for chunk in pd.read_csv(src, chunksize=chunk_rows, dtype={c: np.int64 for c in feature_names}):
+            values = chunk[feature_names].to_numpy()
+            bad = np.flatnonzero(((values != 0) & (values != 1)).any(axis=1))
+            if len(bad):
+                raise ValueError(f"{path}: row {rows + int(bad[0]) + 1} after byte {start} has a feature value other than 0/1")
+            scores = pd.to_numeric(chunk[target], errors="coerce").to_numpy(dtype=np.float64)
+            if not np.isfinite(scores).all():
+                raise ValueError(f"{path}: missing or non-finite scores after byte {start}")
+            keys = score_table.pack_keys(values)
+            sums += np.bincount(keys, weights=scores, minlength=size)
+            counts += np.bincount(keys, minlength=size)
+            rows += len(chunk)
+    _save_partial(out_prefix, sums, counts)
+    return rows
+
+
+def _ingest_compact_shard(manifest_path, start, stop, n_features, out_prefix, chunk_rows):
+    """Reduce rows [start, stop) of a compact training set to per-key sums/counts files."""
+    keys, scores, _ = training_data.load_training_data(manifest_path)
+    size = 1 << n_features
+    sums = np.zeros(size, dtype=np.float64)
+    counts = np.zeros(size, dtype=np.int64)
+    for i in range(start, stop, chunk_rows):
+        part = np.asarray(keys[i:min(i + chunk_rows, stop)])
+        sums += np.bincount(part, weights=np.asarray(scores[i:i + len(part)], dtype=np.float64), minlength=size)
+        counts += np.bincount(part, minlength=size)
+    _save_partial(out_prefix, sums, counts)
+    return stop - start
+
+
+def _source_columns(path):
+    """(feature columns, target column) of a training CSV or compact manifest."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        return manifest["feature_names"], manifest["target"]
+    header = pd.read_csv(path, nrows=0).columns.tolist()
+    lower_map = {c.lower(): c for c in header}
+    if "score" not in lower_map:
+        raise KeyError(f"Target column 'score' not found in {path}. Available columns: " + ", ".join(header))
+    target = lower_map["score"]
+    return [c for c in header if c != target], target
+
+
+def ingest(sources, pool, workers, scratch_dir, chunk_rows=CHUNK_ROWS):
+    """
+    Reduce every training source to per-key score sums and counts on `pool`.
+    All sources must have the same feature columns (the first one's order
+    wins; compact manifests must match it exactly since their keys are
+    packed). Returns (feature_names, sums, counts, source records).
+    """
+    feature_names, tasks, records = None, [], []
+    for source_index, path in enumerate(sources):
+        columns, target = _source_columns(path)
+        compact = path.endswith(".json")
+        if feature_names is None:
+            feature_names = columns
+            if len(feature_names) > score_table.MAX_TABLE_BITS:
+                raise ValueError(f"{len(feature_names)} features do not fit a score table (limit is {score_table.MAX_TABLE_BITS})")
+        if (columns != feature_names) if compact else (sorted(columns) != sorted(feature_names)):
+            raise ValueError(f"{path} has features {columns}, expected {feature_names}")
+
+        if compact:
+            with open(path, encoding="utf-8") as f:
+                rows = json.load(f)["rows"]
+            shards = max(1, min(workers * SHARDS_PER_WORKER, rows // chunk_rows))
+            bounds = [rows * i // shards for i in range(shards + 1)]
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                prefix = os.path.join(scratch_dir, f"part{len(tasks):05d}")
+                tasks.append((source_index, prefix, _ingest_compact_shard,
+                              (path, start, stop, len(feature_names), prefix, chunk_rows)))
+        else:
+            size = os.path.getsize(path)
+            header, offsets = shard_bounds(path, max(1, min(workers * SHARDS_PER_WORKER, size // MIN_SHARD_BYTES)))
+            for start, stop in zip(offsets[:-1], offsets[1:]):
+                prefix = os.path.join(scratch_dir, f"part{len(tasks):05d}")
+                tasks.append((source_index, prefix, _ingest_csv_shard,
+                              (path, header, start, stop, feature_names, target, prefix, chunk_rows)))
+        st = os.stat(path)
+        records.append({"path": os.path.abspath(path), "stamp": [st.st_mtime_ns, st.st_size], "rows": 0})
+
+    sums = np.zeros(1 << len(feature_names), dtype=np.float64)
+    counts = np.zeros(1 << len(feature_names), dtype=np.int64)
+    futures = {pool.submit(fn, *args): (source_index, prefix) for source_index, prefix, fn, args in tasks}
+    for future in as_completed(futures):
+        source_index, prefix = futures[future]
+        records[source_index]["rows"] += future.result()
+        # Partials are summed as they arrive, so at most one is in memory here.
+        sums += np.load(prefix + ".sums.npy")
+        counts += np.load(prefix + ".counts.npy")
+        os.remove(prefix + ".sums.npy")
+        os.remove(prefix + ".counts.npy")
+    return feature_names, sums, counts, records
+
+
+# --- Fit and compile ---
+def fit(feature_names, sums, counts):
+    """Fit the memorizing tree on the distinct keys (see module docstring)."""
+    from sklearn.tree import DecisionTreeRegressor
+
+    keys = np.flatnonzero(counts).astype(np.uint32)
+    weights = counts[keys]
+    X = pd.DataFrame(score_table.unpack_keys(keys, len(feature_names)), columns=feature_names)
+    y = sums[keys] / weights
+    model = DecisionTreeRegressor(random_state=42, max_depth=None)
+    # With every key seen once this is exactly train_model's fit.
+    model.fit(X, y, sample_weight=weights if weights.max() > 1 else None)
+    return model
+
+
+def _stage_files(staging, model, feature_names, workers):
+    import joblib
+
+    model_path = os.path.join(staging, "model.pkl")
+    joblib.dump({"model": model, "feature_names": list(feature_names)}, model_path)
+    with stage("model3", "retrain_compile", keys=1 << len(feature_names), workers=workers):
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ml-retrain") as threads:
+            table = score_table.compile_from_model(model, feature_names, executor=threads)
+    st = os.stat(model_path)
+    # The stamp survives the rename to versions/<version>, which keeps the table fresh for the registry.
+    score_table.save_score_table(table, feature_names, os.path.join(staging, "score_table.npy"),
+                                 source_stamp=[st.st_mtime_ns, st.st_size])
+    return table
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_tree(path):
+    for name in os.listdir(path):
+        with open(os.path.join(path, name), "rb") as f:
+            os.fsync(f.fileno())
+    _fsync_dir(path)
+
+
+# --- Holdout check ---
+def holdout_keys(counts, fraction=HOLDOUT_FRACTION, seed=0):
+    """
+    Seeded mask of the keys held out of the evaluation fit. A key is held out
+    with all of its rows, so none of them leak into training, and the mask only
+    depends on the seed and the number of features.
+    """
+    if fraction <= 0:
+        return np.zeros(len(counts), dtype=bool)
+    return (np.random.default_rng(seed).random(len(counts)) < fraction) & (counts > 0)
+
+
+def _parent_holdout(parent, feature_names, fraction, seed):
+    if parent is None:
+        return None
+    try:
+        previous = read_manifest(parent).get("parity", {}).get("holdout") or {}
+    except KeyError:
+        return None
+    same_split = (previous.get("feature_names"), previous.get("fraction"), previous.get("seed")) == (list(feature_names), fraction, seed)
+    return previous.get("mae") if same_split else None
+
+
+def holdout_check(feature_names, sums, counts, fraction=HOLDOUT_FRACTION, seed=0, parent=None,
+                  max_mae_increase=MAX_MAE_INCREASE):
+    """
+    Fit a tree without the held-out keys and measure its MAE on them against
+    each key's mean score, weighted by row count. The gate is the parent
+    version's holdout MAE on the same split (plus max_mae_increase), or the
+    MAE of predicting the training mean when there is no comparable parent.
+    Returns (report dict, list of problems).
+    """
+    held = holdout_keys(counts, fraction, seed)
+    report = {"feature_names": list(feature_names), "fraction": fraction, "seed": seed,
+              "keys": int(np.count_nonzero(held)), "rows": int(counts[held].sum()), "mae": None}
+    if not held.any() or held.sum() == np.count_nonzero(counts):
+        log_event("retrain_holdout_skipped", fraction=fraction, keys=report["keys"])
+        return report, []
+
+    train_sums, train_counts = np.where(held, 0, sums), np.where(held, 0, counts)
+    with stage("model3", "retrain_holdout_fit", keys=int(np.count_nonzero(train_counts)), holdout=report["keys"]):
+        model = fit(feature_names, train_sums, train_counts)
+    keys = np.flatnonzero(held).astype(np.uint32)
+    weights = counts[keys]
+    targets = sums[keys] / weights
+    X = pd.DataFrame(score_table.unpack_keys(keys, len(feature_names)), columns=feature_names)
+    predicted = np.rint(model.predict(X))
+    report["mae"] = round(float(np.average(np.abs(predicted - targets), weights=weights)), 6)
+    report["mean_baseline_mae"] = round(float(np.average(np.abs(train_sums.sum() / train_counts.sum() - targets), weights=weights)), 6)
+
+    report["parent_mae"] = _parent_holdout(parent, feature_names, fraction, seed)
+    if report["parent_mae"] is not None:
+        limit, against = report["parent_mae"] + max_mae_increase, f"version {parent}'s {report['parent_mae']}"
+    else:
+        limit, against = report["mean_baseline_mae"], f"{report['mean_baseline_mae']} for predicting the training mean"
+    if report["mae"] > limit:
+        problems = [f"MAE on {report['keys']} held-out keys is {report['mae']}, against {against} (allowed increase {max_mae_increase})"]
+    else:
+        problems = []
+    return report, problems
+
+
+# --- Parity check ---
+def parity_check(version_dir, model, feature_names, counts, serving=None, sample_size=PARITY_SAMPLE,
+                 sample_csv=NEW_DATA_PATH, seed=0):
+    """
+    Load the version in version_dir exactly as a worker would and check that
+    it serves exactly what its tree predicts; agreement with the serving model
+    on a key sample is reported, not gated. Returns (report dict, list of
+    problems).
+    """
+    problems = []
+    candidate = ModelRegistry(os.path.join(version_dir, "model.pkl"), os.path.join(version_dir, "score_table.npy")).warmup()
+    if candidate.scorer != "table":
+        problems.append("the score table was not picked up with the model")
+        return {"passed": False}, problems
+
+    table_mismatches = score_table.verify_score_table(candidate.table, model, feature_names, sample_size=sample_size, seed=seed)
+    if table_mismatches:
+        problems.append(f"score table disagrees with the tree on {table_mismatches} sampled keys")
+
+    report = {"table_mismatches": table_mismatches, "serving_version": None, "agreement_with_serving": None}
+    if serving is not None:
+        report["serving_version"] = serving.version
+        if list(serving.feature_names or []) == list(feature_names):
+            seen = np.flatnonzero(counts)
+            rng = np.random.default_rng(seed)
+            keys = rng.choice(seen, size=min(sample_size, len(seen)), replace=False).astype(np.uint32)
+            report["agreement_with_serving"] = round(float((serving.predict_keys(keys) == candidate.predict_keys(keys)).mean()), 6)
+        else:
+            log_event("retrain_features_changed", serving=serving.feature_names, candidate=list(feature_names))
+
+    if sample_csv and os.path.exists(sample_csv):
+        # End to end on real input: what workers will serve must match the tree exactly.
+        sample = pd.read_csv(sample_csv)
+        served = candidate.predict(sample)
+        expected = np.rint(model.predict(sample.reindex(columns=feature_names, fill_value=0))).astype(int)
+        report["sample_csv_mismatches"] = int((np.asarray(served) != expected).sum())
+        if report["sample_csv_mismatches"]:
+            problems.append(f"{report['sample_csv_mismatches']} of {len(sample)} rows of {sample_csv} score differently than the tree")
+
+    report["passed"] = not problems
+    return report, problems
+
+
+# --- Versions ---
+def _version_dir(version):
+    if not version or os.sep in version or version.startswith("."):
+        raise KeyError(version)
+    return os.path.join(VERSIONS_DIR, version)
+
+
+def read_manifest(version):
+    try:
+        with open(os.path.join(_version_dir(version), VERSION_MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(version)
+
+
+def current_version():
+    """Name of the version CURRENT points at, or None while the fixed model.pkl is served."""
+    try:
+        with open(POINTER_PATH, encoding="utf-8") as f:
+            return os.path.basename(f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def list_versions():
+    """Published version manifests, oldest first."""
+    if not os.path.isdir(VERSIONS_DIR):
+        return []
+    versions = []
+    for name in sorted(os.listdir(VERSIONS_DIR)):
+        if name.startswith("."):
+            continue
+        try:
+            versions.append(read_manifest(name))
+        except KeyError:
+            continue
+    return versions
+
+
+def verify_version(version):
+    """Problems with the files of a published version against its manifest checksums (empty means intact)."""
+    manifest = read_manifest(version)
+    problems = []
+    for name, expected in manifest["files"].items():
+        path = os.path.join(_version_dir(version), name)
+        if not os.path.exists(path):
+            problems.append(f"{name} is missing")
+        elif file_digest(path) != expected["sha256"]:
+            problems.append(f"{name} does not match its checksum")
+    return problems
+
+
+def promote(version, force=False):
+    """Point CURRENT at `version` atomically. Refuses versions that failed their check or their checksums."""
+    manifest = read_manifest(version)
+    if not manifest.get("parity", {}).get("passed") and not force:
+        raise ValueError(f"Version {version} did not pass its checks; pass force=True to serve it anyway")
+    problems = verify_version(version)
+    if problems:
+        raise ValueError(f"Version {version} is damaged: " + "; ".join(problems))
+
+    previous = current_version()
+    tmp_path = f"{POINTER_PATH}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(os.path.relpath(_version_dir(version), os.path.dirname(POINTER_PATH)) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, POINTER_PATH)
+    _fsync_dir(os.path.dirname(POINTER_PATH))
+    log_event("model_promoted", version=version, previous=previous)
+    return previous
+
+
+def rollback():
+    """Point CURRENT back at the version the current one was trained beside. Returns that version."""
+    version = current_version()
+    if version is None:
+        raise ValueError("Nothing to roll back: no version has been promoted")
+    parent = read_manifest(version).get("parent")
+    if parent is None:
+        raise ValueError(f"Version {version} has no previous version to roll back to")
+    promote(parent, force=True)
+    return parent
+
+
+def prune(keep=KEEP_VERSIONS):
+    """Delete all but the newest `keep` versions; the current one and its parent are always kept."""
+    current = current_version()
+    protected = {current}
+    if current is not None:
+        try:
+            protected.add(read_manifest(current).get("parent"))
+        except KeyError:
+            pass
+    removed = []
+    for manifest in list_versions()[:-keep or None]:
+        if manifest["version"] not in protected:
+            shutil.rmtree(_version_dir(manifest["version"]), ignore_errors=True)
+            removed.append(manifest["version"])
+    return removed
+
+
+def worker_pool(workers, nice=RETRAIN_NICE):
+    """Spawn pool for ingest, at lower CPU priority than the serving workers."""
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(nice, log_level()),
+    )
+
+
+def retrain(sources=None, workers=None, promote_when_ready=True, max_mae_increase=MAX_MAE_INCREASE,
+            sample_size=PARITY_SAMPLE, sample_csv=NEW_DATA_PATH, keep=KEEP_VERSIONS, chunk_rows=CHUNK_ROWS, seed=0,
+            holdout=HOLDOUT_FRACTION):
+    """
+    Run the whole pipeline (see module docstring) and return the new
+    version's manifest. Its "promoted" key says whether CURRENT now points
+    at it; "parity" holds the check reports (the holdout one under
+    "holdout") and problems.
+    """
+    sources = list(sources or [DATA_PATH])
+    workers = workers or RETRAIN_WORKERS
+    serving = MODEL_REGISTRY.get() if MODEL_REGISTRY.available() else None
+    parent = current_version()
+
+    os.makedirs(VERSIONS_DIR, exist_ok=True)
+    staging = os.path.join(VERSIONS_DIR, f".staging-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    scratch = staging + ".scratch"
+    os.makedirs(staging)
+    os.makedirs(scratch)
+    try:
+        with stage("model3", "retrain_ingest", sources=len(sources), workers=workers) as info:
+            with worker_pool(workers) as pool:
+                feature_names, sums, counts, records = ingest(sources, pool, workers, scratch, chunk_rows)
+            info["rows"] = sum(r["rows"] for r in records)
+            info["keys"] = int(np.count_nonzero(counts))
+        if not counts.any():
+            raise ValueError("The training data has no rows")
+
+        holdout_report, problems = holdout_check(feature_names, sums, counts, holdout, seed, parent, max_mae_increase)
+        with stage("model3", "retrain_fit", keys=int(np.count_nonzero(counts))):
+            model = fit(feature_names, sums, counts)
+        _stage_files(staging, model, feature_names, workers)
+
+        files = {
+            name: {"sha256": file_digest(os.path.join(staging, name)), "bytes": os.path.getsize(os.path.join(staging, name))}
+            for name in VERSION_FILES
+        }
+        version = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()) + "-" + files["model.pkl"]["sha256"][:12]
+        manifest = {
+            "version": version,
+            "created_at": time.time(),
+            "feature_names": list(feature_names),
+            "files": files,
+            "training": {"sources": records, "rows": sum(r["rows"] for r in records), "keys": int(np.count_nonzero(counts))},
+            "parent": parent,
+        }
+        _write_json(os.path.join(staging, VERSION_MANIFEST), manifest)
+
+        with stage("model3", "retrain_check", sample=sample_size):
+            report, parity_problems = parity_check(staging, model, feature_names, counts, serving, sample_size, sample_csv, seed)
+        problems += parity_problems
+        manifest["parity"] = {**report, "holdout": holdout_report, "problems": problems, "passed": not problems}
+        _write_json(os.path.join(staging, VERSION_MANIFEST), manifest)
+
+        with stage("model3", "retrain_publish", version=version):
+            _fsync_tree(staging)
+            os.rename(staging, _version_dir(version))
+            _fsync_dir(VERSIONS_DIR)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+        shutil.rmtree(staging, ignore_errors=True)
+
+    manifest["promoted"] = False
+    if promote_when_ready and not problems:
+        promote(version)
+        manifest["promoted"] = True
+        prune(keep)
+    log_event("model_retrained", version=version, promoted=manifest["promoted"], problems=problems)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain model3 and publish it as a new version")
+    parser.add_argument("--data", action="append", help="Training CSV or compact .train.json (repeatable; default: combined_data.csv)")
+    parser.add_argument("-w", "--workers", type=int, help=f"Ingest processes and compile threads (default: {RETRAIN_WORKERS})")
+    parser.add_argument("--no-promote", action="store_true", help="Publish and check the version, but keep serving the current one")
+    parser.add_argument("--holdout", type=float, default=HOLDOUT_FRACTION,
+                        help="Fraction of keys held out of the evaluation fit (0 disables the holdout gate)")
+    parser.add_argument("--max-mae-increase", type=float, default=MAX_MAE_INCREASE,
+                        help="Allowed holdout MAE increase over the previous version")
+    parser.add_argument("--sample", type=int, default=PARITY_SAMPLE, help="Keys compared in the parity check")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS, help="Versions kept on disk after a promotion")
+    parser.add_argument("--list", action="store_true", help="List published versions")
+    parser.add_argument("--promote", metavar="VERSION", help="Serve an already published version")
+    parser.add_argument("--force", action="store_true", help="With --promote: serve it even if its check failed")
+    parser.add_argument("--rollback", action="store_true", help="Serve the previous version again")
+    args = parser.parse_args()
+    if not 0 <= args.holdout < 1:
+        parser.error("--holdout must be in [0, 1)")
+
+    configure_logging()
+    if args.list:
+        current = current_version()
+        for m in list_versions():
+            marker = "*" if m["version"] == current else " "
+            passed = "ok" if m.get("parity", {}).get("passed") else "FAILED"
+            print(f"{marker} {m['version']}  rows={m['training']['rows']}  keys={m['training']['keys']}  check={passed}")
+        sys.exit(0)
+    if args.promote or args.rollback:
+        try:
+            if args.rollback:
+                version = rollback()
+            else:
+                promote(args.promote, force=args.force)
+                version = args.promote
+        except (KeyError, ValueError) as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ Now serving model3 version {version}")
+        sys.exit(0)
+
+    if RETRAIN_NICE and hasattr(os, "nice"):
+        os.nice(RETRAIN_NICE)
+    started = time.perf_counter()
+    result = retrain(args.data, args.workers, not args.no_promote, args.max_mae_increase, args.sample, keep=args.keep,
+                     holdout=args.holdout)
+    elapsed = time.perf_counter() - started
+    for problem in result["parity"]["problems"]:
+        print(f"❌ {problem}", file=sys.stderr)
+    if result["parity"]["problems"]:
+        print(f"Version {result['version']} was published but not promoted", file=sys.stderr)
+        sys.exit(1)
+    state = "promoted" if result["promoted"] else "published (not promoted)"
+    print(f"✅ model3 version {result['version']} {state} in {elapsed:.1f}s "
+          f"({result['training']['rows']} rows, {result['training']['keys']} keys)")
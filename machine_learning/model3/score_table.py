@@ -0,0 +1,156 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# The training set enumerates every 0/1 combination of the feature columns, so
+# the model is a pure function of an n-bit key. The first feature is the most
+# significant bit, which matches the row order produced by generate_csv.py.
+MAX_TABLE_BITS = 24
+SCORE_DTYPE = np.int32
+
+
+def _bit_weights(n_features):
+    return np.left_shift(np.uint32(1), np.arange(n_features - 1, -1, -1, dtype=np.uint32))
+
+
+def is_binary(values) -> bool:
+    values = np.asarray(values)
+    return bool(((values == 0) | (values == 1)).all())
+
+
+def pack_keys(values) -> np.ndarray:
+    """Pack an (n_rows, n_features) 0/1 matrix into uint32 table keys."""
+    values = np.asarray(values)
+    if values.ndim == 1:
+        values = values.reshape(1, -1)
+    return values.astype(np.uint32) @ _bit_weights(values.shape[1])
+
+
+def unpack_keys(keys, n_features) -> np.ndarray:
+    """Inverse of pack_keys: expand uint32 keys into an (n_rows, n_features) uint8 matrix."""
+    keys = np.asarray(keys, dtype=np.uint32).reshape(-1, 1)
+    return ((keys & _bit_weights(n_features)) != 0).astype(np.uint8)
+
+
+def _check_width(feature_names):
+    if len(feature_names) > MAX_TABLE_BITS:
+        raise ValueError(
+            f"Cannot compile a score table for {len(feature_names)} features "
+            f"(limit is {MAX_TABLE_BITS})."
+        )
+
+
+def _predict_keys(model, feature_names, keys):
+    X = pd.DataFrame(unpack_keys(keys, len(feature_names)), columns=feature_names)
+    return np.rint(model.predict(X)).astype(SCORE_DTYPE)
+
+
+def compile_from_model(model, feature_names, chunk_rows=1 << 16, executor=None) -> np.ndarray:
+    """
+    Evaluate the model on every possible key and return the dense score table.
+    With a thread pool executor the chunks are scored concurrently (sklearn
+    tree prediction releases the GIL).
+    """
+    feature_names = list(feature_names)
+    _check_width(feature_names)
+    size = 1 << len(feature_names)
+    table = np.empty(size, dtype=SCORE_DTYPE)
+
+    def fill(start):
+        keys = np.arange(start, min(start + chunk_rows, size), dtype=np.uint32)
+        table[start:start + len(keys)] = _predict_keys(model, feature_names, keys)
+
+    starts = range(0, size, chunk_rows)
+    if executor is None:
+        for start in starts:
+            fill(start)
+    else:
+        list(executor.map(fill, starts))
+    return table
+
+
+def compile_from_csv(data_path, feature_names, model=None) -> np.ndarray:
+    """
+    Build the score table straight from the training CSV. Keys missing from
+    the CSV are filled by the model when one is given, otherwise a ValueError
+    is raised since the table would not cover every input.
+    """
+    feature_names = list(feature_names)
+    _check_width(feature_names)
+    df = pd.read_csv(data_path)
+    lower_map = {c.lower(): c for c in df.columns}
+    if "score" not in lower_map:
+        raise KeyError(
+            "Target column 'score' not found. Available columns: "
+            + ", ".join(df.columns)
+        )
+    missing = [c for c in feature_names if c not in df.columns]
+    if missing:
+        raise KeyError("Training CSV is missing feature columns: " + ", ".join(missing))
+
+    size = 1 << len(feature_names)
+    keys = pack_keys(df[feature_names].to_numpy())
+    seen = np.zeros(size, dtype=bool)
+    seen[keys] = True
+    table = np.zeros(size, dtype=SCORE_DTYPE)
+    table[keys] = np.rint(df[lower_map["score"]].to_numpy()).astype(SCORE_DTYPE)
+
+    holes = np.flatnonzero(~seen).astype(np.uint32)
+    if len(holes):
+        if model is None:
+            raise ValueError(f"Training CSV does not cover {len(holes)} of {size} keys and no model was given to fill them.")
+        table[holes] = _predict_keys(model, feature_names, holes)
+    return table
+
+
+def verify_score_table(table, model, feature_names, sample_size=65536, seed=0) -> int:
+    """
+    Parity check of the table against the model on a random key sample (or on
+    every key when sample_size is None). Returns the number of mismatches.
+    """
+    size = len(table)
+    if sample_size is None or sample_size >= size:
+        keys = np.arange(size, dtype=np.uint32)
+    else:
+        rng = np.random.default_rng(seed)
+        keys = rng.choice(size, size=sample_size, replace=False).astype(np.uint32)
+    expected = _predict_keys(model, list(feature_names), keys)
+    return int(np.count_nonzero(np.asarray(table)[keys] != expected))
+
+
+def _meta_path(table_path):
+    return os.path.splitext(table_path)[0] + ".json"
+
+
+def save_score_table(table, feature_names, table_path, source_stamp=None):
+    """Write the table as a .npy (memory-mappable) with a JSON sidecar holding its metadata."""
+    os.makedirs(os.path.dirname(table_path), exist_ok=True)
+    tmp_path = table_path + ".tmp.npy"
+    np.save(tmp_path, np.asarray(table, dtype=SCORE_DTYPE))
+    os.replace(tmp_path, table_path)
+
+    meta = {"feature_names": list(feature_names), "source_stamp": source_stamp}
+    tmp_meta = _meta_path(table_path) + ".tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, _meta_path(table_path))
+
+
+def load_score_table(table_path):
+    """Return (memory-mapped table, metadata dict), or None if no table has been compiled."""
+    if not (os.path.exists(table_path) and os.path.exists(_meta_path(table_path))):
+        return None
+    with open(_meta_path(table_path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    table = np.load(table_path, mmap_mode="r")
+    if len(table) != 1 << len(meta["feature_names"]):
+        return None
+    return table, meta
+
+
+def lookup(table, values) -> np.ndarray:
+    """Score a 0/1 feature matrix with a single vectorized gather."""
+    return np.asarray(table[pack_keys(values)], dtype=int)
+
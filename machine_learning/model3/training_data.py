@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.model3 import score_table
+
+# Compact, memory-mapped form of the model3 training CSV: one packed uint32
+# feature bitmask per row (same bit order as the score table) plus the score
+# column, as two .npy files described by a small JSON manifest:
+#
+#   combined_data.train.json         feature_names, target, rows, source stamp
+#   combined_data.train.keys.npy     uint32 keys
+#   combined_data.train.scores.npy   smallest integer dtype that fits (float64 if non-integral)
+#
+# Loading is two mmap()s instead of parsing ~1M x 21 text columns.
+
+MAX_KEY_BITS = 32
+CHUNK_ROWS = 262144
+
+
+def default_compact_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".train.json"
+
+
+def _data_paths(manifest_path):
+    stem = os.path.splitext(manifest_path)[0]
+    return stem + ".keys.npy", stem + ".scores.npy"
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _validate_columns(columns, feature_names):
+    if feature_names is None:
+        return
+    feature_names = list(feature_names)
+    if columns == feature_names:
+        return
+    missing = [f for f in feature_names if f not in columns]
+    extra = [c for c in columns if c not in feature_names]
+    if missing or extra:
+        raise ValueError(f"Training CSV does not match feature_names: missing {missing}, unexpected {extra}")
+    raise ValueError(
+        "Training CSV columns are in a different order than feature_names; "
+        f"expected {feature_names}, got {columns}"
+    )
+
+
+def _score_dtype(scores):
+    if not np.all(np.isfinite(scores)):
+        raise ValueError("Training scores contain missing or non-finite values")
+    if not np.all(scores == np.rint(scores)):
+        return np.float64
+    lo, hi = scores.min(initial=0), scores.max(initial=0)
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if np.iinfo(dtype).min <= lo and hi <= np.iinfo(dtype).max:
+            return dtype
+    return np.float64
+
+
+def _save_npy(path, array):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def convert_csv(csv_path, manifest_path=None, feature_names=None, chunk_rows=CHUNK_ROWS):
+    """
+    One-time conversion of a training CSV (0/1 feature columns + a score
+    column) into the compact format. When feature_names is given the CSV
+    header must list exactly those features in that order. Returns the
+    manifest path.
+    """
+    manifest_path = manifest_path or default_compact_path(csv_path)
+    header = pd.read_csv(csv_path, nrows=0).columns.tolist()
+    lower_map = {c.lower(): c for c in header}
+    if "score" not in lower_map:
+        raise KeyError("Target column 'score' not found. Available columns: " + ", ".join(header))
+    target = lower_map["score"]
+    columns = [c for c in header if c != target]
+    _validate_columns(columns, feature_names)
+    if len(columns) > MAX_KEY_BITS:
+        raise ValueError(f"{len(columns)} feature columns do not fit a uint32 key (limit is {MAX_KEY_BITS})")
+
+    stamp = _source_stamp(csv_path)
+    key_parts, score_parts = [], []
+    rows = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, dtype={c: np.int64 for c in columns}):
+        values = chunk[columns].to_numpy()
+        bad = np.flatnonzero(((values != 0) & (values != 1)).any(axis=1))
+        if len(bad):
+            raise ValueError(f"Row {rows + int(bad[0]) + 1} of {csv_path} has a feature value other than 0/1")
+        key_parts.append(score_table.pack_keys(values))
+        score_parts.append(pd.to_numeric(chunk[target], errors="coerce").to_numpy(dtype=np.float64))
+        rows += len(chunk)
+
+    keys = np.concatenate(key_parts) if key_parts else np.empty(0, dtype=np.uint32)
+    scores = np.concatenate(score_parts) if score_parts else np.empty(0)
+    scores = scores.astype(_score_dtype(scores))
+
+    keys_path, scores_path = _data_paths(manifest_path)
+    _save_npy(keys_path, keys)
+    _save_npy(scores_path, scores)
+    manifest = {
+        "feature_names": columns,
+        "target": target,
+        "rows": rows,
+        "score_dtype": scores.dtype.name,
+        "source": {"path": os.path.abspath(csv_path), "stamp": stamp},
+    }
+    # The manifest is written last: a reader never sees half-converted data.
+    tmp = manifest_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, manifest_path)
+    return manifest_path
+
+
+def load_training_data(manifest_path):
+    """Memory-map a converted training set. Returns (keys, scores, manifest)."""
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    keys_path, scores_path = _data_paths(manifest_path)
+    keys = np.load(keys_path, mmap_mode="r")
+    scores = np.load(scores_path, mmap_mode="r")
+    if len(keys) != manifest["rows"] or len(scores) != manifest["rows"]:
+        raise ValueError(f"{manifest_path} is inconsistent with its .npy files; re-run the conversion")
+    return keys, scores, manifest
+
+
+def load_training_frame(manifest_path):
+    """(X, y) with the same columns and values train_model would get from the CSV."""
+    keys, scores, manifest = load_training_data(manifest_path)
+    X = pd.DataFrame(score_table.unpack_keys(keys, len(manifest["feature_names"])), columns=manifest["feature_names"])
+    y = pd.Series(np.asarray(scores), name=manifest["target"])
+    return X, y
+
+
+def is_fresh(manifest_path, csv_path):
+    """True when manifest_path was converted from csv_path as it is on disk now."""
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            source = json.load(f)["source"]
+    except (OSError, ValueError, KeyError):
+        return False
+    return os.path.exists(csv_path) and source.get("stamp") == _source_stamp(csv_path)
+
+
+if __name__ == "__main__":
+    from machine_learning.model3.main import DATA_PATH, MODEL_REGISTRY
+    from machine_learning.model3.registry import load_bundle
+
+    parser = argparse.ArgumentParser(description="Convert the model3 training CSV to the compact mmap format")
+    parser.add_argument("-i", "--input", default=DATA_PATH, help="Training CSV (default: combined_data.csv)")
+    parser.add_argument("-o", "--output", help="Manifest path (default: <input>.train.json)")
+    parser.add_argument(
+        "--no-model-check", action="store_true",
+        help="Do not require the columns to match the feature_names of the existing model.pkl",
+    )
+    args = parser.parse_args()
+
+    feature_names = None
+    if not args.no_model_check and MODEL_REGISTRY.available():
+        feature_names = load_bundle(MODEL_REGISTRY.artifact_paths()[0])[1]
+    manifest_path = convert_csv(args.input, args.output, feature_names)
+    keys, scores, manifest = load_training_data(manifest_path)
+    print(f"✅ Converted {manifest['rows']} rows x {len(manifest['feature_names'])} features to {manifest_path} "
+          f"({keys.nbytes + scores.nbytes} bytes)")
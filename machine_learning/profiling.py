@@ -0,0 +1,273 @@
+import contextvars
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+from machine_learning.metrics import log_event
+
+# Opt-in per-request profiling:
+#   ML_PROFILING=1        allow it (default: off; the header is ignored and no middleware is installed)
+#   ML_PROFILE_DIR        where profiles are kept (default machine_learning/profiles)
+#   ML_PROFILE_KEEP=50    ring buffer size: older profiles are deleted as new ones arrive
+#
+# With profiling allowed, a request sent with "X-Profile: 1" runs under
+# cProfile and its response carries X-Profile-Id. The profile covers the
+# event loop thread while the request is in flight plus every call the
+# request hands to machine_learning.executors (CSV parsing, model loads,
+# featurization, predict, output writing): thread-pool calls are profiled in
+# the worker thread, process-pool calls in the child, which sends its stats
+# back. Sync endpoints run on Starlette's own thread pool and only show up as
+# the time the loop waited for them.
+#
+# One request is profiled at a time per process (a second profiler on the
+# loop thread would replace the first); while one runs, other requests asking
+# for a profile are served normally with X-Profile: busy.
+ENABLED = os.environ.get("ML_PROFILING", "0").strip().lower() in ("1", "true", "yes", "on")
+PROFILE_DIR = os.environ.get("ML_PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles"))
+PROFILE_KEEP = int(os.environ.get("ML_PROFILE_KEEP", "50"))
+HEADER = b"x-profile"
+TOP_FUNCTIONS = 15
+
+_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+_current = contextvars.ContextVar("ml_request_profile", default=None)
+_busy = threading.Lock()
+
+
+class _Stats:
+    """Adapter so pstats.Stats can load a stats dict sent back from a worker process."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RequestProfile:
+    """Profilers for one request: the loop thread's plus one per executor call."""
+
+    def __init__(self):
+        self.profile_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        self.main = cProfile.Profile()
+        self._parts = []
+        self._lock = threading.Lock()
+
+    def add(self, stats):
+        with self._lock:
+            self._parts.append(stats)
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn in the current (worker) thread under its own profiler."""
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self.add(profiler)
+
+    def stats(self):
+        with self._lock:
+            parts, self._parts = [self.main] + self._parts, []
+        stats = pstats.Stats()
+        for part in parts:
+            if isinstance(part, cProfile.Profile):
+                part.create_stats()
+                part = part.stats
+            if part:  # pstats refuses empty profiles
+                stats.add(_Stats(part))
+        return stats
+
+
+def current():
+    """The RequestProfile of the request being handled, or None."""
+    return _current.get()
+
+
+def profile_in_process(fn, *args, **kwargs):
+    """Process-pool entry point: (result, stats dict) of fn run under cProfile."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+def _function_name(key):
+    filename, line, name = key
+    return f"{filename}:{line}({name})" if line else name
+
+
+def summarize(stats, limit=TOP_FUNCTIONS):
+    """Top functions by cumulative time, JSON-friendly."""
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": _function_name(key),
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for key, (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+class ProfileStore:
+    """
+    Bounded on-disk ring buffer of request profiles: <id>.pstats (loadable
+    with pstats / snakeviz) and <id>.json (request details and the top
+    functions). Ids sort by creation time; the oldest beyond `keep` go.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def _path(self, profile_id, ext):
+        if not _ID_PATTERN.match(profile_id):
+            raise KeyError(profile_id)
+        return os.path.join(self.directory, profile_id + ext)
+
+    def save(self, profile, **details):
+        os.makedirs(self.directory, exist_ok=True)
+        stats = profile.stats()
+        stats.dump_stats(self._path(profile.profile_id, ".pstats"))
+        record = {
+            "id": profile.profile_id,
+            "created_at": int(profile.profile_id.split("-")[0]) / 1e9,
+            **details,
+            "functions": len(stats.stats),
+            "top": summarize(stats),
+        }
+        tmp_path = self._path(profile.profile_id, ".json") + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(profile.profile_id, ".json"))
+        self._trim()
+        return record
+
+    def _ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and _ID_PATTERN.match(name[:-5]))
+
+    def _trim(self):
+        ids = self._ids()
+        for profile_id in ids[:max(len(ids) - self.keep, 0)]:
+            for ext in (".json", ".pstats"):
+                try:
+                    os.remove(self._path(profile_id, ext))
+                except FileNotFoundError:
+                    pass
+
+    def list(self, limit=None):
+        """Profile records, newest first."""
+        records = []
+        for profile_id in reversed(self._ids()):
+            if limit is not None and len(records) >= limit:
+                break
+            try:
+                records.append(self.get(profile_id))
+            except KeyError:  # trimmed meanwhile
+                continue
+        return records
+
+    def get(self, profile_id):
+        try:
+            with open(self._path(profile_id, ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(profile_id)
+
+    def pstats_path(self, profile_id):
+        path = self._path(profile_id, ".pstats")
+        if not os.path.exists(path):
+            raise KeyError(profile_id)
+        return path
+
+    def report(self, profile_id, sort="cumulative", limit=60):
+        """pstats text report of a stored profile."""
+        out = io.StringIO()
+        stats = pstats.Stats(self.pstats_path(profile_id), stream=out)
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+STORE = ProfileStore()
+
+
+def _wants_profile(scope):
+    for name, value in scope.get("headers", ()):
+        if name == HEADER:
+            return value.strip().lower() in (b"1", b"true", b"yes", b"on")
+    return False
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it with X-Profile: 1 (see module comment)."""
+
+    def __init__(self, app, store=STORE):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, _with_header(send, HEADER, b"busy"))
+            return
+
+        from machine_learning import executors
+
+        profile = RequestProfile()
+        status = [500]
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.profile_id.encode("ascii"))
+                ]
+            await send(message)
+
+        token = _current.set(profile)
+        start = time.perf_counter()
+        profile.main.enable()
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            profile.main.disable()
+            seconds = time.perf_counter() - start
+            _current.reset(token)
+            _busy.release()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            try:
+                await executors.run_in_thread(
+                    self.store.save, profile, method=scope["method"], path=scope["path"], route=route,
+                    status=status[0], seconds=round(seconds, 6),
+                )
+                log_event("request_profiled", profile_id=profile.profile_id, route=route, seconds=round(seconds, 6))
+            except Exception as e:
+                log_event("profile_save_failed", logging.WARNING, profile_id=profile.profile_id, error=str(e))
+
+
+def _with_header(send, name, value):
+    async def wrapped(message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", [])) + [(name, value)]
+        await send(message)
+
+    return wrapped
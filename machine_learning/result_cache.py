@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Responses of the upload endpoints, keyed on what they depend on: the upload
+# bytes, the endpoint parameters and (for model3) the model version.
+#   ML_CACHE_MAX_BYTES        in-memory budget, 0 disables the cache (default 256 MiB)
+#   ML_CACHE_TTL_SECONDS      entry lifetime in both tiers (default 1h)
+#   ML_CACHE_MAX_ENTRY_BYTES  larger results are never cached (default budget / 4)
+#   ML_CACHE_DIR              enables the on-disk tier when set
+#   ML_CACHE_DISK_MAX_BYTES   on-disk budget (default 2 GiB)
+CACHE_MAX_BYTES = int(os.environ.get("ML_CACHE_MAX_BYTES", str(256 << 20)))
+CACHE_TTL_SECONDS = float(os.environ.get("ML_CACHE_TTL_SECONDS", "3600"))
+CACHE_MAX_ENTRY_BYTES = int(os.environ.get("ML_CACHE_MAX_ENTRY_BYTES", "0")) or CACHE_MAX_BYTES // 4
+CACHE_DIR = os.environ.get("ML_CACHE_DIR") or None
+CACHE_DISK_MAX_BYTES = int(os.environ.get("ML_CACHE_DISK_MAX_BYTES", str(2 << 30)))
+
+
+def digest_stream(stream, block_size=1 << 20):
+    """sha256 of a seekable binary stream, leaving it rewound for the real read."""
+    h = hashlib.sha256()
+    for block in iter(lambda: stream.read(block_size), b""):
+        h.update(block)
+    stream.seek(0)
+    return h.hexdigest()
+
+
+def digest_bytes(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def cache_key(endpoint, upload_digest, params, model_version=None):
+    payload = json.dumps([endpoint, upload_digest, params, model_version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheEntry:
+    __slots__ = ("content", "headers", "expires_at", "namespace", "version")
+
+    def __init__(self, content, headers, expires_at, namespace, version):
+        self.content = content
+        self.headers = headers
+        self.expires_at = expires_at
+        self.namespace = namespace
+        self.version = version
+
+    def meta(self):
+        return {"headers": self.headers, "expires_at": self.expires_at, "namespace": self.namespace, "version": self.version}
+
+
+class ResultCache:
+    """
+    Size- and TTL-bounded LRU of response bodies, with an optional on-disk tier
+    behind it. Entries carry the namespace and model version they were built
+    for, so invalidate() can drop everything built from an old model3 artifact.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS, max_entry_bytes=CACHE_MAX_ENTRY_BYTES,
+                 disk_dir=CACHE_DIR, disk_max_bytes=CACHE_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk = OrderedDict()  # key -> size, least recently used first
+        self._disk_bytes = 0
+        self._versions = {}
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    # --- disk tier ---
+    def _disk_paths(self, key):
+        return os.path.join(self.disk_dir, key + ".bin"), os.path.join(self.disk_dir, key + ".json")
+
+    def _scan_disk(self):
+        found = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".bin"):
+                path = os.path.join(self.disk_dir, name)
+                st = os.stat(path)
+                found.append((st.st_mtime, name[:-4], st.st_size))
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _disk_remove(self, key):
+        self._disk_bytes -= self._disk.pop(key, 0)
+        for path in self._disk_paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _disk_put(self, key, entry):
+        if len(entry.content) > self.disk_max_bytes:
+            return
+        bin_path, meta_path = self._disk_paths(key)
+        for path, data in ((bin_path, entry.content), (meta_path, json.dumps(entry.meta()).encode("utf-8"))):
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        self._disk_bytes -= self._disk.pop(key, 0)
+        self._disk[key] = len(entry.content)
+        self._disk_bytes += len(entry.content)
+        while self._disk_bytes > self.disk_max_bytes:
+            self._disk_remove(next(iter(self._disk)))
+            self.evictions += 1
+
+    def _disk_get(self, key):
+        if key not in self._disk:
+            return None
+        bin_path, meta_path = self._disk_paths(key)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(bin_path, "rb") as f:
+                content = f.read()
+        except (OSError, ValueError):
+            self._disk_remove(key)
+            return None
+        self._disk.move_to_end(key)
+        return CacheEntry(content, meta["headers"], meta["expires_at"], meta["namespace"], meta["version"])
+
+    # --- memory tier ---
+    def _memory_put(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.content)
+        self._entries[key] = entry
+        self._bytes += len(entry.content)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.content)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.content)
+        if self.disk_dir:
+            self._disk_remove(key)
+
+    def get(self, key):
+        """Return (content, headers) for a live entry, or None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            from_disk = False
+            if entry is None and self.disk_dir:
+                entry = self._disk_get(key)
+                from_disk = entry is not None
+            if entry is not None and entry.expires_at <= now:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if from_disk:
+                self.disk_hits += 1
+                self._memory_put(key, entry)
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return entry.content, dict(entry.headers)
+
+    def put(self, key, content, headers=None, namespace=None, version=None):
+        """Store a response body; results over max_entry_bytes are skipped."""
+        if not self.enabled or len(content) > self.max_entry_bytes:
+            return False
+        entry = CacheEntry(bytes(content), dict(headers or {}), time.time() + self.ttl_seconds, namespace, version)
+        with self._lock:
+            self._memory_put(key, entry)
+            if self.disk_dir:
+                self._disk_put(key, entry)
+        return True
+
+    def invalidate(self, namespace, keep_version=None):
+        """Drop every entry of namespace whose version differs from keep_version. Returns how many."""
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.namespace == namespace and e.version != keep_version]
+            if self.disk_dir:
+                for key in list(self._disk):
+                    if key in self._entries:
+                        continue
+                    try:
+                        with open(self._disk_paths(key)[1], encoding="utf-8") as f:
+                            meta = json.load(f)
+                    except (OSError, ValueError):
+                        self._disk_remove(key)
+                        continue
+                    if meta["namespace"] == namespace and meta["version"] != keep_version:
+                        stale.append(key)
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def track_version(self, namespace, version):
+        """Note the live version of namespace, invalidating its entries when it changes."""
+        if self._versions.get(namespace, ()) != version:
+            self.invalidate(namespace, keep_version=version)
+            self._versions[namespace] = version
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries) + list(self._disk):
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -0,0 +1,34 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeRegressor
+
+from machine_learning.model3 import main, score_table
+from machine_learning.model3.registry import ModelRegistry
+
+SMALL_FEATURES = ["React", "Python", "AWS"]
+
+
+def publish_model3(directory, offset, feature_names=SMALL_FEATURES):
+    """Write model.pkl and a fresh score table into directory, scoring key k as k + offset."""
+    keys = np.arange(1 << len(feature_names), dtype=np.uint32)
+    X = pd.DataFrame(score_table.unpack_keys(keys, len(feature_names)), columns=feature_names)
+    model = DecisionTreeRegressor(random_state=0).fit(X, keys + offset)
+    model_path = os.path.join(directory, "model.pkl")
+    joblib.dump({"model": model, "feature_names": list(feature_names)}, model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
+    st = os.stat(model_path)
+    score_table.save_score_table(score_table.compile_from_model(model, feature_names), feature_names,
+                                 os.path.join(directory, "score_table.npy"), source_stamp=[st.st_mtime_ns, st.st_size])
+
+
+@pytest.fixture
+def model3_registry(tmp_path, monkeypatch):
+    """A registry over a small published model (key k scores k), installed as model3's for this test."""
+    publish_model3(str(tmp_path), 0)
+    registry = ModelRegistry(str(tmp_path / "model.pkl"), str(tmp_path / "score_table.npy"))
+    monkeypatch.setattr(main, "MODEL_REGISTRY", registry)
+    return registry
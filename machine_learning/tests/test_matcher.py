@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from machine_learning.model3.matcher import TechStackMatcher, legacy_match
+
+FEATURE_NAMES = [
+    "React", "Next.js", "Javascript/Typescript", "Express.js", "Python", "Flask/FastAPI", "PostgreSQL/MongoDB",
+    "AWS", "GCP", "Azure", "Tensorflow/Pytorch", "OpenCV", "Prisma", "TailwindCss", "Recoil", "Redux",
+    "TanStack Query", "Zustand", "Socket.io", "Hono.js",
+]
+
+# (tech stack, expected features, whether legacy_match gets it right too).
+# Where legacy disagrees it is wrong: its two-way substring test reads "Java"
+# as javascript, "React Native" as React, and misses aliases and suffixes.
+ALIAS_CASES = [
+    ("React, Python, AWS", {"React", "Python", "AWS"}, True),
+    ("TanStack_Query react-query reactjs", {"TanStack Query", "React"}, False),
+    ("react query", {"TanStack Query"}, False),
+    ("Java", set(), False),
+    ("java, javascript", {"Javascript/Typescript"}, True),
+    ("Java Spring, C, C++, C#", set(), False),
+    ("React Native", set(), False),
+    ("react-native, redux", {"Redux"}, False),
+    ("reactnative", set(), False),
+    ("preact", set(), False),
+    ("tensor", set(), False),
+    ("python3, nextjs13, next.js14", {"Python", "Next.js"}, True),
+    ("reactjs+redux", {"React", "Redux"}, False),
+    ("tensorflow2.0", {"Tensorflow/Pytorch"}, False),
+    ("vue.js", set(), True),
+    ("Socket.io, open cv, Tailwind CSS", {"Socket.io", "OpenCV", "TailwindCss"}, True),
+]
+
+
+def _legacy_features(stack):
+    return {feature for feature, bit in legacy_match(stack, FEATURE_NAMES).items() if bit}
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return TechStackMatcher(FEATURE_NAMES)
+
+
+@pytest.mark.parametrize("stack, expected, legacy_agrees", ALIAS_CASES)
+def test_alias_cases(matcher, stack, expected, legacy_agrees):
+    assert set(matcher.features(matcher.match(stack)[0])) == expected
+    assert (_legacy_features(stack) == expected) == legacy_agrees
+
+
+def test_matches_legacy_on_feature_names(matcher):
+    rng = random.Random(0)
+    for _ in range(2000):
+        stack = " ".join(rng.sample(FEATURE_NAMES, rng.randint(0, 6)))
+        assert set(matcher.features(matcher.match(stack)[0])) == _legacy_features(stack), stack
+
+
+def test_non_features_are_reported_unknown(matcher):
+    mask, unknown = matcher.match("Java, React Native, docker, React")
+    assert matcher.features(mask) == ["React"]
+    assert unknown == ["java", "react native", "docker"]
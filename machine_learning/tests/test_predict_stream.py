@@ -0,0 +1,31 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from machine_learning.model3 import main, score_table
+from machine_learning.tests.conftest import SMALL_FEATURES, publish_model3
+
+KEYS = np.arange(1 << len(SMALL_FEATURES), dtype=np.uint32)
+
+
+def _csv(rows, names):
+    frame = pd.DataFrame(score_table.unpack_keys(KEYS[np.arange(rows) % len(KEYS)], len(SMALL_FEATURES)), columns=SMALL_FEATURES)
+    frame.insert(0, "Team Name", names)
+    return frame.to_csv(index=False).encode("utf-8")
+
+
+def test_stream_keeps_one_model_across_a_reload(model3_registry, tmp_path):
+    rows = 12
+    chunks = main.iter_predict_csv(io.BytesIO(_csv(rows, [f"t{i}" for i in range(rows)])), chunk_rows=4)
+    first = next(chunks)
+    publish_model3(str(tmp_path), 100)
+    assert model3_registry.get().predict_keys([0])[0] == 100  # the registry did reload
+    output = pd.read_csv(io.BytesIO(first + b"".join(chunks)))
+    np.testing.assert_array_equal(output["score"], np.arange(rows) % len(KEYS))
+
+
+def test_team_names_keep_their_text_in_every_chunk(model3_registry):
+    names = ["007", "1", "2", "3", "0012", "1e3", "12.0", "4"]
+    output = b"".join(main.iter_predict_csv(io.BytesIO(_csv(len(names), names)), chunk_rows=4))
+    assert [line.split(b",")[0].decode() for line in output.splitlines()[1:]] == names
@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeRegressor
+
+from machine_learning.model3 import main, score_table
+from machine_learning.model3.registry import ModelRegistry
+
+FEATURE_NAMES = ["React", "Python", "AWS", "Redux", "Prisma", "OpenCV"]
+KEYS = np.arange(1 << len(FEATURE_NAMES), dtype=np.uint32)
+
+
+@pytest.fixture(scope="module")
+def model():
+    # Fractional targets exercise rounding; a shallow tree makes keys share leaves.
+    X = pd.DataFrame(score_table.unpack_keys(KEYS, len(FEATURE_NAMES)), columns=FEATURE_NAMES)
+    y = np.random.default_rng(0).uniform(0, 100, len(KEYS))
+    return DecisionTreeRegressor(random_state=0, max_depth=4).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def expected(model):
+    X = pd.DataFrame(score_table.unpack_keys(KEYS, len(FEATURE_NAMES)), columns=FEATURE_NAMES)
+    return np.rint(model.predict(X)).astype(score_table.SCORE_DTYPE)
+
+
+def test_pack_unpack_round_trip():
+    values = score_table.unpack_keys(KEYS, len(FEATURE_NAMES))
+    np.testing.assert_array_equal(score_table.pack_keys(values), KEYS)
+    np.testing.assert_array_equal(score_table.unpack_keys(score_table.pack_keys(values), len(FEATURE_NAMES)), values)
+    # The first feature is the most significant bit (generate_csv row order).
+    np.testing.assert_array_equal(values[1], [0, 0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(values[32], [1, 0, 0, 0, 0, 0])
+
+
+@pytest.mark.parametrize("chunk_rows, threads", [(1 << 16, 0), (7, 0), (5, 2)])
+def test_compile_from_model_matches_tree_on_every_key(model, expected, chunk_rows, threads):
+    if threads:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            table = score_table.compile_from_model(model, FEATURE_NAMES, chunk_rows=chunk_rows, executor=executor)
+    else:
+        table = score_table.compile_from_model(model, FEATURE_NAMES, chunk_rows=chunk_rows)
+    np.testing.assert_array_equal(table, expected)
+    assert score_table.verify_score_table(table, model, FEATURE_NAMES, sample_size=None) == 0
+
+
+def test_predict_score_from_json_matches_tree(model, expected, tmp_path, monkeypatch):
+    model_path, table_path = str(tmp_path / "model.pkl"), str(tmp_path / "score_table.npy")
+    joblib.dump({"model": model, "feature_names": FEATURE_NAMES}, model_path)
+    st = tmp_path.joinpath("model.pkl").stat()
+    table = score_table.compile_from_model(model, FEATURE_NAMES)
+    score_table.save_score_table(table, FEATURE_NAMES, table_path, source_stamp=[st.st_mtime_ns, st.st_size])
+    registry = ModelRegistry(model_path, table_path)
+    assert registry.get().scorer == "table"
+    monkeypatch.setattr(main, "MODEL_REGISTRY", registry)
+
+    for key, row in zip(KEYS, score_table.unpack_keys(KEYS, len(FEATURE_NAMES))):
+        stack = ", ".join(name for name, bit in zip(FEATURE_NAMES, row) if bit)
+        assert main.predict_score_from_json({"tech_stack_used": stack}) == expected[key], stack
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from machine_learning.model1.part2 import TeamFormationSession, form_teams, form_teams_from_csv
+
+
+def _candidates_csv(seed, n_rows=60):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Name": [f"C{i}" for i in rng.integers(0, n_rows, size=n_rows)],  # with duplicates
+        "Skill_Score": rng.choice(["10", "20", "55.5", "70", "96", "", "x", "-5"], size=n_rows),  # with ties
+        "Eligible_To": rng.choice(["a", "b", "bc", "", "c, d"], size=n_rows),
+    }).to_csv(index=False)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_fresh_session_matches_form_teams(seed):
+    csv_content = _candidates_csv(seed)
+    threshold, chunk_size = [(150, 3), (250, 5), (0, 2)][seed % 3]
+    session = TeamFormationSession(threshold, chunk_size)
+    session.add_candidates(csv_content)
+    assert session.teams_csv() == form_teams_from_csv(csv_content, threshold, chunk_size)
+    assert session.leftover_count() == len(form_teams(csv_content, threshold, chunk_size)[1])
+
+
+@pytest.mark.parametrize("score", ["nan", "NaN", "inf", "-inf"])
+def test_non_finite_scores_are_rejected_whole(score):
+    session = TeamFormationSession(0, 2)
+    session.add_candidates("Name,Skill_Score,Eligible_To\nA,50,a\n")
+    with pytest.raises(ValueError, match="non-finite"):
+        session.add_candidates(f"Name,Skill_Score,Eligible_To\nB,60,a\nC,{score},a\nD,70,a\n")
+    # Nothing from the rejected upload was taken in, so it can be fixed and resent.
+    assert session.leftovers() == ["A"]
+    assert [t["participant_names"] for t in session.add_candidates("Name,Skill_Score,Eligible_To\nB,60,a\n")] == ["B  A"]
+
+
+def test_session_endpoint_answers_400_for_nan_scores():
+    from machine_learning.app import app
+
+    client = TestClient(app)
+    session_id = client.post("/model1/form_teams/sessions").json()["session_id"]
+    upload = {"file": ("c.csv", b"Name,Skill_Score,Eligible_To\nA,nan,a\n", "text/csv")}
+    response = client.post(f"/model1/form_teams/sessions/{session_id}/candidates", files=upload)
+    assert response.status_code == 400
+    assert "non-finite" in response.json()["detail"]
+    client.delete(f"/model1/form_teams/sessions/{session_id}")
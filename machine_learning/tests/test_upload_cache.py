@@ -0,0 +1,44 @@
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from machine_learning import app as app_module
+from machine_learning.model3 import main
+from machine_learning.result_cache import ResultCache
+from machine_learning.tests.conftest import publish_model3
+
+UPLOAD = b"Team Name,React,Python,AWS\n" + b"".join(f"t{k},{k >> 2 & 1},{k >> 1 & 1},{k & 1}\n".encode() for k in range(8)) * 3
+
+
+@pytest.fixture
+def client(model3_registry, monkeypatch):
+    monkeypatch.setattr(app_module, "MODEL_REGISTRY", model3_registry)
+    monkeypatch.setattr(app_module, "RESULT_CACHE", ResultCache())
+    return TestClient(app_module.app)
+
+
+def _upload(client):
+    response = client.post("/model3/upload?chunk_rows=4", files={"file": ("teams.csv", UPLOAD, "text/csv")})
+    assert response.status_code == 200
+    return response.headers["x-cache"], pd.read_csv(io.BytesIO(response.content))["score"].tolist()
+
+
+def test_upload_scores_with_the_snapshot_it_caches_under(client, model3_registry, tmp_path, monkeypatch):
+    pending_reload = [True]
+
+    def reload_before_scoring(*args, **kwargs):
+        # A new model lands after the request took its cache-key version.
+        if pending_reload:
+            pending_reload.pop()
+            publish_model3(str(tmp_path), 100)
+            assert model3_registry.get().predict_keys([0])[0] == 100
+        yield from main.iter_predict_csv(*args, **kwargs)
+
+    monkeypatch.setattr(app_module, "iter_predict_csv", reload_before_scoring)
+    # The body comes from the snapshot whose version keys the cache entry...
+    assert _upload(client) == ("miss", list(range(8)) * 3)
+    # ...and the next upload is scored, then cached, under the new version.
+    assert _upload(client) == ("miss", [k + 100 for k in range(8)] * 3)
+    assert _upload(client) == ("hit", [k + 100 for k in range(8)] * 3)